@@ -0,0 +1,389 @@
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode, unquote
+
+
+class MockConfluence(object):
+    """
+        An in-process stand-in for the parts of the Confluence REST api the client uses: content,
+        content/search, space, child pages, child attachments, attachment downloads and
+        viewpagestorage.action. Every request waits latency seconds first, so round trips cost
+        something the way they do against a real server.
+
+        The requests received are counted by method and endpoint and can be read or reset over
+        http at /_mock/stats, which also works when the server runs in another process. fail makes
+        the next requests get an error instead, eg to see how the client handles throttling.
+
+        .. code-block:: python
+
+          from benchmarks.mockserver import MockConfluence
+          from confluenceapi import Confluence
+
+          with MockConfluence(latency=0.005) as mock:
+              lc = Confluence(mock.server, ('admin', 'admin'))
+              lc.add_page('Page about DS', 'Data Science')
+              mock.stats()  # {'GET content/search': 2, 'GET content': 1, 'POST content': 1}
+
+              mock.fail(429, times=2, headers={'Retry-After': '1'})
+              lc.get_page_contents('Page about DS', 'Data Science')  # Throttled twice, then served
+    """
+
+    def __init__(self, latency=0.0, spaces=None, host='127.0.0.1', port=0):
+        """
+        Arguments:
+            latency (float): Seconds to wait before answering every request
+            spaces (Optional[dict]): The spaces on the server, space key to space name
+            host (str): The address to listen on
+            port (int): The port to listen on, 0 picks a free one
+
+        """
+
+        self.latency = latency
+        self.spaces = dict(spaces or {'DS': 'Data Science'})
+        self.content = {}
+        self.counts = Counter()
+        self.failures = []
+        self.lock = threading.Lock()
+        self._next_id = 1000
+        self._httpd = ThreadingHTTPServer((host, port), _handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+        self.server = '{0}:{1}'.format(*self._httpd.server_address[:2])
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+    def start(self):
+        """Serves requests on a background thread"""
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+
+    def stop(self):
+        """Stops serving and closes the listening socket"""
+
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+    def stats(self):
+        """
+        Returns:
+            counts (dict): How many requests were received by 'METHOD endpoint'
+
+        """
+
+        with self.lock:
+            return dict(self.counts)
+
+
+    def reset(self):
+        """Forgets the requests received so far"""
+
+        with self.lock:
+            self.counts.clear()
+
+
+    def fail(self, status, times=1, headers=None, path=None, method=None):
+        """
+        Answers the next requests with an error instead of serving them
+
+        Arguments:
+            status (int): The status to answer with eg 429 or 503
+            times (int): How many requests to answer with it
+            headers (Optional[dict]): Headers to send with the error eg {'Retry-After': '1'}
+            path (Optional[str]): Only fail requests whose path starts with this eg '/status'
+            method (Optional[str]): Only fail requests with this method eg 'PUT'
+
+        """
+
+        with self.lock:
+            self.failures.append({'status': status, 'times': times, 'headers': headers or {},
+                                  'path': path, 'method': method})
+
+
+    def _failure(self, method, path):
+        # Called with the lock held, the failure to answer the request with
+        for failure in self.failures:
+            if (failure['path'] is None or path.startswith(failure['path'])) and failure['method'] in (None, method):
+                failure['times'] -= 1
+                if failure['times'] <= 0:
+                    self.failures.remove(failure)
+                return failure
+        return None
+
+
+    def new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+
+def _handler(mock):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately, with Nagle on keep-alive responses stall on delayed acks
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_PUT(self):
+            self._handle('PUT')
+
+        def do_DELETE(self):
+            self._handle('DELETE')
+
+        def _read_body(self):
+            if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        break
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+                return b''.join(chunks)
+            return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        def _send(self, code, body=b'', content_type='application/json', headers=None):
+            self.send_response(code)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, data, code=200):
+            self._send(code, json.dumps(data).encode('utf-8'))
+
+        def _handle(self, method):
+            url = urlparse(self.path)
+            query = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+            path = url.path.rstrip('/') or '/'
+            body = self._read_body() if method in ('POST', 'PUT') else b''
+
+            if path == '/_mock/stats':
+                if method == 'DELETE':
+                    mock.reset()
+                return self._send_json(mock.stats())
+
+            if mock.latency:
+                time.sleep(mock.latency)
+            endpoint = re.sub(r'/\d+(?=/|$)', '/{id}', path)
+            endpoint = re.sub(r'^(/download/attachments/\{id\})/.+$', r'\1/{name}', endpoint)
+            with mock.lock:
+                mock.counts[method + ' ' + endpoint.replace('/rest/api/', '', 1).lstrip('/')] += 1
+                failure = mock._failure(method, path)
+                if failure is not None:
+                    return self._send(failure['status'], json.dumps({'message': 'Failed by the mock'}).encode('utf-8'),
+                                      headers=failure['headers'])
+                return self._route(method, path, query, body)
+
+        def _route(self, method, path, query, body):
+            if path == '/status':
+                return self._send_json({'state': 'RUNNING'})
+            if path == '/rest/api/space':
+                key = query.get('spaceKey')
+                return self._send_json({'results': [{'key': key, 'name': mock.spaces[key]}] if key in mock.spaces else []})
+            if path == '/rest/api/content/search':
+                return self._search(query)
+            if path == '/rest/api/content':
+                return self._create(body) if method == 'POST' else self._find(query)
+            match = re.match(r'^/rest/api/content/(\d+)$', path)
+            if match:
+                return self._content(method, int(match.group(1)), query, body)
+            match = re.match(r'^/rest/api/content/(\d+)/child/page$', path)
+            if match:
+                pageid = int(match.group(1))
+                if pageid not in mock.content:
+                    return self._send_json({'message': 'Page not found'}, 404)
+                children = [item for item in mock.content.values()
+                            if item['type'] == 'page' and item['ancestors'][-1:] == [pageid]]
+                return self._send_json(self._paged(children, query, path))
+            match = re.match(r'^/rest/api/content/(\d+)/child/attachment(?:/(\d+)/data)?$', path)
+            if match:
+                pageid = int(match.group(1))
+                if method == 'GET':
+                    if pageid not in mock.content:
+                        return self._send_json({'message': 'Page not found'}, 404)
+                    attachments = [item for item in mock.content.values()
+                                   if item['type'] == 'attachment' and item['container'] == pageid
+                                   and query.get('filename', item['title']) == item['title']]
+                    return self._send_json(self._paged(attachments, query, path))
+                return self._attach(pageid, match.group(2), body)
+            match = re.match(r'^/download/attachments/(\d+)/(.+)$', path)
+            if match:
+                for item in mock.content.values():
+                    if item['type'] == 'attachment' and item['container'] == int(match.group(1)) \
+                            and item['title'] == unquote(match.group(2)):
+                        return self._send(200, item['data'], 'application/octet-stream')
+                return self._send_json({'message': 'Attachment not found'}, 404)
+            if path == '/plugins/viewstorage/viewpagestorage.action':
+                page = mock.content.get(int(query.get('pageId', 0)))
+                if page is None:
+                    return self._send_json({'message': 'Page not found'}, 404)
+                return self._send(200, page['body'].encode('utf-8'), 'text/plain')
+            return self._send_json({'message': 'No mock for ' + path}, 404)
+
+        def _search(self, query):
+            cql = query.get('cql', '')
+            if cql.startswith('user='):
+                return self._send_json({'results': [], 'size': 0, '_links': {}})
+            match = re.search(r'space\.title ~ "([^"]*)"', cql)
+            if match:
+                spaces = [{'space': {'key': key}, '_expandable': {'space': '/rest/api/space/' + key}}
+                          for key, name in mock.spaces.items() if match.group(1).lower() in name.lower()]
+                return self._send_json(self._paged(spaces, query, '/rest/api/content/search', raw=True))
+            results = list(mock.content.values())
+            match = re.search(r'type ?= ?"?(\w+)"?', cql)
+            if match:
+                results = [item for item in results if item['type'] == match.group(1)]
+            match = re.search(r'space ?= ?"?(\w+)"?', cql)
+            if match:
+                results = [item for item in results if item['space'] == match.group(1)]
+            match = re.search(r'lastModified ?>= ?"([^"]+)"', cql)
+            if match:
+                results = [item for item in results if item['modified'] >= match.group(1)]
+            return self._send_json(self._paged(results, query, '/rest/api/content/search'))
+
+        def _find(self, query):
+            pages = [item for item in mock.content.values() if item['type'] == query.get('type', 'page')
+                     and query.get('title', item['title']) == item['title']
+                     and query.get('spaceKey', item['space']) == item['space']]
+            return self._send_json(self._paged(pages, query, '/rest/api/content'))
+
+        def _create(self, body):
+            data = json.loads(body)
+            space_key = data['space']['key']
+            if any(item['type'] == 'page' and item['title'] == data['title'] and item['space'] == space_key
+                   for item in mock.content.values()):
+                return self._send_json({'message': 'A page with this title already exists'}, 400)
+            page = self._new('page', data['title'], space_key, body=data['body']['storage']['value'],
+                             ancestors=[int(ancestor['id']) for ancestor in data.get('ancestors', [])])
+            return self._send_json(self._json(page))
+
+        def _content(self, method, contentid, query, body):
+            item = mock.content.get(contentid)
+            if item is None:
+                return self._send_json({'message': 'Content not found'}, 404)
+            if method == 'GET':
+                return self._send_json(self._json(item, query.get('expand', '')))
+            if method == 'DELETE':
+                del mock.content[contentid]
+                return self._send(204)
+            data = json.loads(body)
+            if data['version']['number'] != item['version'] + 1:
+                return self._send_json({'message': 'Version must be incremented on update'}, 409)
+            item.update(version=item['version'] + 1, body=data['body']['storage']['value'],
+                        title=data.get('title', item['title']), modified=_now())
+            if 'ancestors' in data:
+                item['ancestors'] = [int(ancestor['id']) for ancestor in data['ancestors']]
+            return self._send_json(self._json(item))
+
+        def _attach(self, pageid, attachmentid, body):
+            if pageid not in mock.content:
+                return self._send_json({'message': 'Page not found'}, 404)
+            message = BytesParser(policy=HTTP).parsebytes(
+                b'Content-Type: ' + self.headers['Content-Type'].encode('latin-1') + b'\r\n\r\n' + body)
+            files = [part for part in message.iter_parts() if part.get_filename()]
+            results = []
+            for part in files:
+                data = part.get_payload(decode=True)
+                if attachmentid is not None:
+                    item = mock.content.get(int(attachmentid))
+                    if item is None:
+                        return self._send_json({'message': 'Attachment not found'}, 404)
+                    item.update(data=data, version=item['version'] + 1, modified=_now())
+                else:
+                    if any(item['type'] == 'attachment' and item['container'] == pageid and item['title'] == part.get_filename()
+                           for item in mock.content.values()):
+                        return self._send_json({'message': 'Cannot add a new attachment with same file name'}, 400)
+                    item = self._new('attachment', part.get_filename(), mock.content[pageid]['space'],
+                                     container=pageid, data=data)
+                results.append(self._json(item))
+            return self._send_json(results[0] if attachmentid is not None else {'results': results, 'size': len(results)})
+
+        def _new(self, content_type, title, space_key, **fields):
+            item = {'id': mock.new_id(), 'type': content_type, 'title': title, 'space': space_key,
+                    'version': 1, 'body': '', 'ancestors': [], 'container': None, 'modified': _now()}
+            item.update(fields)
+            mock.content[item['id']] = item
+            return item
+
+        def _json(self, item, expand=''):
+            data = {'id': str(item['id']), 'type': item['type'], 'title': item['title'],
+                    'space': {'key': item['space']},
+                    'version': {'number': item['version'], 'when': item['modified'].replace(' ', 'T') + ':00.000+00:00'},
+                    'ancestors': [{'id': str(ancestor)} for ancestor in item['ancestors']],
+                    '_expandable': {'space': '/rest/api/space/' + item['space']},
+                    '_links': {'webui': '/pages/viewpage.action?pageId={0}'.format(item['id'])}}
+            if 'body' in expand:
+                data['body'] = {'storage': {'value': item['body'], 'representation': 'storage'}}
+            if item['type'] == 'attachment':
+                data['container'] = {'id': str(item['container'])}
+                data['extensions'] = {'fileSize': len(item['data'])}
+                data['_links']['download'] = '/download/attachments/{0}/{1}'.format(item['container'], item['title'])
+            return data
+
+        def _paged(self, items, query, path, raw=False):
+            start = int(query.get('start', 0))
+            limit = int(query.get('limit', 25))
+            chunk = items[start:start + limit]
+            links = {'base': 'http://' + self.headers['Host'], 'context': ''}
+            if start + limit < len(items):
+                links['next'] = path + '?' + urlencode(dict(query, start=start + limit))
+            return {'results': chunk if raw else [self._json(item, query.get('expand', '')) for item in chunk],
+                    'start': start, 'limit': limit, 'size': len(chunk), '_links': links}
+
+    return Handler
+
+
+def _now():
+    return time.strftime('%Y-%m-%d %H:%M')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a mock Confluence REST api')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering every request')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mock = MockConfluence(latency=args.latency, host=args.host, port=args.port)
+    # The first line tells a parent process where to connect
+    print(mock.server, flush=True)
+    try:
+        mock._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock._httpd.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+    Benchmarks the client against a mock Confluence server and reports the round trips per
+    operation, operations per second and peak memory of every benchmark.
+
+    .. code-block:: bash
+
+      python -m benchmarks.run
+      python -m benchmarks.run --latency 0.02 --iterations 100 --only update_page get_page_contents
+      python -m benchmarks.run --json results.json
+
+    The mock server runs in a separate process by default, so the peak memory only counts the
+    client, pass --server thread to run it in this process instead.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from collections import OrderedDict
+from urllib.request import Request, urlopen
+
+from benchmarks.mockserver import MockConfluence
+
+
+SPACE_NAME = 'Data Science'
+CREDENTIALS = ('admin', 'admin')
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name, client=True):
+    """
+    Registers a benchmark, the decorated function sets up everything it needs and returns a
+    callable that runs one operation given the iteration number
+
+    Arguments:
+        name (str): The name to report the benchmark under
+        client (bool): Whether the benchmark talks to the server
+
+    """
+
+    def decorator(setup):
+        BENCHMARKS[name] = (setup, client)
+        return setup
+    return decorator
+
+
+@benchmark('add_page')
+def add_page(lc, options):
+    body = '<p>{0}</p>'.format('x' * options.body_size)
+    return lambda i: lc.add_page('Added page {0}'.format(i), SPACE_NAME, body=body)
+
+
+@benchmark('update_page')
+def update_page(lc, options):
+    lc.add_page('Updated page', SPACE_NAME)
+    return lambda i: lc.update_page('Updated page', SPACE_NAME, '<p>{0}{1}</p>'.format(i, 'x' * options.body_size))
+
+
+@benchmark('update_page_by_id')
+def update_page_by_id(lc, options):
+    pageid = int(lc.add_page('Updated by id', SPACE_NAME).json()['id'])
+    return lambda i: lc.update_page_by_id(pageid, '<p>{0}{1}</p>'.format(i, 'x' * options.body_size))
+
+
+@benchmark('update_page_rendered')
+def update_page_rendered(lc, options):
+    lc.add_page('Large page', SPACE_NAME)
+    return lambda i: lc.update_page('Large page', SPACE_NAME, _large_page(options.rows).render())
+
+
+@benchmark('update_page_streamed')
+def update_page_streamed(lc, options):
+    lc.add_page('Large page', SPACE_NAME)
+    return lambda i: lc.update_page('Large page', SPACE_NAME, _large_page(options.rows))
+
+
+@benchmark('get_page_contents')
+def get_page_contents(lc, options):
+    lc.add_page('Read page', SPACE_NAME, body='<p>{0}</p>'.format('x' * options.body_size))
+    return lambda i: lc.get_page_contents('Read page', SPACE_NAME)
+
+
+@benchmark('upload_attachment')
+def upload_attachment(lc, options):
+    lc.add_page('Upload page', SPACE_NAME)
+    path = _attachment_file(options)
+    return lambda i: lc.upload_attachment(path, 'Upload page', SPACE_NAME, filename='upload-{0}.bin'.format(i))
+
+
+@benchmark('update_attachment')
+def update_attachment(lc, options):
+    lc.add_page('Attachment page', SPACE_NAME)
+    path = _attachment_file(options)
+    lc.upload_attachment(path, 'Attachment page', SPACE_NAME)
+    return lambda i: lc.update_attachment(path, 'Attachment page', SPACE_NAME, 'Update {0}'.format(i))
+
+
+@benchmark('delete_attachment')
+def delete_attachment(lc, options):
+    lc.add_page('Delete page', SPACE_NAME)
+    path = _attachment_file(options)
+    for i in range(options.iterations):
+        lc.upload_attachment(path, 'Delete page', SPACE_NAME, filename='delete-{0}.bin'.format(i))
+    return lambda i: lc.delete_attachment('delete-{0}.bin'.format(i), 'Delete page', SPACE_NAME)
+
+
+@benchmark('upload_attachments')
+def upload_attachments(lc, options):
+    # Every operation attaches a report's worth of small files to a new page in bulk
+    directory = os.path.join(options.workdir, 'report')
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(20):
+        paths.append(os.path.join(directory, 'figure-{0}.png'.format(i)))
+        with open(paths[-1], 'wb') as handle:
+            handle.write(os.urandom(10 * 1024))
+    for i in range(options.iterations):
+        lc.add_page('Report {0}'.format(i), SPACE_NAME)
+    return lambda i: lc.upload_attachments(paths, 'Report {0}'.format(i), SPACE_NAME)
+
+
+@benchmark('page_builder_table', client=False)
+def page_builder_table(lc, options):
+    from confluenceapi import ConfluencePageBuilder
+    df = _dataframe(options.rows)
+
+    def run(i):
+        cp = ConfluencePageBuilder()
+        cp.add_title('Nightly numbers', 'h2')
+        cp.add_table(df)
+        return cp.render()
+    return run
+
+
+@benchmark('page_builder_chart_downsampled', client=False)
+def page_builder_chart_downsampled(lc, options):
+    from confluenceapi import ConfluencePageBuilder
+    df = _dataframe(options.rows * 10).set_index('when')[['value', 'total']]
+
+    def run(i):
+        cp = ConfluencePageBuilder()
+        cp.add_chart(df, 'line', 'Nightly numbers', max_points=1000)
+        return cp.render()
+    return run
+
+
+@benchmark('page_builder_components', client=False)
+def page_builder_components(lc, options):
+    from confluenceapi import ConfluencePageBuilder
+
+    def run(i):
+        cp = ConfluencePageBuilder()
+        for row in range(options.rows // 10):
+            cp.add_title('Section {0}'.format(row), 'h3')
+            cp.add_warning('Row {0} needs a look'.format(row), 'note', 'Check')
+            cp.add_code_block('print({0})'.format(row), language='python')
+            cp.add_tag_user('admin')
+        return cp.render()
+    return run
+
+
+@benchmark('page_builder_chart', client=False)
+def page_builder_chart(lc, options):
+    from confluenceapi import ConfluencePageBuilder
+    df = _dataframe(options.rows)[['value', 'total']]
+
+    def run(i):
+        cp = ConfluencePageBuilder()
+        cp.add_chart(df, 'line', 'Nightly numbers')
+        return cp.render()
+    return run
+
+
+def _large_page(rows):
+    from confluenceapi import ConfluencePageBuilder
+    cp = ConfluencePageBuilder()
+    for row in range(rows):
+        cp.add_custom_html('<p>Row {0} of the nightly numbers, {1}</p>'.format(row, 'x' * 100))
+    return cp
+
+
+def _attachment_file(options):
+    path = os.path.join(options.workdir, 'attachment.bin')
+    if not os.path.exists(path):
+        with open(path, 'wb') as handle:
+            handle.write(os.urandom(options.attachment_size))
+    return path
+
+
+def _dataframe(rows):
+    import numpy as np
+    import pandas as pd
+    random = np.random.RandomState(0)
+    return pd.DataFrame({
+        'name': ['row {0}'.format(i) for i in range(rows)],
+        'category': random.choice(['a', 'b', 'c', 'd'], rows),
+        'value': random.randn(rows),
+        'total': random.randint(0, 10 ** 6, rows),
+        'ratio': random.rand(rows),
+        'when': pd.date_range('2020-01-01', periods=rows, freq='min'),
+    })
+
+
+class MockServer(object):
+    """Starts the mock server in this process or a child process and reads its request counts"""
+
+    def __init__(self, mode, latency):
+        """
+        Arguments:
+            mode (str): 'thread' to serve from this process, 'process' to serve from a child process
+            latency (float): Seconds the server waits before answering every request
+
+        """
+
+        self.mode = mode
+        if mode == 'thread':
+            self.mock = MockConfluence(latency=latency).start()
+            self.server = self.mock.server
+        else:
+            self.process = subprocess.Popen([sys.executable, '-m', 'benchmarks.mockserver', '--latency', str(latency)],
+                                            stdout=subprocess.PIPE, universal_newlines=True,
+                                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            self.server = self.process.stdout.readline().strip()
+
+
+    def stats(self, reset=False):
+        """
+        Arguments:
+            reset (bool): Whether to forget the requests counted so far
+
+        Returns:
+            counts (dict): How many requests were received by 'METHOD endpoint'
+
+        """
+
+        request = Request('http://' + self.server + '/_mock/stats', method='DELETE' if reset else 'GET')
+        with urlopen(request) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+
+    def stop(self):
+        if self.mode == 'thread':
+            self.mock.stop()
+        else:
+            self.process.terminate()
+            self.process.wait()
+
+
+def run_benchmark(name, server, options):
+    """
+    Arguments:
+        name (str): The name of a registered benchmark
+        server (Optional[MockServer]): The mock server, None for benchmarks that don't talk to one
+        options (argparse.Namespace): The command line options
+
+    Returns:
+        result (dict): The operations, seconds, ops_per_sec, round_trips_per_op, endpoints and peak_mb
+
+    """
+
+    from confluenceapi import Confluence
+
+    setup, needs_client = BENCHMARKS[name]
+    lc = Confluence(server.server, CREDENTIALS, pool_size=options.pool_size) if needs_client else None
+    if lc is not None:
+        # Check the credentials now so the request isn't counted against the first operation
+        lc.verify()
+    try:
+        run = setup(lc, options)
+        iterations = options.iterations if needs_client else options.render_iterations
+        if needs_client:
+            server.stats(reset=True)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        for i in range(iterations):
+            run(i)
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        endpoints = server.stats() if needs_client else {}
+    finally:
+        if lc is not None:
+            lc.close()
+
+    round_trips = sum(endpoints.values())
+    return OrderedDict([
+        ('name', name),
+        ('operations', iterations),
+        ('seconds', seconds),
+        ('ops_per_sec', iterations / seconds if seconds else float('inf')),
+        ('round_trips_per_op', round_trips / float(iterations)),
+        ('endpoints', dict((endpoint, count / float(iterations)) for endpoint, count in sorted(endpoints.items()))),
+        ('peak_mb', peak / 1024.0 ** 2),
+    ])
+
+
+def report(results, verbose=False):
+    """
+    Arguments:
+        results (list): The results of run_benchmark
+        verbose (bool): Whether to break the round trips down by endpoint
+
+    Returns:
+        table (str): A plain text table of the results
+
+    """
+
+    lines = ['{0:<32} {1:>6} {2:>10} {3:>12} {4:>10}'.format('benchmark', 'ops', 'ops/sec', 'trips/op', 'peak MB')]
+    for result in results:
+        lines.append('{name:<32} {operations:>6} {ops_per_sec:>10.1f} {round_trips_per_op:>12.2f} {peak_mb:>10.2f}'.format(**result))
+        if verbose:
+            for endpoint, count in result['endpoints'].items():
+                lines.append('    {0:<48} {1:>6.2f}'.format(endpoint, count))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the confluenceapi client against a mock server')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Run only these benchmarks')
+    parser.add_argument('--iterations', type=int, default=50, help='Operations per client benchmark')
+    parser.add_argument('--render-iterations', type=int, default=3, help='Renders per page builder benchmark')
+    parser.add_argument('--latency', type=float, default=0.002, help='Seconds the mock server waits per request')
+    parser.add_argument('--server', choices=('process', 'thread'), default='process',
+                        help='Where to run the mock server, a child process keeps it out of the memory numbers')
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--body-size', type=int, default=10 * 1024, help='Bytes of page body written per update')
+    parser.add_argument('--attachment-size', type=int, default=1024 ** 2, help='Bytes per attachment')
+    parser.add_argument('--rows', type=int, default=10000, help='Rows in the page builder DataFrames')
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help='Break round trips down by endpoint')
+    options = parser.parse_args(argv)
+
+    names = options.only or list(BENCHMARKS)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        options.workdir = workdir
+        for name in names:
+            # Every benchmark gets a fresh server so earlier benchmarks don't slow down lookups
+            server = MockServer(options.server, options.latency) if BENCHMARKS[name][1] else None
+            try:
+                results.append(run_benchmark(name, server, options))
+            finally:
+                if server is not None:
+                    server.stop()
+            print(report(results[-1:], options.verbose).split('\n', 1)[1] if results[1:] else report(results, options.verbose),
+                  flush=True)
+
+    if options.json:
+        with open(options.json, 'w') as handle:
+            json.dump({'options': {'latency': options.latency, 'iterations': options.iterations, 'rows': options.rows,
+                                   'attachment_size': options.attachment_size, 'body_size': options.body_size},
+                       'results': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
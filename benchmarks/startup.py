@@ -0,0 +1,83 @@
+"""
+    Measures how long a fresh interpreter takes to import the package and construct a client,
+    and which heavy modules those steps pull in.
+
+    .. code-block:: bash
+
+      python -m benchmarks.startup
+      python -m benchmarks.startup --runs 20 --json startup.json
+
+    Every run is a new python process so nothing is already imported or cached, constructing the
+    client talks to a mock server with no latency.
+"""
+import sys
+import json
+import argparse
+import subprocess
+from collections import OrderedDict
+
+from benchmarks.mockserver import MockConfluence
+
+
+HEAVY_MODULES = ('pandas', 'numpy', 'jinja2', 'asyncio', 'aiohttp')
+
+SCRIPTS = OrderedDict([
+    ('import confluenceapi', 'import confluenceapi'),
+    ('from confluenceapi import Confluence', 'from confluenceapi import Confluence'),
+    ('Confluence(...)', 'from confluenceapi import Confluence\n'
+                        'Confluence({server!r}, ("admin", "admin"))'),
+    ('Confluence(...).verify()', 'from confluenceapi import Confluence\n'
+                                 'Confluence({server!r}, ("admin", "admin")).verify()'),
+])
+
+TIMED = """
+import sys, json, time
+started = time.perf_counter()
+{script}
+seconds = time.perf_counter() - started
+print(json.dumps([seconds, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def measure(script, runs):
+    """
+    Arguments:
+        script (str): The python to time, run in a new interpreter every time
+        runs (int): How many interpreters to start
+
+    Returns:
+        result (dict): The best and median seconds over all runs and the heavy modules that were imported
+
+    """
+
+    timings, loaded = [], []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', TIMED.format(script=script, heavy=HEAVY_MODULES)])
+        seconds, loaded = json.loads(output.decode().strip().splitlines()[-1])
+        timings.append(seconds)
+    timings.sort()
+    return OrderedDict([('best', timings[0]), ('median', timings[len(timings) // 2]), ('loaded', loaded)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the cold start of the confluenceapi package')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per measurement')
+    parser.add_argument('--json', help='Also write the results to this file')
+    options = parser.parse_args(argv)
+
+    results = OrderedDict()
+    print('{0:<40} {1:>10} {2:>10}  {3}'.format('step', 'best ms', 'median ms', 'heavy modules'))
+    with MockConfluence(latency=0) as mock:
+        for name, script in SCRIPTS.items():
+            results[name] = measure(script.format(server=mock.server), options.runs)
+            print('{0:<40} {best:>10.1f} {median:>10.1f}  {1}'.format(
+                name, ', '.join(results[name]['loaded']) or '-',
+                best=results[name]['best'] * 1000, median=results[name]['median'] * 1000), flush=True)
+
+    if options.json:
+        with open(options.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
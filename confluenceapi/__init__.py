@@ -1,7 +1,60 @@
-from confluenceapi.client import Confluence
-from confluenceapi.pagebuilder import ConfluencePageBuilder
+import importlib
+
+# Every name is imported from its module the first time it is used (PEP 562), so importing the
+# package stays cheap and pandas, jinja2 and asyncio are only loaded by the code that needs them
+_exports = {
+           'AsyncConfluence': 'confluenceapi.aio',
+           'AttachmentResult': 'confluenceapi.batch',
+           'BuilderRecipe': 'confluenceapi.batchrender',
+           'Confluence': 'confluenceapi.client',
+           'ConfluencePageBuilder': 'confluenceapi.pagebuilder',
+           'DiskPageCache': 'confluenceapi.pagecache',
+           'JSONStream': 'confluenceapi.streaming',
+           'LRUCache': 'confluenceapi.cache',
+           'Manifest': 'confluenceapi.sync',
+           'MetricsCollector': 'confluenceapi.metrics',
+           'MultipartEncoder': 'confluenceapi.streaming',
+           'NodePool': 'confluenceapi.cluster',
+           'PublishResult': 'confluenceapi.batch',
+           'RateLimiter': 'confluenceapi.ratelimit',
+           'SpaceMirror': 'confluenceapi.mirror',
+           'SyncResult': 'confluenceapi.sync',
+           'TemplateRegistry': 'confluenceapi.pagebuilder',
+           'TreeResult': 'confluenceapi.batch',
+           'WriteBehind': 'confluenceapi.writebehind',
+           }
 
 __all__ = (
-           'Confluence'
-           'ConfluencePageBuilder'
+           'AsyncConfluence',
+           'AttachmentResult',
+           'BuilderRecipe',
+           'Confluence',
+           'ConfluencePageBuilder',
+           'DiskPageCache',
+           'JSONStream',
+           'LRUCache',
+           'Manifest',
+           'MetricsCollector',
+           'MultipartEncoder',
+           'NodePool',
+           'PublishResult',
+           'RateLimiter',
+           'SpaceMirror',
+           'SyncResult',
+           'TemplateRegistry',
+           'TreeResult',
+           'WriteBehind',
            )
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError('module {module!r} has no attribute {name!r}'.format(module=__name__, name=name))
+    value = getattr(importlib.import_module(_exports[name]), name)
+    # Cache it on the package so later lookups don't come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,596 @@
+import os
+import json
+import base64
+import asyncio
+import logging
+from urllib.parse import quote
+from confluenceapi.cache import LRUCache
+from confluenceapi.cluster import node_url
+from confluenceapi.ratelimit import RateLimiter, parse_retry_after
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConfluence(object):
+
+    """
+        Awaitable counterpart of :class:`confluenceapi.Confluence`, requires ``aiohttp``
+        (``pip install confluenceapi[async]``). Entering the client checks the credentials and raises
+        a PermissionError when they are rejected, the same as the first request of Confluence does.
+
+        .. code-block:: python
+
+          ## Example
+          import asyncio
+          from confluenceapi import AsyncConfluence
+
+          async def publish(reports):
+              async with AsyncConfluence(conf_server, credentials, max_concurrency=20) as lc:
+                  await asyncio.gather(*[lc.update_page(title, 'Data Science', html)
+                                         for title, html in reports.items()])
+
+                  contents = await lc.get_page_contents('Page about DS', 'Data Science')
+                  await lc.upload_attachment('demo.txt', 'Page about DS', 'Data Science', 'First upload!')
+
+          asyncio.run(publish(reports))
+    """
+
+
+    def __init__(self, server, auth, max_concurrency=10, pool_size=None, max_retries=3,
+                 backoff_factor=0.5, timeout=60, cache=None, rate_limit=None):
+        """
+        Arguments:
+            server (str): where the server is running eg: 172.17.0.2:8090 or https://confluence.example.com
+            auth (tuple): tuple of length 2, (username, password)
+            max_concurrency (int): The maximum number of requests in flight at once
+            pool_size (Optional[int]): The number of pooled connections, defaults to max_concurrency
+            max_retries (int): How many times to retry on 429 responses and failed connects, and for
+                every method but POST on dropped connections, timeouts and 5xx responses
+            backoff_factor (float): Exponential backoff factor in seconds between retries
+            timeout (float): Total timeout in seconds for every request
+            cache (Optional[LRUCache]): Cache for space key, page id and attachment id lookups,
+                defaults to a new LRUCache, pass False to disable caching
+            rate_limit (Optional[RateLimiter or float]): A RateLimiter, which can be shared with other clients
+                and threads, or a number of requests per second to limit this client to
+
+        """
+
+        assert isinstance(auth, tuple) and len(auth) == 2, 'auth must be a tuple, (user, password)'
+        assert isinstance(server, str), 'server must be a string to where the server is running'
+        assert isinstance(max_concurrency, int) and max_concurrency > 0, 'max_concurrency must be a positive integer'
+        assert isinstance(max_retries, int) and max_retries >= 0, 'max_retries must be a non negative integer'
+
+        self.server = server
+        self.auth = auth
+        self.base_url = node_url(server)
+        self.api_url = self.base_url + "/rest/api/"
+        credentials = base64.b64encode('{0}:{1}'.format(*auth).encode('latin-1')).decode('ascii')
+        self.headers = {'Accept':'application/json', 'Content-Type':'application/json'}
+        self._auth_header = {'Authorization': 'Basic ' + credentials}
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size or max_concurrency
+        self.cache = LRUCache() if cache is None else (None if cache is False else cache)
+        self.rate_limiter = RateLimiter(rate_limit) if isinstance(rate_limit, (int, float)) else rate_limit
+        self.session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+
+    async def __aenter__(self):
+        if not await self.verify():
+            await self.close()
+            raise PermissionError("Couldn't connect to Confluence API with those credentials or server address")
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+    async def close(self):
+        """Closes every pooled connection to the server"""
+
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+    def _get_session(self):
+        """
+        Returns:
+            session (aiohttp.ClientSession): The session shared by every request, created on first use
+
+        """
+
+        if self.session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError('AsyncConfluence requires aiohttp, install it with pip install confluenceapi[async]')
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                headers=self._auth_header,
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+
+    async def _request(self, method, url, **kwargs):
+        """
+        Arguments:
+            method (str): The http method eg 'GET', 'POST'
+            url (str): The full url to send the request to
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request with its body already read
+
+        """
+
+        import aiohttp
+
+        session = self._get_session()
+        kwargs.setdefault('headers', self.headers)
+        data_factory = kwargs.pop('data_factory', None)
+        # A POST that failed after reaching the server may still have created a page or attachment version
+        idempotent = method.upper() in ('GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS')
+
+        for attempt in range(self.max_retries + 1):
+            if data_factory is not None:
+                kwargs['data'] = data_factory()
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            async with self._semaphore:
+                try:
+                    async with session.request(method, url, **kwargs) as response:
+                        await response.read()
+                except aiohttp.ClientConnectorError:
+                    # The connection was never made so nothing reached the server, any method can be retried
+                    if attempt == self.max_retries:
+                        raise
+                    response = None
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt == self.max_retries or not idempotent:
+                        raise
+                    response = None
+            
+            throttled = response is not None and response.status in (429, 503)
+            if self.rate_limiter is not None and response is not None:
+                if throttled:
+                    self.rate_limiter.throttle(parse_retry_after(response.headers.get('Retry-After')))
+                else:
+                    self.rate_limiter.success()
+            retry = response is None or response.status == 429 or (response.status >= 500 and idempotent)
+            if not retry or attempt == self.max_retries:
+                return response
+            if not throttled or self.rate_limiter is None:
+                retry_after = parse_retry_after(response.headers.get('Retry-After')) if throttled else None
+                await asyncio.sleep(retry_after if retry_after is not None else self.backoff_factor * (2 ** attempt))
+
+
+    async def verify(self):
+        """
+        Checks the credentials against the server, a warning is logged when they are rejected
+
+        Returns:
+            valid (bool): Whether the server could be reached with these credentials
+
+        """
+
+        response = await self._request('GET', self._search_url('user=' + self.auth[0]) + '&limit=1')
+        if response.status != 200:
+            logger.warning("Couldn't connect to Confluence API with those credentials or server address, the server answered %s",
+                           response.status)
+        return response.status == 200
+
+
+    def _search_url(self, cql):
+        """
+        Arguments:
+            cql (str): The CQL query
+
+        Returns:
+            url (str): The content search url for the query, quoted
+
+        """
+
+        return self.api_url + 'content/search?cql=' + quote(cql)
+
+
+    async def delete_page(self, page_name, space_name, **kwargs):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request
+
+        """
+
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+
+        space_key = await self._get_space_key(space_name, space_name_as_key)
+        pageid = await self._get_pageid(page_name, space_name, space_name_as_key)
+
+        response = await self._request('DELETE', self.api_url + 'content/' + str(pageid))
+        if response.status in (200, 204, 404):
+            self._cache_delete(('page', space_key, page_name))
+        return response
+
+
+    async def update_page(self, page_name, space_name, body, **kwargs):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            body (str): A string full of html to populate the page with
+            max_conflict_retries (int): How many times to refetch the version and retry on a 409 conflict
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request
+
+        """
+
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(body, str), 'body should be a string full of html to populate the page with'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        max_conflict_retries = kwargs.pop('max_conflict_retries', 3)
+
+        pageid = await self._get_pageid(page_name, space_name, space_name_as_key)
+
+        page_info = await self._get_version(pageid)
+        if page_info.status == 404:
+            # The cached page id is stale, the page was removed or recreated elsewhere
+            self._cache_delete(('page', await self._get_space_key(space_name, space_name_as_key), page_name))
+            pageid = await self._get_pageid(page_name, space_name, space_name_as_key)
+            page_info = await self._get_version(pageid)
+        page_info_dict = await self._json(page_info)
+
+        for attempt in range(max_conflict_retries + 1):
+            new_data = {
+                'id': pageid,
+                'type':'page',
+                'title': page_info_dict['title'],
+                'space': {'key':page_info_dict['_expandable']['space'].rsplit('/', 1)[-1]},
+                'body': {"storage":{"value":body,"representation":"storage"}},
+                'version':{'number':page_info_dict['version']['number']+1}
+            }
+            data = json.dumps(new_data)
+
+            response = await self._request('PUT', self.api_url + 'content/' + str(pageid), data=data)
+            if response.status != 409 or attempt == max_conflict_retries:
+                return response
+
+            # Someone else saved a new version in the meantime, build on top of theirs
+            page_info = await self._get_version(pageid)
+            if not page_info.ok:
+                return response
+            page_info_dict = await self._json(page_info)
+
+
+    async def upload_attachment(self, filepath, page_name, space_name, comment=None, **kwargs):
+        """
+        Arguments:
+            filepath (str): The path to where the file is stored
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            comment (Optional[str]): A comment to accompany the attachment
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request
+
+        """
+
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(filepath, str), 'filepath should be the path to where the file is stored locally'
+        assert isinstance(comment, str) or comment is None, 'comment must be a string or None'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+
+        pageid = await self._get_pageid(page_name, space_name, space_name_as_key)
+
+        response = await self._post_file(self.api_url + 'content/' + str(pageid) + '/child/attachment',
+                                         filepath, comment)
+        if response.status == 200:
+            for result in json.loads(await response.text())['results']:
+                self._cache_set(('attachment', pageid, result['title']), result['id'])
+        return response
+
+
+    async def update_attachment(self, filepath, page_name, space_name, comment=None, **kwargs):
+        """
+        Arguments:
+            filepath (str): The path to where the file is stored
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            comment (Optional[str]): A comment to accompany the attachment
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request
+
+        """
+
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(filepath, str), 'filepath should be the path to where the file is stored locally'
+        assert isinstance(comment, str) or comment is None, 'comment must be a string or None'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+
+        pageid = await self._get_pageid(page_name, space_name, space_name_as_key)
+
+        attachment_name = os.path.basename(filepath)
+        attachmentid = await self._get_attachmentid(attachment_name, pageid)
+        if attachmentid is None:
+            raise ValueError('Attachment {name} not found on the page, use upload_attachment to add it'.format(name=attachment_name))
+
+        response = await self._post_file(self.api_url + 'content/' + str(pageid) + '/child/attachment/' + attachmentid + '/data',
+                                         filepath, comment)
+        return response
+
+
+    async def delete_attachment(self, attachment_name, page_name, space_name, **kwargs):
+        """
+        Arguments:
+            attachment_name (str): The name of the stored attachment
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request
+
+        """
+
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(attachment_name, str), 'attachment_name should be the name of the attachemt to delete'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+
+        pageid = await self._get_pageid(page_name, space_name, space_name_as_key)
+        attachmentid = await self._get_attachmentid(attachment_name, pageid)
+        if attachmentid is None:
+            raise ValueError('Attachment {name} not found on the page'.format(name=attachment_name))
+        response = await self._request('DELETE', self.api_url + 'content/' + attachmentid)
+
+        self._cache_delete(('attachment', pageid, attachment_name))
+        return response
+
+
+    async def get_page_contents(self, page_name, space_name, **kwargs):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+
+        Returns:
+            contents (str): The contents of the given page
+
+        """
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+
+        pageid = await self._get_pageid(page_name, space_name, space_name_as_key)
+
+        response = await self._request('GET', self.base_url + '/plugins/viewstorage/viewpagestorage.action?pageId=' + str(pageid))
+        return await response.text()
+
+
+    async def add_page(self, title, space_name, parent_page_name=None, body="", **kwargs):
+        """
+        Arguments:
+            title (str): The title of the page to make
+            space_name (str): The space name where the page is stored
+            parent_page_name (str): The name of the parent page for the new page to be stored beneath
+            body (str): The body text for the new page
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request
+
+        """
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+
+        space_key = await self._get_space_key(space_name, space_name_as_key)
+        payload = {
+           "type":"page",
+           "title":title,
+           "space":{"key":space_key},
+           "body":{
+                    "storage":{
+                    "value":body,
+                    "representation":"storage"
+                  }
+               }
+            }
+
+        if parent_page_name:
+            parent_page_id = await self._get_pageid(parent_page_name, space_name, space_name_as_key)
+            payload["ancestors"] = [{"id":parent_page_id}]
+
+        data = json.dumps(payload)
+
+        response = await self._request('POST', self.api_url + 'content/', data=data)
+        if response.status == 200:
+            self._cache_set(('page', space_key, title), int(json.loads(await response.text())['id']))
+        return response
+
+
+    async def _post_file(self, url, filepath, comment):
+        """
+        Arguments:
+            url (str): The attachment endpoint to post the file to
+            filepath (str): The path to where the file is stored
+            comment (Optional[str]): A comment to accompany the attachment
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request
+
+        """
+
+        import aiohttp
+
+        handles = []
+
+        def form():
+            # A form can only be sent once so each retry gets a fresh one
+            data = aiohttp.FormData()
+            handle = open(filepath, 'rb')
+            handles.append(handle)
+            data.add_field('file', handle, filename=os.path.basename(filepath))
+            if comment:
+                data.add_field('comment', comment)
+            return data
+
+        try:
+            return await self._request('POST', url, headers={"X-Atlassian-Token": "nocheck"}, data_factory=form)
+        finally:
+            for handle in handles:
+                handle.close()
+
+
+    async def _get_version(self, pageid):
+        """
+        Arguments:
+            pageid (int): The page id for the confluence page
+
+        Returns:
+            response (aiohttp.ClientResponse): The response from the api request
+
+        """
+
+        assert isinstance(pageid, int), 'pageid should be an integer which corresponds to a page on the confluence server'
+
+        response = await self._request('GET', self.api_url + 'content/' + str(pageid) + '?expand=version')
+        return response
+
+
+    async def _get_pageid(self, page_name, space_name, space_name_as_key):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+
+        Returns:
+            pageid (int): The pageid for the given page_name and space_name
+
+        """
+
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+
+        space_key = await self._get_space_key(space_name, space_name_as_key)
+        pageid = self._cache_get(('page', space_key, page_name))
+        if pageid is not None:
+            return pageid
+
+        response = await self._request('GET', self.api_url + 'content?title=' + quote(page_name) + '&spaceKey=' + space_key)
+        results = (await self._json(response))['results']
+
+        if len(results) != 0:
+            pageid = int(results[0]['id'])
+            self._cache_set(('page', space_key, page_name), pageid)
+            return pageid
+        raise ValueError('Page not found, has it been deleted or is it in a differant space?')
+
+
+    async def _get_space_key(self, space_name, space_name_as_key):
+        """
+        Arguments:
+            space_name (str): The space name you want the key for
+            space_name_as_key (bool): Whether to force using the name as the key
+
+        Returns:
+            spacekey (str): The spacekey for the given space_name
+
+        """
+
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(space_name_as_key, bool), 'space_name_as_key should be a boolean value whether to use the space_name param but pass the key'
+
+        space_key = self._cache_get(('space', space_name, space_name_as_key))
+        if space_key is not None:
+            return space_key
+
+        if space_name_as_key:
+            space_key = space_name
+            response = await self._request('GET', self.api_url + 'space?spaceKey={space_key}'.format(space_key=space_key))
+            if len((await self._json(response))['results']) != 1:
+                raise ValueError('space_key: {space_key} doesnt exist'.format(space_key=space_key))
+            self._cache_set(('space', space_name, space_name_as_key), space_key)
+            return space_key
+
+        cql = 'space.title ~ "{name}"'.format(name=space_name.replace('"', '\\"'))
+        response = await self._request('GET', self._search_url(cql) + '&limit=1')
+        results = (await self._json(response))['results']
+
+        if len(results) == 1:
+            space_key = results[0]['_expandable']['space'].rsplit('/', 1)[-1]
+            self._cache_set(('space', space_name, space_name_as_key), space_key)
+            return space_key
+        elif len(results) > 1:
+            raise ValueError('Duplicate space names found please use the spacekey')
+        else:
+            raise ValueError('Space not found, has it been deleted or is it called something else?')
+
+
+    async def _get_attachmentid(self, attachment_name, pageid):
+        """
+        Arguments:
+            attachment_name (str): The name of the file attachment
+            pageid (int): The pageid where the attachment is stored
+
+        Returns:
+            attachmentid (Optional[str]): The attachmentid for the given attachment_name on the given pageid,
+                None when the page has no attachment of that name
+
+        """
+
+        assert isinstance(pageid, int), 'pageid should be the pageid of the requred page'
+        assert isinstance(attachment_name, str), 'attachment_name should be a file name that is stored in the page and space'
+
+        attachmentid = self._cache_get(('attachment', pageid, attachment_name))
+        if attachmentid is not None:
+            return attachmentid
+
+        url = self.api_url + 'content/' + str(pageid) + '/child/attachment'
+        while url is not None:
+            data = await self._json(await self._request('GET', url))
+            for result in data['results']:
+                self._cache_set(('attachment', pageid, result['title']), result['id'])
+                if result['title'] == attachment_name:
+                    return result['id']
+            links = data.get('_links', {})
+            url = self.base_url + links['next'] if 'next' in links else None
+        return None
+
+
+    async def _json(self, response):
+        """
+        Arguments:
+            response (aiohttp.ClientResponse): A response from the api, with its body already read
+
+        Returns:
+            data (object): The parsed json body, an aiohttp.ClientResponseError is raised for error
+                responses instead of failing to parse them
+
+        """
+
+        response.raise_for_status()
+        return json.loads(await response.text())
+
+
+    def _cache_get(self, key):
+        return None if self.cache is None else self.cache.get(key)
+
+
+    def _cache_set(self, key, value):
+        if self.cache is not None:
+            self.cache.set(key, value)
+
+
+    def _cache_delete(self, key):
+        if self.cache is not None:
+            self.cache.delete(key)
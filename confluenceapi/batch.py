@@ -0,0 +1,132 @@
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class PublishResult(namedtuple('PublishResult', ['title', 'action', 'pageid', 'response', 'error', 'attachments'])):
+    """
+        The outcome of publishing one page in a batch
+
+        Attributes:
+            title (str): The title of the page
+            action (str): One of 'created', 'updated' or 'failed'
+            pageid (Optional[int]): The id of the page, None if it could not be published
+            response (Optional[requests.models.Response]): The response from the create or update request
+            error (Optional[Exception]): What went wrong when action is 'failed'
+            attachments (dict): The response for every attachment uploaded, keyed by file name
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class AttachmentResult(namedtuple('AttachmentResult', ['name', 'action', 'attachmentid', 'response', 'error'])):
+    """
+        The outcome of uploading one file with upload_attachments
+
+        Attributes:
+            name (str): The name of the attachment
+            action (str): One of 'created', 'updated', 'unchanged' or 'failed'
+            attachmentid (Optional[str]): The id of the attachment, None if it could not be uploaded
+            response (Optional[requests.models.Response]): The response from the request the file was sent in,
+                shared by every file sent in the same batch, None when nothing was sent
+            error (Optional[Exception]): What went wrong when action is 'failed'
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class TreeResult(namedtuple('TreeResult', ['title', 'action', 'pageid', 'response', 'error'])):
+    """
+        The outcome for one page of delete_tree, copy_tree or move_tree
+
+        Attributes:
+            title (str): The title of the page
+            action (str): One of 'deleted', 'copied', 'moved', 'planned' for a dry run or 'failed'
+            pageid (Optional[int]): The id of the page, for a copy the id of the new page
+            response (Optional[requests.models.Response]): The response from the request for the page
+            error (Optional[Exception]): What went wrong when action is 'failed'
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class DependencyFailed(Exception):
+    """Raised for a task that was not run because a task it depends on failed"""
+
+
+def run_ordered(tasks, dependencies, max_workers=8, progress=None):
+    """
+    Runs tasks on a thread pool, starting each one as soon as every task it depends on has finished
+
+    Arguments:
+        tasks (OrderedDict): Callables keyed by name, each called with a dict of its dependencies' results
+        dependencies (dict): The names each task has to wait for, keyed by task name
+        max_workers (int): The maximum number of tasks to run at once
+        progress (Optional[callable]): Called with (name, result, error) as every task finishes,
+            including those skipped because a dependency failed
+
+    Returns:
+        outcomes (OrderedDict): (result, error) for every task in the order they were given,
+            tasks whose dependencies failed are not run and get a DependencyFailed error
+
+    """
+
+    assert isinstance(max_workers, int) and max_workers > 0, 'max_workers must be a positive integer'
+
+    waiting = dict((name, set(dep for dep in dependencies.get(name, ()) if dep in tasks)) for name in tasks)
+    dependants = dict((name, []) for name in tasks)
+    for name, deps in waiting.items():
+        for dep in deps:
+            dependants[dep].append(name)
+
+    outcomes = {}
+    running = {}
+
+    def finish(name, result, error):
+        outcomes[name] = (result, error)
+        if progress is not None:
+            progress(name, result, error)
+        ready = []
+        for child in dependants[name]:
+            if child in outcomes:
+                continue
+            if error is not None:
+                finish(child, None, DependencyFailed('{name} was not run because {dep} failed'.format(name=child, dep=name)))
+                continue
+            waiting[child].discard(name)
+            if not waiting[child]:
+                ready.append(child)
+        for child in ready:
+            submit(child)
+
+    def submit(name):
+        results = dict((dep, outcomes[dep][0]) for dep in dependencies.get(name, ()) if dep in outcomes)
+        running[executor.submit(tasks[name], results)] = name
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for name in tasks:
+            if not waiting[name] and name not in outcomes:
+                submit(name)
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                finish(name, None if error else future.result(), error)
+
+    for name in tasks:
+        if name not in outcomes:
+            # Only reachable through a dependency cycle
+            outcomes[name] = (None, DependencyFailed('{name} is part of a dependency cycle'.format(name=name)))
+    return OrderedDict((name, outcomes[name]) for name in tasks)
@@ -0,0 +1,182 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from confluenceapi.pagebuilder import ConfluencePageBuilder
+
+
+class RenderResult(namedtuple('RenderResult', ['key', 'html', 'error'])):
+    """
+        The outcome of rendering one job with render_many
+
+        Attributes:
+            key (object): The key the job was given with, eg the title of the page
+            html (Optional[str]): The rendered storage format html, None if rendering failed
+            error (Optional[Exception]): What went wrong, including jobs that couldn't be pickled
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class BuilderRecipe(object):
+    """
+        Records ConfluencePageBuilder calls so a page can be built in another process. A recipe
+        only holds the arguments, so it pickles as long as they do, while a builder holds the
+        compiled templates and can't be sent to a worker.
+
+        .. code-block:: python
+
+          from confluenceapi.batchrender import BuilderRecipe, render_many
+
+          def recipes(customers):
+              for customer in customers:
+                  recipe = BuilderRecipe()
+                  recipe.add_title(customer.name, 'h2')
+                  recipe.add_table(customer.orders)
+                  recipe.add_chart(customer.revenue, 'line', max_points=500)
+                  yield customer.name, recipe
+
+          for result in render_many(recipes(customers), max_workers=8, max_in_flight=32):
+              print(result.key, len(result.html) if result.ok else result.error)
+    """
+
+    def __init__(self, steps=None):
+        """
+        Arguments:
+            steps (Optional[list]): (method name, args, kwargs) of every builder call so far
+
+        """
+
+        self.steps = list(steps or [])
+
+
+    def __getattr__(self, name):
+        # Only the builder's add_ methods are recorded, everything else is a normal missing attribute
+        if not name.startswith('add_') or not callable(getattr(ConfluencePageBuilder, name, None)):
+            raise AttributeError("'BuilderRecipe' object has no attribute {name!r}".format(name=name))
+
+        def record(*args, **kwargs):
+            self.steps.append((name, args, kwargs))
+            return self
+        return record
+
+
+    def __len__(self):
+        return len(self.steps)
+
+
+    def build(self, templates=None):
+        """
+        Arguments:
+            templates (Optional[TemplateRegistry]): Where to find compiled components, defaults to the shared registry
+
+        Returns:
+            builder (ConfluencePageBuilder): A builder with every recorded call made on it
+
+        """
+
+        builder = ConfluencePageBuilder(templates)
+        for name, args, kwargs in self.steps:
+            getattr(builder, name)(*args, **kwargs)
+        return builder
+
+
+    def render(self):
+        """
+        Returns:
+            html (str): The page the recipe builds
+        """
+
+        return self.build().render()
+
+
+def render_job(job):
+    """
+    Renders one job, runs in the worker processes
+
+    Arguments:
+        job (object): A BuilderRecipe, or a function taking no arguments (eg a functools.partial of a
+            module level function) returning html, a ConfluencePageBuilder or a BuilderRecipe
+
+    Returns:
+        html (str): The rendered storage format html
+
+    """
+
+    page = job.render() if isinstance(job, BuilderRecipe) else job()
+    if isinstance(page, (BuilderRecipe, ConfluencePageBuilder)):
+        page = page.render()
+    assert isinstance(page, str), 'a job should render to a string of html, a ConfluencePageBuilder or a BuilderRecipe'
+    return page
+
+
+def render_many(jobs, max_workers=None, max_in_flight=None, initializer=None, initargs=(), held=None, ordered=False):
+    """
+    Renders jobs across a pool of processes and yields every page as soon as it is done. Jobs are
+    read from the iterable lazily and at most max_in_flight are pickled, rendering or waiting to be
+    taken at once, so a generator of jobs keeps memory bounded however many pages there are.
+
+    Every job is pickled to its worker, so a function that loads its own data (eg a functools.partial
+    of a module level function taking the customer id) ships far less than a recipe holding DataFrames.
+    Templates registered with registry.register at runtime only exist in worker processes started
+    by fork, register them in a module the workers import or in the initializer instead.
+
+    Arguments:
+        jobs (iterable): (key, job) pairs, job is anything render_job takes, it and its result must pickle
+        max_workers (Optional[int]): How many processes to render with, defaults to the number of cpus
+        max_in_flight (Optional[int]): The most jobs submitted and not yet yielded, defaults to twice max_workers
+        initializer (Optional[callable]): Called in every worker process as it starts
+        initargs (tuple): The arguments for initializer
+        held (Optional[callable]): Returns how many yielded results the caller is still holding, eg pages
+            waiting to be published, they count towards max_in_flight, except that one job is always kept
+            running so the caller has to let some go before taking the next result to stay within it
+        ordered (bool): Yield results in the order the jobs were given instead of as they finish, a
+            finished job waiting on an earlier one still counts towards max_in_flight
+
+    Yields:
+        result (RenderResult): Every job's html or error, in the order they finish unless ordered is True
+
+    """
+
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * max_workers
+    assert isinstance(max_workers, int) and max_workers > 0, 'max_workers must be a positive integer'
+    assert isinstance(max_in_flight, int) and max_in_flight > 0, 'max_in_flight must be a positive integer'
+
+    jobs = iter(jobs)
+    running = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs) as executor:
+
+        def submit_next():
+            for key, job in jobs:
+                running[executor.submit(render_job, job)] = key
+                return True
+            return False
+
+        def fill():
+            # A caller holding max_in_flight results would stop everything, so one job always runs
+            while (not running or len(running) + (held() if held is not None else 0) < max_in_flight) and submit_next():
+                pass
+
+        try:
+            fill()
+            while running:
+                if ordered:
+                    # Jobs are kept in the order they were submitted, wait for the oldest
+                    done = [next(iter(running))]
+                    wait(done)
+                else:
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    error = future.exception()
+                    yield RenderResult(key, None if error is not None else future.result(), error)
+                    fill()
+        finally:
+            # The caller stopped early, don't start rendering anything that was still queued
+            for future in running:
+                future.cancel()
@@ -0,0 +1,119 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+        A thread safe in-process cache with LRU eviction and a per entry time to live.
+
+        Any object with the same ``get``, ``set``, ``delete`` and ``clear`` methods can be
+        passed to :class:`confluenceapi.Confluence` as its ``cache`` instead.
+
+        .. code-block:: python
+
+          from confluenceapi import Confluence, LRUCache
+
+          cache = LRUCache(maxsize=5000, ttl=600)
+          lc = Confluence(conf_server, credentials, cache=cache)
+
+          lc.update_page('Page about DS', 'Data Science', '<p>First</p>')
+          lc.update_page('Page about DS', 'Data Science', '<p>Second</p>')  # No space or page lookup
+
+          cache.stats()  # {'hits': 2, 'misses': 2, 'evictions': 0, 'size': 2}
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        """
+        Arguments:
+            maxsize (int): The maximum number of entries to hold before evicting the least recently used
+            ttl (float): How many seconds an entry stays valid for, None to never expire
+
+        """
+
+        assert isinstance(maxsize, int) and maxsize > 0, 'maxsize must be a positive integer'
+        assert ttl is None or ttl > 0, 'ttl must be a positive number of seconds or None'
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key, default=None):
+        """
+        Arguments:
+            key (hashable): The key to look up
+            default (object): What to return when the key is missing or expired
+
+        Returns:
+            value (object): The cached value or default
+
+        """
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+
+    def set(self, key, value):
+        """
+        Arguments:
+            key (hashable): The key to store the value under
+            value (object): The value to store
+
+        """
+
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+
+    def delete(self, key):
+        """
+        Arguments:
+            key (hashable): The key to remove, missing keys are ignored
+
+        """
+
+        with self._lock:
+            self._data.pop(key, None)
+
+
+    def clear(self):
+        """Removes every entry and resets the counters"""
+
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+    def stats(self):
+        """
+        Returns:
+            stats (dict): The hits, misses, evictions and current size of the cache
+
+        """
+
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'size': len(self._data)}
+
+
+    def __len__(self):
+        return len(self._data)
@@ -1,6 +1,50 @@
 import os
+import time
 import requests
 import json
+import hashlib
+import logging
+import tempfile
+import functools
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib3.util.retry import Retry
+from confluenceapi.batch import AttachmentResult, PublishResult, TreeResult, run_ordered
+from confluenceapi.cache import LRUCache
+from confluenceapi.cluster import NodePool, NoHealthyNode, node_url, not_sent
+from confluenceapi.jsonstream import expand_for, iter_items, record_type
+from confluenceapi.metrics import MetricsCollector
+from confluenceapi.mirror import SpaceMirror
+from confluenceapi.ratelimit import RateLimiter, parse_retry_after
+from confluenceapi.streaming import JSONStream, MultipartEncoder
+from confluenceapi.sync import SyncResult, content_digest, rewindable
+
+
+logger = logging.getLogger(__name__)
+
+
+def instrumented(operation):
+    """
+    Labels every request a client method makes with the name of the operation, the innermost
+    instrumented method wins so hidden lookups can be told apart from the writes they are for
+
+    Arguments:
+        operation (str): The name requests made by the method are recorded under
+
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._instrument(operation):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
 
 class Confluence(object):
     
@@ -40,354 +84,2298 @@ class Confluence(object):
         
           # Delete an attachment on page
           lc.delete_attachment('demo.txt', 'Page about DS', 'Data Science')
+
+          # Reuse pooled keep-alive connections for a whole job and close them afterwards
+          with Confluence(conf_server, credentials, pool_size=20, max_retries=5) as lc:
+              lc.update_page('Page about DS', 'Data Science', '<p>Nightly numbers</p>')
+
+          # See which round trips a job spends its time on
+          metrics = MetricsCollector()
+          lc = Confluence(conf_server, credentials, metrics=metrics)
+          lc.add_hook('post_request', lambda event: print(event['operation'], event['status'], event['elapsed']))
+
+          # Spread requests across the nodes of a cluster, failing GETs over to a healthy node
+          lc = Confluence(['https://node1.example.com', 'https://node2.example.com'], credentials)
     """
     
     
-    def __init__(self, server, auth):
+    def __init__(self, server, auth, pool_size=10, max_retries=3, backoff_factor=0.5, timeout=(5, 60),
+                 cache=None, manifest=None, page_cache=None, rate_limit=None, max_throttle_retries=5,
+                 metrics=None, hooks=None, check_credentials=True, tls_verify=True):
         """
         Arguments:
-            server (str): where the server is running eg: 172.17.0.2:8090
+            server (str, list or NodePool): where the server is running eg: 172.17.0.2:8090 or
+                https://confluence.example.com, or every node of a cluster to spread requests across
             auth (tuple): tuple of length 2, (username, password)
+            pool_size (int): The number of keep-alive connections kept open to the server
+            max_retries (int): How many times to retry on connection errors and 500, 502 and 504 responses,
+                on a cluster this is per node before a GET is sent to the next one, and a node that can't
+                be connected to isn't retried at all, the request goes straight to the next node
+            backoff_factor (float): Exponential backoff factor in seconds between retries
+            timeout (float or tuple): Timeout in seconds for every request, or a (connect, read) tuple
+            cache (Optional[LRUCache]): Cache for space key, page id and attachment id lookups,
+                defaults to a new LRUCache, pass False to disable caching
+            manifest (Optional[Manifest]): Local record of content written with sync=True, without one
+                sync compares against the content on the server
+            page_cache (Optional[DiskPageCache]): Persistent cache of page bodies for get_page_contents,
+                revalidated against the page version on every call
+            rate_limit (Optional[RateLimiter or float]): A RateLimiter, which can be shared between clients,
+                or a number of requests per second to limit this client to
+            max_throttle_retries (int): How many times to wait and retry a request the server throttled (429 or 503),
+                a POST is only retried when the response has a Retry-After header
+            metrics (Optional[MetricsCollector]): Records the latency, status and bytes of every request
+                by operation and endpoint
+            hooks (Optional[dict]): Callables to run around every request keyed by event, 'pre_request'
+                or 'post_request', see add_hook
+            check_credentials (bool): Check the credentials just before the first request and raise a
+                PermissionError when they are rejected, no request is made while constructing the client,
+                call verify() to check them up front
+            tls_verify (bool or str): Whether to check the server's TLS certificate, or the path to a CA bundle
+                to check it against
         
         """
         
-        assert isinstance(auth, tuple) and len(auth) is 2, 'auth must be a tuple, (user, password)'
-        assert isinstance(server, str), 'server must be a string to where the server is running'
+        assert isinstance(auth, tuple) and len(auth) == 2, 'auth must be a tuple, (user, password)'
+        assert isinstance(server, (str, list, tuple, NodePool)), \
+            'server must be a string to where the server is running, a list of them or a NodePool'
+        assert isinstance(pool_size, int) and pool_size > 0, 'pool_size must be a positive integer'
+        assert isinstance(max_retries, int) and max_retries >= 0, 'max_retries must be a non negative integer'
         
-        self.server = server
         self.auth = auth
-        self.api_url = "http://{server}/rest/api/".format(server=server)
+        if isinstance(server, str):
+            self.nodes, self._owns_nodes = None, False
+            self.base_url = node_url(server)
+        else:
+            self.nodes, self._owns_nodes = (server, False) if isinstance(server, NodePool) else (NodePool(server), True)
+            server = self.nodes.nodes[0].base_url
+            # Urls are built against the first node and moved onto whichever node each request is sent to
+            self.base_url = server
+        self.server = server
+        self.api_url = self.base_url + "/rest/api/"
         self.headers = {'Accept':'application/json', 'Content-Type':'application/json'}
+        self.timeout = timeout
+        self.manifest = manifest
+        self.page_cache = page_cache
+        self.rate_limiter = RateLimiter(rate_limit) if isinstance(rate_limit, (int, float)) else rate_limit
+        self.max_throttle_retries = max_throttle_retries
+        self.session = self._build_session(pool_size, max_retries, backoff_factor)
+        self.session.verify = tls_verify
+        self._check_session = None
+        if self.nodes is not None and self.nodes.session is None:
+            # Health checks get a session of their own with the same tls settings, the client's session
+            # retries with backoff which would hold up the checks on a dead node
+            self._check_session = self.nodes.session = self._build_check_session(tls_verify)
+        self.cache = LRUCache() if cache is None else (None if cache is False else cache)
+        self.metrics = metrics
+        self.hooks = {'pre_request': [], 'post_request': []}
+        self._local = threading.local()
+        for event, event_hooks in (hooks or {}).items():
+            for hook in (event_hooks if isinstance(event_hooks, (list, tuple)) else [event_hooks]):
+                self.add_hook(event, hook)
         
-        self.__verify_user()
+        self._verified = None
+        self._verify_pending = check_credentials
+        self._verify_lock = threading.RLock()
 
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        """Closes every pooled connection to the server, saves the manifest and stops the health checks of nodes it was given as a list"""
         
-    def __verify_user(self):
-        """Verifies that the username is valid"""
-        
-        response = requests.get(url=self.api_url + 'content/search?cql=user=' + self.auth[0], 
-                                headers=self.headers, auth=self.auth)
-        if response.status_code != 200:
-            print("Couldn't connect to Confluence API with those credentials or server address")
-    
-        
-    def delete_page(self, page_name, space_name, **kwargs):
+        self.session.close()
+        if self._check_session is not None:
+            self._check_session.close()
+        if self.manifest is not None:
+            self.manifest.flush()
+        if self._owns_nodes:
+            self.nodes.close()
+
+
+    def verify(self, refresh=False):
         """
+        Checks the credentials against the server, the result is kept so only the first call makes a request
+        and a warning is logged when they are rejected
+
         Arguments:
-            page_name (str): The title of the page
-            space_name (str): The space name where the page is stored
+            refresh (bool): Check again instead of returning the kept result
 
         Returns:
-            response (requests.models.Response): The response from the api request
+            valid (bool): Whether the server could be reached with these credentials
 
         """
         
-        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
-        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
-        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        with self._verify_lock:
+            self._verify_pending = False
+            if self._verified is None or refresh:
+                self._verified = self.__verify_user()
+            return self._verified
+
+
+    def add_hook(self, event, hook):
+        """
+        Arguments:
+            event (str): 'pre_request' to run before every request is sent, where the hook may change
+                event['kwargs'] eg the headers, or 'post_request' to run after every response
+            hook (callable): Called with an event dict of the method, url, endpoint, operation, caller,
+                attempt and kwargs, post_request events also have the response (None if the request
+                failed), status, elapsed seconds, bytes_sent, bytes_received and error
+
+        """
         
-        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
+        assert event in self.hooks, 'event must be one of ' + ', '.join(sorted(self.hooks))
+        assert callable(hook), 'hook must be callable'
+        self.hooks[event].append(hook)
+
+
+    def remove_hook(self, event, hook):
+        """
+        Arguments:
+            event (str): 'pre_request' or 'post_request'
+            hook (callable): A hook previously added for the event
+
+        """
         
-        response = requests.delete(url=self.api_url + 'content/' + str(pageid), headers=self.headers, auth=self.auth)
-        return response
-    
-    
-    def update_page(self, page_name, space_name, body, **kwargs):
+        self.hooks[event].remove(hook)
+
+
+    @contextmanager
+    def _instrument(self, operation):
         """
         Arguments:
-            page_name (str): The title of the page
-            space_name (str): The space name where the page is stored
-            body (str): A string full of html to populate the page with
+            operation (str): The name to record requests made within the block under
+        
+        """
+        
+        stack = self._operations()
+        stack.append(operation)
+        try:
+            yield
+        finally:
+            stack.pop()
+
 
+    def _operations(self):
+        """
         Returns:
-            response (requests.models.Response): The response from the api request
-                         
+            operations (list): The instrumented methods running on this thread, outermost first
+        
         """
         
-        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
-        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
-        assert isinstance(body, str), 'body should be a string full of html to populate the page with'
-        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        stack = getattr(self._local, 'operations', None)
+        if stack is None:
+            stack = self._local.operations = []
+        return stack
+
+
+    def _endpoint(self, url):
+        """
+        Arguments:
+            url (str): The full url of a request
+
+        Returns:
+            endpoint (str): The path relative to the api, or to the server for non api urls, with ids templated
         
-        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
+        """
         
-        page_info = self._get_version(pageid)
-        page_info_dict = json.loads(page_info.text)
+        url = url.split('?', 1)[0]
+        for node in self.nodes or ():
+            if url.startswith(node.base_url + '/'):
+                url = self.base_url + url[len(node.base_url):]
+                break
+        for prefix in (self.api_url, self.base_url + '/'):
+            if url.startswith(prefix):
+                url = url[len(prefix):]
+                break
+        return MetricsCollector.endpoint(url)
+
+
+    def _build_session(self, pool_size, max_retries, backoff_factor):
+        """
+        Arguments:
+            pool_size (int): The number of keep-alive connections kept open to the server
+            max_retries (int): How many times to retry on connection errors and 500, 502 and 504 responses
+            backoff_factor (float): Exponential backoff factor in seconds between retries
+
+        Returns:
+            session (requests.Session): A session shared by every request this client makes
 
-        new_data = {
-            'id': pageid,
-            'type':'page',
-            'title': page_info_dict['title'],
-            'space': {'key':page_info_dict['_expandable']['space'].rsplit('/', 1)[-1]},
-            'body': {"storage":{"value":body,"representation":"storage"}},
-            'version':{'number':page_info_dict['version']['number']+1}
-        }
-        data = json.dumps(new_data)
+        """
         
-        response = requests.put(url=self.api_url + 'content/' + str(pageid), headers=self.headers, auth=self.auth, data=data)
-        return response
+        # On a cluster a node that can't be connected to is failed over from at once rather than retried with backoff
+        connect = 0 if self.nodes is not None and len(self.nodes) > 1 else max_retries
+        # Throttled responses (429 and 503) are left to _request, so the rate limiter backs every thread off
+        # at once and a request isn't retried by both urllib3 and the throttle loop
+        retry = Retry(total=max_retries, connect=connect, read=max_retries, status=max_retries,
+                      backoff_factor=backoff_factor, status_forcelist=(500, 502, 504),
+                      respect_retry_after_header=False, raise_on_status=False)
+        # One connection pool per node, so none of them is dropped to make room for another
+        adapter = HTTPAdapter(pool_connections=max(pool_size, len(self.nodes or ())), pool_maxsize=pool_size,
+                              max_retries=retry)
         
+        session = requests.Session()
+        session.auth = self.auth
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+
+    def _build_check_session(self, tls_verify):
+        """
+        Arguments:
+            tls_verify (bool or str): Whether to check the nodes' TLS certificates, or the path to a CA bundle
+
+        Returns:
+            session (requests.Session): A session for the node health checks that never retries,
+                so a node that is down fails its check at once
+
+        """
         
-    def upload_attachment(self, filepath, page_name, space_name, comment=None, **kwargs):
+        session = requests.Session()
+        session.auth = self.auth
+        session.verify = tls_verify
+        adapter = HTTPAdapter(pool_connections=len(self.nodes), pool_maxsize=1, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+
+    def _cache_get(self, key):
         """
         Arguments:
-            filepath (str): The path to where the file is stored
-            page_name (str): The title of the page
-            space_name (str): The space name where the page is stored
-            comment (Optional[str]): A comment to accompany the attachment
+            key (tuple): The cache key for a space key, page id or attachment id lookup
 
         Returns:
-            response (requests.models.Response): The response from the api request
-            
+            value (object): The cached value or None when missing or caching is disabled
+
         """
         
-        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
-        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
-        assert isinstance(filepath, str), 'filepath should be the path to where the file is stored locally'
-        assert isinstance(comment, str) or comment is None, 'comment must be a string or None'
-        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        if self.cache is None:
+            return None
+        return self.cache.get(key)
+
+
+    def _cache_set(self, key, value):
+        """
+        Arguments:
+            key (tuple): The cache key for a space key, page id or attachment id lookup
+            value (object): The value to cache
+
+        """
         
-        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
-        files = {'file': open(filepath, 'rb')}
-        data = {}
-        headers={"X-Atlassian-Token": "nocheck"}
+        if self.cache is not None:
+            self.cache.set(key, value)
+
+
+    def _cache_delete(self, key):
+        """
+        Arguments:
+            key (tuple): The cache key to invalidate
+
+        """
         
-        if comment:
-            data = {"comment":comment}
+        if self.cache is not None:
+            self.cache.delete(key)
+
+
+    def _request(self, method, url, operation='request', **kwargs):
+        """
+        Arguments:
+            method (str): The http method eg 'GET', 'POST'
+            url (str): The full url to send the request to
+            operation (str): The name to record the request under when it isn't made by an instrumented method
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+
+        """
         
-        response = requests.post(url=self.api_url + 'content/' + str(pageid) + '/child/attachment',
-                                 headers=headers, auth=self.auth, files=files, data=data)
+        if self._verify_pending and not self.verify():
+            raise PermissionError("Couldn't connect to Confluence API with those credentials or server address")
+        kwargs.setdefault('headers', self.headers)
+        kwargs.setdefault('timeout', self.timeout)
+        # Streamed bodies from a one-shot source, eg a file object, can only be sent once so they can't be
+        # retried after a throttled response, bodies from paths and builders are read again
+        data = kwargs.get('data')
+        replayable = data is None or isinstance(data, (str, bytes, dict)) or getattr(data, 'replayable', False)
+        # A POST may have been acted on before the server gave up, it is only sent again when asked to with Retry-After
+        idempotent = method.upper() in ('GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS')
         
-        return response
+        for attempt in range(self.max_throttle_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            response = self._send(method, url, operation, attempt, kwargs)
+            if response.status_code not in (429, 503):
+                if self.rate_limiter is not None:
+                    self.rate_limiter.success()
+                return response
+            
+            # The shared limiter backs every thread off even when this request can't be retried
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if self.rate_limiter is not None:
+                self.rate_limiter.throttle(retry_after)
+            if not replayable or not (idempotent or retry_after is not None) or attempt == self.max_throttle_retries:
+                return response
+            if self.rate_limiter is None:
+                time.sleep(retry_after if retry_after is not None else min(60, 0.5 * 2 ** attempt))
+            response.close()
     
     
-    def update_attachment(self, filepath, page_name, space_name, comment=None, **kwargs):
+    def _send(self, method, url, operation, attempt, kwargs):
         """
+        Sends a single request, on a cluster to the node the pool picks. A GET that fails with a
+        connection error, a timeout or a 5xx response is sent on to the next healthy node, and so is
+        any request that failed before it reached the node eg because the connection was refused
+
         Arguments:
-            filepath (str): The path to where the file is stored
-            page_name (str): The title of the page
-            space_name (str): The space name where the page is stored
-            comment (Optional[str]): A comment to accompany the attachment
+            method (str): The http method eg 'GET', 'POST'
+            url (str): The full url to send the request to
+            operation (str): The name to record the request under when it isn't made by an instrumented method
+            attempt (int): How many times the request has already been throttled
+            kwargs (dict): The keyword arguments for requests.Session.request
 
         Returns:
             response (requests.models.Response): The response from the api request
 
         """
         
-        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
-        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
-        assert isinstance(filepath, str), 'filepath should be the path to where the file is stored locally'
-        assert isinstance(comment, str) or comment is None, 'comment must be a string or None'
-        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        observed = self.metrics is not None or self.hooks['pre_request'] or self.hooks['post_request']
+        send = functools.partial(self._observed_request, operation=operation, attempt=attempt, kwargs=kwargs) \
+            if observed else functools.partial(self.session.request, **kwargs)
+        if self.nodes is None or not url.startswith(self.base_url + '/'):
+            return send(method, url)
         
-        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
+        path = url[len(self.base_url):]
+        idempotent = method.upper() in ('GET', 'HEAD', 'OPTIONS')
+        tried, response, error = [], None, None
+        while True:
+            try:
+                node = self.nodes.acquire(exclude=tried)
+            except NoHealthyNode:
+                if not tried:
+                    raise
+                node = None
+            if node is None:
+                # No other node is left to try, give back what the last one said
+                if error is not None:
+                    raise error
+                return response
+            tried.append(node)
+            if response is not None:
+                response.close()
+            response, error, ok = None, None, None
+            try:
+                response = send(method, node.base_url + path)
+                ok = response.status_code < 500
+            except requests.RequestException as exc:
+                error, ok = exc, False
+            finally:
+                # Anything else went wrong on this side, it says nothing about the node
+                self.nodes.release(node, ok)
+            if error is not None:
+                if not idempotent and not not_sent(error):
+                    raise error
+                continue
+            if ok or not idempotent:
+                return response
+    
+    
+    def _observed_request(self, method, url, operation, attempt, kwargs):
+        """
+        Sends a single request, running the hooks and recording metrics around it
+
+        Arguments:
+            method (str): The http method eg 'GET', 'POST'
+            url (str): The full url to send the request to
+            operation (str): The name to record the request under when it isn't made by an instrumented method
+            attempt (int): How many times the request has already been throttled
+            kwargs (dict): The keyword arguments for requests.Session.request
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+
+        """
         
-        attachment_name = os.path.basename(filepath)
-        attachmentid = self._get_attachmentid(attachment_name, pageid)
+        operations = self._operations()
+        event = {'method': method, 'url': url, 'endpoint': self._endpoint(url),
+                 'operation': operations[-1] if operations else operation,
+                 'caller': operations[0] if operations else operation,
+                 'attempt': attempt, 'kwargs': kwargs}
+        if self.hooks['pre_request']:
+            # The default headers are shared by every request, hooks get their own copy to change
+            kwargs['headers'] = dict(kwargs['headers'])
+        for hook in self.hooks['pre_request']:
+            hook(event)
         
-        files = {'file': open(filepath, 'rb')}
-        data = {}
-        headers={"X-Atlassian-Token": "nocheck"}
+        response, error = None, None
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException as exc:
+            error = exc
+        elapsed = time.perf_counter() - started
         
-        if comment:
-            data = {"comment":comment}
+        data = kwargs.get('data')
+        if isinstance(data, (str, bytes)):
+            bytes_sent = len(data.encode('utf-8') if isinstance(data, str) else data)
+        else:
+            bytes_sent = getattr(data, 'bytes_sent', 0)
+        if response is None:
+            bytes_received = 0
+        elif kwargs.get('stream'):
+            # Reading a streamed body here would load it all into memory
+            bytes_received = int(response.headers.get('Content-Length') or 0)
+        else:
+            bytes_received = len(response.content)
         
-        response = requests.post(url=self.api_url + 'content/' + str(pageid) + '/child/attachment/' + attachmentid + '/data',
-                                 headers=headers, auth=self.auth, files=files, data=data)
+        event.update(response=response, status=response.status_code if response is not None else None,
+                     elapsed=elapsed, bytes_sent=bytes_sent, bytes_received=bytes_received, error=error)
+        if self.metrics is not None:
+            self.metrics.record(event['operation'], event['caller'], method, event['endpoint'], event['status'],
+                                elapsed, bytes_sent, bytes_received)
+        for hook in self.hooks['post_request']:
+            hook(event)
         
+        if error is not None:
+            raise error
         return response
-    
-    def delete_attachment(self, attachment_name, page_name, space_name, **kwargs):
+
+
+    def _json(self, response):
         """
         Arguments:
-            attachment_name (str): The name of the stored attachment
-            page_name (str): The title of the page
-            space_name (str): The space name where the page is stored
+            response (requests.models.Response): A response from the api
 
         Returns:
-            response (requests.models.Response): The response from the api request
-            
+            data (object): The parsed json body, an HTTPError is raised for error responses
+                instead of failing to parse them
+
         """
         
-        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
-        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
-        assert isinstance(attachment_name, str), 'attachment_name should be the name of the attachemt to delete'
-        space_name_as_key = kwargs.pop('space_name_as_key', False)
-        
-        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
-        attachmentid = self._get_attachmentid(attachment_name, pageid)
-        response = requests.delete(url=self.api_url + 'content/' + attachmentid, headers=self.headers, auth=self.auth)
-        
-        return response
-    
-    
-    def _get_version(self, pageid):
+        response.raise_for_status()
+        return self._parse(response)
+
+
+    @staticmethod
+    def _parse(response):
         """
         Arguments:
-            pageid (int): The page id for the confluence page
+            response (requests.models.Response): A response from the api
 
         Returns:
-            response (requests.models.Response): The response from the api request
-            
+            data (object): The parsed json body, decoded straight from the bytes without guessing the
+                charset of the text and kept on the response so every caller shares one parse
+
         """
         
-        assert isinstance(pageid, int), 'pageid should be an integer which corresponds to a page on the confluence server'
+        data = getattr(response, '_parsed_json', None)
+        if data is None:
+            data = response._parsed_json = json.loads(response.content)
+        return data
 
-        response = requests.get(url=self.api_url + 'content/' + str(pageid) + '?expand=version',
-                                headers=self.headers, auth=self.auth)
-        return response
 
+    def _search_url(self, cql):
+        """
+        Arguments:
+            cql (str): The CQL query
+
+        Returns:
+            url (str): The content search url for the query, quoted
+        
+        """
+        
+        return self.api_url + 'content/search?cql=' + quote(cql)
+
+        
+    @instrumented('verify_user')
+    def __verify_user(self):
+        """Verifies that the username is valid"""
+        
+        response = self._request('GET', self._search_url('user=' + self.auth[0]) + '&limit=1')
+        if response.status_code != 200:
+            logger.warning("Couldn't connect to Confluence API with those credentials or server address, the server answered %s",
+                           response.status_code)
+        return response.status_code == 200
     
-    def _get_pageid(self, page_name, space_name, space_name_as_key):
+        
+    @instrumented('delete_page')
+    def delete_page(self, page_name, space_name, **kwargs):
         """
         Arguments:
             page_name (str): The title of the page
             space_name (str): The space name where the page is stored
 
         Returns:
-            pageid (int): The pageid for the given page_name and space_name
-            
+            response (requests.models.Response): The response from the api request
+
         """
         
         assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
         assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
         
-        space_key = self._get_space_key(space_name, space_name_as_key)
-
-        response = requests.get(url=self.api_url + 'content?title=' + page_name.replace(' ', '%20') + '&spaceKey='+ space_key + '&expand=body.storage', headers=self.headers, auth=self.auth)
-        
-        if len(json.loads(response.text)['results']) is not 0:
-            pageid = json.loads(response.text)['results'][0]['id']
-            return int(pageid)
-        raise ValueError('Page not found, has it been deleted or is it in a differant space?')
+        response = self._with_pageid(page_name, space_name, space_name_as_key,
+                                     lambda pageid: self._request('DELETE', self.api_url + 'content/' + str(pageid)))
+        if response.status_code in (200, 204, 404) and self.cache is not None:
+            self._cache_delete(('page', self._get_space_key(space_name, space_name_as_key), page_name))
+        return response
     
     
-    def _get_space_key(self, space_name, space_name_as_key):
+    @instrumented('update_page')
+    def update_page(self, page_name, space_name, body, **kwargs):
         """
         Arguments:
-            space_name (str): The space name you want the key for
-            force_space_name (bool): Whether to force using the name as the key
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            body (str): A string full of html to populate the page with, or a ConfluencePageBuilder or
+                iterable of html fragments to stream into the request without joining them
+            sync (bool): Only write the page when the body differs from the last synced body or the server
+            max_conflict_retries (int): How many times to refetch the version and retry on a 409 conflict,
+                defaults to 3, a one-shot iterator body is never sent twice
 
         Returns:
-            spacekey (str): The spacekey for the given space_name
-            
+            response (requests.models.Response): The response from the api request,
+                or a SyncResult saying whether the page was written when sync is True
+                         
         """
         
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
         assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
-        assert isinstance(space_name_as_key, bool), 'space_name_as_key should be a boolean value whether to use the space_name param but pass the key'
-        
-        if space_name_as_key:
-            space_key = space_name
-            self._verify_space_key(space_key)
-            return space_key
+        assert self._is_body(body), 'body should be a string full of html, a ConfluencePageBuilder or an iterable of html fragments'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        sync = kwargs.pop('sync', False)
+        max_conflict_retries = kwargs.pop('max_conflict_retries', 3)
         
-        space_name_replaced = space_name.replace(' ', '%20')
+        # The id, title, space and version come back together in a single request
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        page_info_dict = self._find_page(page_name, space_key, 'version,space,body.storage' if sync else 'version,space')
+        if page_info_dict is None:
+            raise ValueError('Page not found, has it been deleted or is it in a differant space?')
+        pageid = int(page_info_dict['id'])
         
-        response = requests.get(url=self.api_url + 'content/search?cql=space.title%20%7E%20"' + space_name_replaced + '"&limit=1', headers=self.headers, auth=self.auth)
+        if not sync:
+            return self._put_page(pageid, body, page_info_dict, max_conflict_retries)
         
-        if len(json.loads(response.text)['results']) == 1:
-            space_key = json.loads(response.text)['results'][0]['_expandable']['space'].rsplit('/', 1)[-1]
-            return space_key
-        elif len(json.loads(response.text)['results']) > 1:
-            raise ValueError('Duplicate space names found please use the spacekey')
+        if not self._replayable_body(body):
+            # The body is hashed before it is sent, so fragments from a one-shot iterator are kept
+            body = list(body)
+        entry = self.manifest.get('page:' + str(pageid)) if self.manifest is not None else None
+        digest = content_digest(self._body_fragments(body))
+        if entry is not None:
+            unchanged = entry['digest'] == digest and entry['version'] == page_info_dict['version']['number']
         else:
-            raise ValueError('Space not found, has it been deleted or is it called something else?')
-        
+            unchanged = content_digest(page_info_dict['body']['storage']['value'].encode('utf-8')) == digest
+            if unchanged and self.manifest is not None:
+                self.manifest.set('page:' + str(pageid), digest, page_info_dict['version']['number'])
+        if unchanged:
+            return SyncResult(False, None, digest)
         
-    def _get_attachmentid(self, attachment_name, pageid):
+        response = self._put_page(pageid, body, page_info_dict, max_conflict_retries)
+        if response.ok and self.manifest is not None:
+            self.manifest.set('page:' + str(pageid), digest, self._parse(response)['version']['number'])
+        return SyncResult(True, response, digest)
+    
+    
+    @instrumented('update_page_by_id')
+    def update_page_by_id(self, pageid, body, version=None, title=None, max_conflict_retries=3):
         """
         Arguments:
-            attachment_name (str): The name of the file attachment
-            pageid (str): The pageid where the attachment is stored
+            pageid (int): The page id for the confluence page
+            body (str): A string full of html, a ConfluencePageBuilder or an iterable of html fragments
+            version (Optional[int]): The current version number of the page if already known
+            title (Optional[str]): The current title of the page if already known
+            max_conflict_retries (int): How many times to refetch the version and retry when someone
+                else updated the page first
 
         Returns:
-            attachmentid (str): The attachmentid for the given attachment_name on the given pageid
+            response (requests.models.Response): The response from the api request
 
         """
         
-        assert isinstance(pageid, int), 'pageid should be the pageid of the requred page'
-        assert isinstance(attachment_name, str), 'attachment_name should be a file name that is stored in the page and space'
-        
-        
-        response = requests.get(url=self.api_url + 'content/' + str(pageid) + '/child/attachment',
-                     headers=self.headers, auth=self.auth)
+        assert isinstance(pageid, int), 'pageid should be an integer which corresponds to a page on the confluence server'
+        assert self._is_body(body), 'body should be a string full of html, a ConfluencePageBuilder or an iterable of html fragments'
+        assert isinstance(version, int) or version is None, 'version should be the current version number of the page or None'
+        assert isinstance(title, str) or title is None, 'title should be the current title of the page or None'
         
-        for result in json.loads(response.text)['results']:
-            if result['title'] == attachment_name:
-                return result['id']
+        if version is None or title is None:
+            page_info = self._get_version(pageid, 'version,space')
+            page_info.raise_for_status()
+            page_info_dict = self._parse(page_info)
         else:
-            print('No attachment found')
-            
-    
-    def get_page_contents(self, page_name, space_name, **kwargs):
+            page_info_dict = {'title': title, 'version': {'number': version}}
+        
+        return self._put_page(pageid, body, page_info_dict, max_conflict_retries)
+
+
+    @instrumented('update_section')
+    def update_section(self, page_name, space_name, section_name, body, **kwargs):
         """
         Arguments:
             page_name (str): The title of the page
             space_name (str): The space name where the page is stored
+            section_name (str): The name of a section added with ConfluencePageBuilder.add_section
+            body (str): A string full of html to put in the section, or a ConfluencePageBuilder
+            append (bool): Add the section to the end of the page when it isn't there yet, raise a
+                ValueError instead when False
+            max_conflict_retries (int): How many times to read the page again and patch it on top of
+                someone else's update when they saved a new version first
 
         Returns:
-            contents (str): The contents of the given page
-            
+            result (SyncResult): Whether the page was written, the response and the digest of the
+                section, nothing is written when the section already has this html
+
         """
+        from confluenceapi.sections import section_markers, split_section
+
         assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
         assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(body, str) or hasattr(body, 'render'), 'body should be a string full of html or a ConfluencePageBuilder'
         space_name_as_key = kwargs.pop('space_name_as_key', False)
+        append = kwargs.pop('append', True)
+        max_conflict_retries = kwargs.pop('max_conflict_retries', 3)
+
+        start, end = section_markers(section_name)
+        section = body if isinstance(body, str) else body.render()
+        digest = content_digest(section.encode('utf-8'))
+
+        # The body and version come back together, so each attempt reads the page once
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        page_info_dict = self._find_page(page_name, space_key, 'version,space,body.storage')
+        if page_info_dict is None:
+            raise ValueError('Page not found, has it been deleted or is it in a differant space?')
+        pageid = int(page_info_dict['id'])
+        key = 'section:{pageid}:{name}'.format(pageid=pageid, name=section_name)
+
+        for attempt in range(max_conflict_retries + 1):
+            html = page_info_dict['body']['storage']['value']
+            version = page_info_dict['version']['number']
+            parts = split_section(html, section_name)
+            if parts is None:
+                if not append:
+                    raise ValueError('Section {name} not found on the page'.format(name=section_name))
+                parts = (html, None, '')
+
+            # Confluence can tidy the markup it saves, so the manifest also remembers what was last written
+            entry = self.manifest.get(key) if self.manifest is not None else None
+            if parts[1] == section or (entry is not None and entry['digest'] == digest and entry['version'] == version):
+                return SyncResult(False, None, digest)
+
+            # Only the section is new, the rest of the page is streamed around it without joining a copy
+            response = self._put_page(pageid, [parts[0], start, section, end, parts[2]], page_info_dict, 0)
+            if response.ok and self.manifest is not None:
+                self.manifest.set(key, digest, self._parse(response)['version']['number'])
+            if response.status_code != 409 or attempt == max_conflict_retries:
+                return SyncResult(True, response, digest)
+
+            # Someone else saved a new version in the meantime, patch the section into theirs
+            page_info = self._get_version(pageid, 'version,space,body.storage')
+            if not page_info.ok:
+                return SyncResult(True, response, digest)
+            page_info_dict = self._parse(page_info)
+
+
+    @instrumented('put_page')
+    def _put_page(self, pageid, body, page_info_dict, max_conflict_retries=3, parent_page_id=None):
+        """
+        Arguments:
+            pageid (int): The page id for the confluence page
+            body (str): A string full of html, a ConfluencePageBuilder or an iterable of html fragments
+            page_info_dict (dict): The current page, at least its title and version
+            max_conflict_retries (int): How many times to refetch the version and retry on a 409 conflict,
+                a one-shot iterator body can't be sent again so its conflicts are returned as they are
+            parent_page_id (Optional[int]): The id of the page to move the page beneath, None to leave it where it is
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+
+        """
+
+        for attempt in range(max_conflict_retries + 1):
+            new_data = {
+                'id': pageid,
+                'type':'page',
+                'title': page_info_dict['title'],
+                'version':{'number':page_info_dict['version']['number']+1}
+            }
+            space_key = self._space_key_of(page_info_dict)
+            if space_key is not None:
+                new_data['space'] = {'key':space_key}
+            if parent_page_id is not None:
+                new_data['ancestors'] = [{'id':parent_page_id}]
+            data = self._page_data(new_data, body)
+            
+            response = self._request('PUT', self.api_url + 'content/' + str(pageid), data=data)
+            if response.status_code != 409 or attempt == max_conflict_retries or not self._replayable_body(body):
+                return response
+            
+            # Someone else saved a new version in the meantime, build on top of theirs
+            page_info = self._get_version(pageid, 'version,space')
+            if not page_info.ok:
+                return response
+            page_info_dict = self._parse(page_info)
+    
+    
+    @staticmethod
+    def _is_body(body):
+        """True for a string of html, a ConfluencePageBuilder or an iterable of html fragments"""
+        
+        return isinstance(body, str) or hasattr(body, 'iter_render') or hasattr(body, '__iter__')
+
+
+    @staticmethod
+    def _replayable_body(body):
+        """
+        Arguments:
+            body (object): A string of html, a ConfluencePageBuilder or an iterable of html fragments
+
+        Returns:
+            replayable (bool): Whether the body can be read more than once
+
+        """
+        
+        return isinstance(body, (str, list, tuple)) or hasattr(body, 'iter_render')
+
+
+    @staticmethod
+    def _body_fragments(body):
+        """
+        Arguments:
+            body (object): A string of html, a ConfluencePageBuilder or an iterable of html fragments
+
+        Returns:
+            fragments (iterable): The html fragments of the body, without joining them
+
+        """
+        
+        if isinstance(body, str):
+            return [body]
+        if hasattr(body, 'iter_render'):
+            return body.iter_render()
+        return body
+
+
+    def _page_data(self, payload, body):
+        """
+        Arguments:
+            payload (dict): The page json without its body
+            body (object): A string of html, a ConfluencePageBuilder or an iterable of html fragments
+
+        Returns:
+            data (str or JSONStream): The request body, builders and fragments are streamed in chunks
+                instead of being joined and copied into the json
+
+        """
+        
+        if isinstance(body, str):
+            payload['body'] = {"storage":{"value":body,"representation":"storage"}}
+            return json.dumps(payload)
+        payload['body'] = {"storage":{"value":JSONStream.placeholder,"representation":"storage"}}
+        # A builder or list is rendered again whenever the body is resent, eg when urllib3 retries a 5xx
+        if self._replayable_body(body):
+            return JSONStream(payload, functools.partial(self._body_fragments, body))
+        return JSONStream(payload, self._body_fragments(body))
+
+
+    @staticmethod
+    def _space_key_of(page_info_dict):
+        """
+        Arguments:
+            page_info_dict (dict): A page as returned by the content api
+
+        Returns:
+            space_key (Optional[str]): The key of the space the page is in, None if it isn't included
+
+        """
+        
+        if 'key' in page_info_dict.get('space', {}):
+            return page_info_dict['space']['key']
+        if 'space' in page_info_dict.get('_expandable', {}):
+            return page_info_dict['_expandable']['space'].rsplit('/', 1)[-1]
+        return None
+        
+        
+    @instrumented('upload_attachment')
+    def upload_attachment(self, filepath, page_name, space_name, comment=None, **kwargs):
+        """
+        Arguments:
+            filepath (str): The path to where the file is stored, or a binary file-like object or
+                iterator of bytes to stream the attachment from (then filename is required)
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            comment (Optional[str]): A comment to accompany the attachment
+            filename (Optional[str]): The attachment name, defaults to the base name of filepath
+            chunk_size (Optional[int]): How many bytes to read and send at a time, defaults to 1MB
+            progress (Optional[callable]): Called with (bytes_sent, total_bytes, bytes_per_second) while uploading
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+            
+        """
+        
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(comment, str) or comment is None, 'comment must be a string or None'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        filename = kwargs.pop('filename', None)
+        assert isinstance(filepath, str) or isinstance(filename, str), \
+            'filepath should be the path to where the file is stored locally, or a stream given with a filename'
+        
+        return self._with_pageid(page_name, space_name, space_name_as_key,
+                                 lambda pageid: self._post_attachment(pageid, filepath, comment, filename=filename, **kwargs),
+                                 retry=isinstance(filepath, str))
+    
+    
+    @instrumented('update_attachment')
+    def update_attachment(self, filepath, page_name, space_name, comment=None, **kwargs):
+        """
+        Arguments:
+            filepath (str): The path to where the file is stored, or a binary file-like object or
+                iterator of bytes to stream the attachment from (then filename is required)
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            comment (Optional[str]): A comment to accompany the attachment
+            filename (Optional[str]): The attachment name, defaults to the base name of filepath
+            chunk_size (Optional[int]): How many bytes to read and send at a time, defaults to 1MB
+            progress (Optional[callable]): Called with (bytes_sent, total_bytes, bytes_per_second) while uploading
+            sync (bool): Only upload the file when its content differs from the last synced upload or the server,
+                filepath must then be a path or a seekable file-like object
+
+        Returns:
+            response (requests.models.Response): The response from the api request,
+                or a SyncResult saying whether the file was uploaded when sync is True
+
+        """
+        
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(comment, str) or comment is None, 'comment must be a string or None'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        filename = kwargs.pop('filename', None)
+        sync = kwargs.pop('sync', False)
+        assert isinstance(filepath, str) or isinstance(filename, str), \
+            'filepath should be the path to where the file is stored locally, or a stream given with a filename'
+        
+        attachment_name = filename or os.path.basename(filepath)
+        if not sync:
+            def send(pageid):
+                return self._with_attachmentid(attachment_name, pageid, lambda attachmentid: self._post_attachment(
+                    pageid, filepath, comment, attachmentid, filename=attachment_name, **kwargs), retry=isinstance(filepath, str),
+                    not_found='Attachment {name} not found on the page, use upload_attachment to add it')
+            return self._with_pageid(page_name, space_name, space_name_as_key, send, retry=isinstance(filepath, str))
+        
+        if not (isinstance(filepath, str) or hasattr(filepath, 'read') and rewindable(filepath)):
+            # Hashing a one-shot stream would use it up and leave nothing to upload
+            raise ValueError('sync needs a file path or a seekable file-like object, the content is read twice')
+        digest = content_digest(filepath)
+        
+        def send(pageid):
+            attachment = self._get_attachment(attachment_name, pageid)
+            if attachment is None:
+                raise ValueError('Attachment {name} not found on the page, use upload_attachment to add it'.format(name=attachment_name))
+            key = 'attachment:{pageid}/{name}'.format(pageid=pageid, name=attachment_name)
+            if self._attachment_unchanged(attachment, key, digest, filepath):
+                return SyncResult(False, None, digest)
+            
+            response = self._post_attachment(pageid, filepath, comment, attachment['id'], filename=attachment_name, **kwargs)
+            if response.ok and self.manifest is not None:
+                result = self._parse(response)
+                result = result['results'][0] if 'results' in result else result
+                self.manifest.set(key, digest, result['version']['number'])
+            return SyncResult(True, response, digest)
+        
+        return self._with_pageid(page_name, space_name, space_name_as_key, send, retry=isinstance(filepath, str))
+
+
+    @instrumented('upload_attachments')
+    def upload_attachments(self, filepaths, page_name, space_name, comment=None, **kwargs):
+        """
+        Uploads many files to one page, the page is looked up and its attachments listed once, new files
+        are sent several to a request and attachments already on the page are updated in parallel
+
+        Arguments:
+            filepaths (list): Paths of the files to attach, each attachment is named after the base name of its path
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            comment (Optional[str]): A comment to accompany every attachment
+            batch_size (int): The most new files to send in one request, defaults to 20
+            batch_bytes (int): The most bytes of new files to send in one request, defaults to 50MB,
+                a larger file is sent in a request of its own
+            max_workers (int): How many requests to send at once, defaults to 4
+            sync (bool): Only update attachments whose content differs from the local file
+
+        Returns:
+            results (OrderedDict): An AttachmentResult for every file keyed by attachment name, in the order they were given
+
+        """
+
+        assert isinstance(filepaths, (list, tuple)) and all(isinstance(path, str) for path in filepaths), \
+            'filepaths should be a list of paths to where the files are stored locally'
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(comment, str) or comment is None, 'comment must be a string or None'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        batch_size = kwargs.pop('batch_size', 20)
+        batch_bytes = kwargs.pop('batch_bytes', 50 * 1024 ** 2)
+        max_workers = kwargs.pop('max_workers', 4)
+        sync = kwargs.pop('sync', False)
+        assert isinstance(batch_size, int) and batch_size > 0, 'batch_size must be a positive integer'
+        assert isinstance(max_workers, int) and max_workers > 0, 'max_workers must be a positive integer'
+
+        names = [os.path.basename(path) for path in filepaths]
+        if len(set(names)) != len(names):
+            raise ValueError('Attachment names must be unique within a page')
+
+        pageid, attachments = self._with_pageid(page_name, space_name, space_name_as_key,
+                                                lambda pageid: (pageid, list(self._iter_attachments(pageid, expand='version'))))
+        existing = {}
+        for attachment in attachments:
+            self._cache_set(('attachment', pageid, attachment['title']), attachment['id'])
+            existing[attachment['title']] = attachment
+
+        # New files are packed into batches by count and size, a file bigger than batch_bytes goes alone,
+        # a file that can't be read fails on its own and the others are still uploaded
+        results = {}
+        batches, batch_sizes = [], []
+        for name, path in zip(names, filepaths):
+            if name in existing:
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError as error:
+                results[name] = AttachmentResult(name, 'failed', None, None, error)
+                continue
+            if not batches or len(batches[-1]) >= batch_size or batch_sizes[-1] + size > batch_bytes:
+                batches.append([])
+                batch_sizes.append(0)
+            batches[-1].append((name, path))
+            batch_sizes[-1] += size
+
+        def manifest_key(name):
+            return 'attachment:{pageid}/{name}'.format(pageid=pageid, name=name)
+
+        @instrumented('upload_attachments')
+        def create(client, batch):
+            digests = dict((name, content_digest(path)) for name, path in batch) if sync and client.manifest is not None else {}
+            response = client._post_attachments(pageid, batch, comment)
+            if not response.ok:
+                error = ValueError('Failed to upload attachments, the server answered {status}'.format(status=response.status_code))
+                return [AttachmentResult(name, 'failed', None, response, error) for name, _ in batch]
+            created = dict((result['title'], result) for result in client._parse(response)['results'])
+            results = []
+            for name, _ in batch:
+                if name not in created:
+                    results.append(AttachmentResult(name, 'failed', None, response, ValueError('The server did not return ' + name)))
+                    continue
+                if name in digests:
+                    client.manifest.set(manifest_key(name), digests[name], created[name]['version']['number'])
+                results.append(AttachmentResult(name, 'created', created[name]['id'], response, None))
+            return results
+
+        @instrumented('upload_attachments')
+        def update(client, name, path):
+            attachment = existing[name]
+            if sync:
+                digest = content_digest(path)
+                if client._attachment_unchanged(attachment, manifest_key(name), digest, path):
+                    return [AttachmentResult(name, 'unchanged', attachment['id'], None, None)]
+            response = client._post_attachment(pageid, path, comment, attachment['id'], filename=name)
+            if not response.ok:
+                error = ValueError('Failed to upload {name}, the server answered {status}'.format(name=name, status=response.status_code))
+                return [AttachmentResult(name, 'failed', attachment['id'], response, error)]
+            if sync and client.manifest is not None:
+                result = client._parse(response)
+                result = result['results'][0] if 'results' in result else result
+                client.manifest.set(manifest_key(name), digest, result['version']['number'])
+            return [AttachmentResult(name, 'updated', attachment['id'], response, None)]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = dict((executor.submit(create, self, batch), [name for name, _ in batch]) for batch in batches)
+            futures.update((executor.submit(update, self, name, path), [name])
+                           for name, path in zip(names, filepaths) if name in existing)
+            for future, batch_names in futures.items():
+                try:
+                    for result in future.result():
+                        results[result.name] = result
+                except Exception as error:
+                    for name in batch_names:
+                        results[name] = AttachmentResult(name, 'failed', None, None, error)
+
+        if sync and self.manifest is not None:
+            self.manifest.flush()
+        return OrderedDict((name, results[name]) for name in names)
+
+
+    @instrumented('get_attachment')
+    def _get_attachment(self, attachment_name, pageid):
+        """
+        Arguments:
+            attachment_name (str): The name of the file attachment
+            pageid (int): The pageid where the attachment is stored
+
+        Returns:
+            attachment (Optional[dict]): The attachment with its version, None if there is no such attachment
+
+        """
+        
+        response = self._request('GET', self.api_url + 'content/' + str(pageid) + '/child/attachment?filename=' +
+                                 quote(attachment_name) + '&expand=version')
+        for result in self._json(response)['results']:
+            if result['title'] == attachment_name:
+                self._cache_set(('attachment', pageid, attachment_name), result['id'])
+                return result
+        return None
+    
+    
+    @instrumented('download_attachment')
+    def _attachment_unchanged(self, attachment, key, digest, filepath):
+        """
+        Arguments:
+            attachment (dict): The attachment as returned by _get_attachment
+            key (str): The manifest key for the attachment
+            digest (str): The sha256 of the local file
+            filepath (object): The path or seekable file-like object of the local file
+
+        Returns:
+            unchanged (bool): Whether the attachment on the server already has this content
+
+        """
+        
+        entry = self.manifest.get(key) if self.manifest is not None else None
+        if entry is not None:
+            return entry['digest'] == digest and entry['version'] == attachment['version']['number']
+        
+        # Compare sizes first so the attachment is only downloaded when it could be the same file
+        size = attachment.get('extensions', {}).get('fileSize')
+        local_size = MultipartEncoder._source_length(filepath)
+        if size is None or size != local_size:
+            return False
+        
+        remote_digest = hashlib.sha256()
+        response = self._request('GET', self.base_url + attachment['_links']['download'], stream=True)
+        with response:
+            if not response.ok:
+                return False
+            for chunk in response.iter_content(1024 * 1024):
+                remote_digest.update(chunk)
+        
+        unchanged = remote_digest.hexdigest() == digest
+        if unchanged and self.manifest is not None:
+            self.manifest.set(key, digest, attachment['version']['number'])
+        return unchanged
+    
+    
+    @instrumented('post_attachment')
+    def _post_attachment(self, pageid, filepath, comment=None, attachmentid=None, filename=None,
+                         chunk_size=1024 * 1024, progress=None):
+        """
+        Arguments:
+            pageid (int): The page id the attachment belongs to
+            filepath (object): The path to where the file is stored, or a file-like object or iterator of bytes
+            comment (Optional[str]): A comment to accompany the attachment
+            attachmentid (Optional[str]): The id of the attachment to replace, None to add a new one
+            filename (Optional[str]): The attachment name, defaults to the base name of filepath
+            chunk_size (int): How many bytes to read and send at a time
+            progress (Optional[callable]): Called with (bytes_sent, total_bytes, bytes_per_second) while uploading
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+
+        """
+        
+        url = self.api_url + 'content/' + str(pageid) + '/child/attachment'
+        if attachmentid is not None:
+            url += '/' + attachmentid + '/data'
+        fields = []
+        
+        if comment:
+            fields = [("comment", comment)]
+        
+        # The multipart body is streamed from the source so large files never sit in memory
+        with MultipartEncoder(fields, [('file', filename or os.path.basename(filepath), filepath)],
+                              chunk_size=chunk_size, progress=progress) as encoder:
+            headers = {"X-Atlassian-Token": "nocheck", "Content-Type": encoder.content_type}
+            response = self._request('POST', url, headers=headers, data=encoder)
+        
+        if response.status_code == 200 and attachmentid is None:
+            for result in self._parse(response)['results']:
+                self._cache_set(('attachment', pageid, result['title']), result['id'])
+        return response
+
+
+    @instrumented('post_attachment')
+    def _post_attachments(self, pageid, files, comment=None):
+        """
+        Arguments:
+            pageid (int): The page id the attachments belong to
+            files (list): (attachment name, path) of every new file to send in this one request
+            comment (Optional[str]): A comment to accompany every attachment
+
+        Returns:
+            response (requests.models.Response): The response from the api request, listing every attachment created
+
+        """
+
+        # Confluence pairs each comment field with the file in the same position
+        fields = [('comment', comment)] * len(files) if comment else []
+        with MultipartEncoder(fields, [('file', name, path) for name, path in files]) as encoder:
+            headers = {"X-Atlassian-Token": "nocheck", "Content-Type": encoder.content_type}
+            response = self._request('POST', self.api_url + 'content/' + str(pageid) + '/child/attachment',
+                                     headers=headers, data=encoder)
+
+        if response.status_code == 200:
+            for result in self._parse(response)['results']:
+                self._cache_set(('attachment', pageid, result['title']), result['id'])
+        return response
+
+
+    @instrumented('delete_attachment')
+    def delete_attachment(self, attachment_name, page_name, space_name, **kwargs):
+        """
+        Arguments:
+            attachment_name (str): The name of the stored attachment
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+            
+        """
+        
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(attachment_name, str), 'attachment_name should be the name of the attachemt to delete'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        def send(pageid):
+            response = self._with_attachmentid(attachment_name, pageid, lambda attachmentid: self._request(
+                'DELETE', self.api_url + 'content/' + attachmentid))
+            self._cache_delete(('attachment', pageid, attachment_name))
+            return response
+        
+        return self._with_pageid(page_name, space_name, space_name_as_key, send)
+    
+    
+    @instrumented('get_version')
+    def _get_version(self, pageid, expand='version'):
+        """
+        Arguments:
+            pageid (int): The page id for the confluence page
+            expand (str): The fields to expand, the version is always needed
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+            
+        """
+        
+        assert isinstance(pageid, int), 'pageid should be an integer which corresponds to a page on the confluence server'
+
+        response = self._request('GET', self.api_url + 'content/' + str(pageid) + '?expand=' + expand)
+        return response
+
+    
+    @instrumented('get_pageid')
+    def _get_pageid(self, page_name, space_name, space_name_as_key):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+
+        Returns:
+            pageid (int): The pageid for the given page_name and space_name
+            
+        """
+        
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        pageid = self._lookup_pageid(page_name, space_key)
+        
+        if pageid is not None:
+            return pageid
+        raise ValueError('Page not found, has it been deleted or is it in a differant space?')
+    
+    
+    def _lookup_pageid(self, page_name, space_key):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_key (str): The key of the space where the page is stored
+
+        Returns:
+            pageid (Optional[int]): The pageid for the given page_name and space_key, None if there is no such page
+
+        """
+        
+        pageid = self._cache_get(('page', space_key, page_name))
+        if pageid is not None:
+            return pageid
+
+        page_info_dict = self._find_page(page_name, space_key, None)
+        return None if page_info_dict is None else int(page_info_dict['id'])
+    
+    
+    def _with_pageid(self, page_name, space_name, space_name_as_key, send, retry=True):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            space_name_as_key (bool): Whether to force using the name as the key
+            send (callable): Called with the page id, makes the requests that need it
+            retry (bool): Whether send can be called a second time, False when it sends a one-shot stream
+
+        Returns:
+            result (object): What send returned, when a cached page id turns out to be stale, because
+                send got a 404 for it, the page is looked up again and send is called once more
+
+        """
+        
+        if self.cache is None:
+            return send(self._get_pageid(page_name, space_name, space_name_as_key))
+        
+        # _get_pageid then finds the space key in the cache, so building the key costs no extra lookup
+        key = ('page', self._get_space_key(space_name, space_name_as_key), page_name)
+        cached = retry and self._cache_get(key) is not None
+        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
+        try:
+            result = send(pageid)
+        except requests.HTTPError as error:
+            if not cached or error.response is None or error.response.status_code != 404:
+                raise
+            result = error.response
+        if not cached or getattr(result, 'status_code', None) != 404:
+            return result
+        
+        # The page was removed or recreated elsewhere since its id was cached
+        self._cache_delete(key)
+        return send(self._get_pageid(page_name, space_name, space_name_as_key))
+    
+    
+    @instrumented('find_page')
+    def _find_page(self, page_name, space_key, expand='version,space'):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_key (str): The key of the space where the page is stored
+            expand (Optional[str]): The fields to expand, eg 'version,space' or 'version,body.storage'
+
+        Returns:
+            page (Optional[dict]): The page with the expanded fields in a single request, by id when
+                the id is cached and by title otherwise, None if there is no such page
+
+        """
+        
+        pageid = self._cache_get(('page', space_key, page_name))
+        if pageid is not None:
+            response = self._get_version(pageid, expand or 'version')
+            if response.status_code != 404:
+                response.raise_for_status()
+                return self._parse(response)
+            # The cached page id is stale, the page was removed or recreated elsewhere
+            self._cache_delete(('page', space_key, page_name))
+        
+        url = self.api_url + 'content?title=' + quote(page_name) + '&spaceKey=' + space_key
+        if expand:
+            url += '&expand=' + expand
+        response = self._request('GET', url)
+        results = self._json(response)['results']
+        
+        if len(results) != 0:
+            self._cache_set(('page', space_key, page_name), int(results[0]['id']))
+            return results[0]
+        return None
+    
+    
+    @instrumented('get_space_key')
+    def _get_space_key(self, space_name, space_name_as_key):
+        """
+        Arguments:
+            space_name (str): The space name you want the key for
+            force_space_name (bool): Whether to force using the name as the key
+
+        Returns:
+            spacekey (str): The spacekey for the given space_name
+            
+        """
+        
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(space_name_as_key, bool), 'space_name_as_key should be a boolean value whether to use the space_name param but pass the key'
+        
+        space_key = self._cache_get(('space', space_name, space_name_as_key))
+        if space_key is not None:
+            return space_key
+        
+        if space_name_as_key:
+            space_key = space_name
+            self._verify_space_key(space_key)
+            self._cache_set(('space', space_name, space_name_as_key), space_key)
+            return space_key
+        
+        cql = 'space.title ~ "{name}"'.format(name=space_name.replace('"', '\\"'))
+        response = self._request('GET', self._search_url(cql) + '&limit=1')
+        results = self._json(response)['results']
+        
+        if len(results) == 1:
+            space_key = results[0]['_expandable']['space'].rsplit('/', 1)[-1]
+            self._cache_set(('space', space_name, space_name_as_key), space_key)
+            return space_key
+        elif len(results) > 1:
+            raise ValueError('Duplicate space names found please use the spacekey')
+        else:
+            raise ValueError('Space not found, has it been deleted or is it called something else?')
+        
+        
+    @instrumented('get_attachmentid')
+    def _get_attachmentid(self, attachment_name, pageid):
+        """
+        Arguments:
+            attachment_name (str): The name of the file attachment
+            pageid (str): The pageid where the attachment is stored
+
+        Returns:
+            attachmentid (Optional[str]): The attachmentid for the given attachment_name on the given pageid,
+                None when the page has no attachment of that name
+
+        """
+        
+        assert isinstance(pageid, int), 'pageid should be the pageid of the requred page'
+        assert isinstance(attachment_name, str), 'attachment_name should be a file name that is stored in the page and space'
+        
+        attachmentid = self._cache_get(('attachment', pageid, attachment_name))
+        if attachmentid is not None:
+            return attachmentid
+        
+        for result in self._iter_attachments(pageid):
+            self._cache_set(('attachment', pageid, result['title']), result['id'])
+            if result['title'] == attachment_name:
+                return result['id']
+        return None
+    
+    
+    def _with_attachmentid(self, attachment_name, pageid, send, retry=True, not_found='Attachment {name} not found on the page'):
+        """
+        Arguments:
+            attachment_name (str): The name of the file attachment
+            pageid (int): The pageid where the attachment is stored
+            send (callable): Called with the attachment id, makes the request that needs it
+            retry (bool): Whether send can be called a second time, False when it sends a one-shot stream
+            not_found (str): The message of the ValueError raised when the page has no such attachment
+
+        Returns:
+            response (requests.models.Response): The response of send, when a cached attachment id turns
+                out to be stale the attachment is looked up again and send is called once more
+
+        """
+        
+        key = ('attachment', pageid, attachment_name)
+        cached = retry and self._cache_get(key) is not None
+        attachmentid = self._get_attachmentid(attachment_name, pageid)
+        if attachmentid is None:
+            raise ValueError(not_found.format(name=attachment_name))
+        response = send(attachmentid)
+        if not cached or response.status_code != 404:
+            return response
+        
+        self._cache_delete(key)
+        attachmentid = self._get_attachmentid(attachment_name, pageid)
+        if attachmentid is None:
+            raise ValueError(not_found.format(name=attachment_name))
+        return send(attachmentid)
+            
+    
+    @instrumented('get_page_contents')
+    def get_page_contents(self, page_name, space_name, **kwargs):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+
+        Returns:
+            contents (str): The contents of the given page
+            
+        """
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        if self.page_cache is None:
+            response = self._with_pageid(page_name, space_name, space_name_as_key, lambda pageid: self._request(
+                'GET', self.base_url + '/plugins/viewstorage/viewpagestorage.action?pageId={pageid}'.format(pageid=str(pageid))))
+            return response.text
+        
+        # A cached body stays valid for as long as the page is on the same version
+        page_info_dict = self._find_page(page_name, self._get_space_key(space_name, space_name_as_key), 'version')
+        if page_info_dict is None:
+            raise ValueError('Page not found, has it been deleted or is it in a differant space?')
+        pageid = int(page_info_dict['id'])
+        version = page_info_dict['version']['number']
+        contents = self.page_cache.get(pageid, version)
+        if contents is not None:
+            return contents
+        
+        response = self._request('GET', self.base_url + '/plugins/viewstorage/viewpagestorage.action?pageId={pageid}'.format(pageid=str(pageid)))
+        if response.ok:
+            self.page_cache.set(pageid, version, response.text)
+        return response.text
+    
+    
+    @instrumented('add_page')
+    def add_page(self, title, space_name, parent_page_name=None, body="", **kwargs):
+        """
+        Arguments:
+            title (str): The title of the page to make
+            space_name (str): The space name where the page is stored
+            parent_page_name (str): The name of the parent page for the new page to be stored beneath
+            body (str): The body text for the new page, or a ConfluencePageBuilder or iterable of html
+                fragments to stream into the request without joining them
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+            
+        """
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        parent_page_id = None
+        if parent_page_name:
+            parent_page_id = self._get_pageid(parent_page_name, space_name, space_name_as_key)
+        
+        return self._create_page(title, space_key, body, parent_page_id)
+    
+    
+    @instrumented('create_page')
+    def _create_page(self, title, space_key, body="", parent_page_id=None):
+        """
+        Arguments:
+            title (str): The title of the page to make
+            space_key (str): The key of the space to make the page in
+            body (str): The body text for the new page, a ConfluencePageBuilder or an iterable of html fragments
+            parent_page_id (Optional[int]): The id of the page to store the new page beneath
+
+        Returns:
+            response (requests.models.Response): The response from the api request
+
+        """
+        
+        payload = {
+           "type":"page",
+           "title":title,
+           "space":{"key":space_key},
+            }
+        
+        if parent_page_id is not None:
+            payload["ancestors"] = [{"id":parent_page_id}]
+
+        data = self._page_data(payload, body)
+        
+        response = self._request('POST', self.api_url + 'content/', data=data)
+        if response.status_code == 200:
+            self._cache_set(('page', space_key, title), int(self._parse(response)['id']))
+        return response
+        
+    
+    @instrumented('verify_space_key')
+    def _verify_space_key(self, space_key):
+        """
+        Arguments:
+            space_key (str): The space key to be verified
+
+        """
+        
+        response = self._request('GET', self.api_url + 'space?spaceKey={space_key}'.format(space_key=space_key))
+        
+        check = self._json(response)['results']
+        if len(check) != 1:
+            raise ValueError('space_key: {space_key} doesnt exist'.format(space_key=space_key))
+
+
+
+    def iter_pages(self, space_name, limit=100, expand=None, **kwargs):
+        """
+        Lazily walks every page in a space, fetching limit pages per request
+
+        Arguments:
+            space_name (str): The space name to walk
+            limit (int): How many pages to fetch per request
+            expand (Optional[str]): The fields to expand on every page eg 'version,body.storage'
+
+        Yields:
+            page (dict): Every page in the space as returned by the content api
+
+        """
+        
+        assert isinstance(space_name, str), 'space_name should be the space name to walk'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        return self._paginate(self.api_url + 'content?type=page&spaceKey=' + quote(space_key), limit, expand)
+    
+    
+    def iter_children(self, page_name, space_name, limit=100, expand=None, **kwargs):
+        """
+        Lazily walks the direct child pages of a page, fetching limit pages per request
+
+        Arguments:
+            page_name (str): The title of the parent page
+            space_name (str): The space name where the page is stored
+            limit (int): How many pages to fetch per request
+            expand (Optional[str]): The fields to expand on every page eg 'version'
+
+        Yields:
+            page (dict): Every child page as returned by the content api
+
+        """
         
-        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
         
-        response = requests.get(url='http://{server}/plugins/viewstorage/viewpagestorage.action?pageId={pageid}'.format(server=self.server, pageid=str(pageid)), 
-                                headers=self.headers, auth=self.auth)
-        return response.text
+        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
+        return self._iter_children(pageid, limit, expand)
     
     
-    def add_page(self, title, space_name, parent_page_name=None, body="", **kwargs):
+    def iter_attachments(self, page_name, space_name, limit=100, expand=None, **kwargs):
         """
+        Lazily walks the attachments of a page, fetching limit attachments per request
+
         Arguments:
-            title (str): The title of the page to make
+            page_name (str): The title of the page
             space_name (str): The space name where the page is stored
-            parent_page_name (str): The name of the parent page for the new page to be stored beneath
-            body (str): The body text for the new page
+            limit (int): How many attachments to fetch per request
+            expand (Optional[str]): The fields to expand on every attachment eg 'version'
+
+        Yields:
+            attachment (dict): Every attachment as returned by the content api
+
+        """
+        
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        pageid = self._get_pageid(page_name, space_name, space_name_as_key)
+        return self._iter_attachments(pageid, limit, expand)
+    
+    
+    def iter_search(self, cql, limit=100, expand=None):
+        """
+        Lazily walks the results of a CQL search, fetching limit results per request
+
+        Arguments:
+            cql (str): The CQL query eg 'space = DS and type = page'
+            limit (int): How many results to fetch per request
+            expand (Optional[str]): The fields to expand on every result eg 'version'
+
+        Yields:
+            result (dict): Every result as returned by the content search api
+
+        """
+        
+        assert isinstance(cql, str), 'cql should be a string of confluence query language'
+        
+        return self._paginate(self._search_url(cql), limit, expand)
+
+
+    def search(self, cql, fields=('id', 'type', 'title'), expand=None, limit=100):
+        """
+        Lazily walks the results of a CQL search, every page of results is parsed as it streams in
+        and only the fields asked for are kept, so scanning a large space stays quick and small
+
+        Arguments:
+            cql (str): The CQL query eg 'space = DS and type = page and lastModified >= "2019-01-01"'
+            fields (Optional[tuple]): Dotted paths of the fields to keep eg ('title', 'version.number'),
+                only the expansions they need are requested, None to yield every result as a dict
+            expand (Optional[str]): More fields to expand on every result eg 'ancestors'
+            limit (int): How many results to fetch per request
 
         Returns:
-            response (requests.models.Response): The response from the api request
+            results (iterator): A record for every result with an attribute per field eg
+                record.version_number, or every result as a dict when fields is None
+
+        """
+        
+        assert isinstance(cql, str), 'cql should be a string of confluence query language'
+        assert fields is None or (isinstance(fields, (list, tuple)) and all(isinstance(field, str) for field in fields)), \
+            'fields should be a tuple of dotted field paths eg ("title", "version.number") or None'
+        
+        if fields is None:
+            return self._paginate(self._search_url(cql), limit, expand, stream=True)
+        expand = ','.join(part for part in (expand, expand_for(fields)) if part) or None
+        return map(record_type(tuple(fields)), self._paginate(self._search_url(cql), limit, expand, stream=True))
+    
+    
+    def _iter_children(self, pageid, limit=100, expand=None):
+        return self._paginate(self.api_url + 'content/' + str(pageid) + '/child/page', limit, expand)
+    
+    
+    def _iter_attachments(self, pageid, limit=100, expand=None):
+        return self._paginate(self.api_url + 'content/' + str(pageid) + '/child/attachment', limit, expand)
+    
+    
+    def _paginate(self, url, limit=100, expand=None, stream=False):
+        """
+        Arguments:
+            url (str): The url of the first page of results
+            limit (int): How many results to ask for per request
+            expand (Optional[str]): The fields to expand on every result
+            stream (bool): Parse every result as it is read instead of parsing whole responses
+
+        Yields:
+            result (dict): Every result, following the next links until there are none left
+
+        """
+        
+        assert isinstance(limit, int) and limit > 0, 'limit must be a positive integer'
+        
+        url += ('&' if '?' in url else '?') + 'limit=' + str(limit)
+        if expand:
+            url += '&expand=' + expand
+        start = 0
+        
+        while url is not None:
+            if stream:
+                page, count = {}, 0
+                response = self._request('GET', url, operation='paginate', stream=True)
+                with response:
+                    response.raise_for_status()
+                    for result in iter_items(response.iter_content(64 * 1024), 'results', page):
+                        count += 1
+                        yield result
+            else:
+                page = self._json(self._request('GET', url, operation='paginate'))
+                count = len(page.get('results', []))
+                for result in page.get('results', []):
+                    yield result
             
+            links = page.get('_links')
+            if links is not None:
+                url = self.base_url + links['next'] if 'next' in links else None
+            elif count == limit:
+                # Older servers don't send links, so step through with start instead
+                start += limit
+                url = url.split('&start=')[0] + '&start=' + str(start)
+            else:
+                url = None
+    
+    
+    @instrumented('mirror_space')
+    def mirror_space(self, space_name, directory, attachments=False, max_workers=8, full=False, **kwargs):
+        """
+        Downloads the storage format and metadata of every page in a space to a local directory,
+        later runs only download what changed since the last run and interrupted runs resume
+
+        Arguments:
+            space_name (str): The space name to mirror
+            directory (str): The local directory to mirror into
+            attachments (bool): Whether to download attachments as well
+            max_workers (int): The maximum number of downloads to run at once
+            full (bool): List the whole space instead of only what changed since the last run,
+                this also removes local copies of deleted pages
+            time_zone (Optional[str or tzinfo]): The time zone of the user, eg 'Europe/London'. Without it later runs
+                list everything modified up to twelve hours before the last run again, as CQL dates are read in
+                a time zone the api doesn't give
+
+        Returns:
+            stats (dict): How many pages and attachments were downloaded, unchanged, removed or failed
+
         """
+        
+        assert isinstance(space_name, str), 'space_name should be the space name to mirror'
         space_name_as_key = kwargs.pop('space_name_as_key', False)
+        time_zone = kwargs.pop('time_zone', None)
         
         space_key = self._get_space_key(space_name, space_name_as_key)
-        payload = {
-           "type":"page",
-           "title":title,
-           "space":{"key":space_key},
-           "body":{
-                    "storage":{
-                    "value":body,
-                    "representation":"storage"
-                  }
-               }
+        mirror = SpaceMirror(self, space_key, directory, attachments=attachments, max_workers=max_workers,
+                             time_zone=time_zone)
+        return mirror.run(full=full)
+    
+    
+    @instrumented('publish_pages')
+    def publish_pages(self, pages, space_name, max_workers=8, **kwargs):
+        """
+        Creates or updates a whole tree of pages, parents are always published before their children
+        and independent pages are published in parallel
+
+        Arguments:
+            pages (list): The pages to publish, each a dict with a 'title', an optional 'parent' title
+                (a page in the batch or one that already exists in the space), an optional 'body'
+                (html, a ConfluencePageBuilder or a list of html fragments) and an optional list of
+                'attachments' file paths
+            space_name (str): The space name where the pages are stored
+            max_workers (int): The maximum number of pages to publish at once
+
+        Returns:
+            results (list): A PublishResult for every page, in the order they were given
+
+        """
+        
+        assert isinstance(pages, (list, tuple)), 'pages should be a list of dicts with a title, parent, body and attachments'
+        assert all(isinstance(page, dict) and isinstance(page.get('title'), str) for page in pages), \
+            'every page should be a dict with at least a title'
+        assert isinstance(space_name, str), 'space_name should be the space name where the pages are stored'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        titles = [page['title'] for page in pages]
+        if len(set(titles)) != len(titles):
+            raise ValueError('Page titles must be unique within a space')
+        
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        specs = dict((page['title'], page) for page in pages)
+        
+        # Parents outside of the batch are resolved once up front
+        external_parents = {}
+        for page in pages:
+            parent = page.get('parent')
+            if parent and parent not in specs and parent not in external_parents:
+                external_parents[parent] = self._lookup_pageid(parent, space_key)
+        
+        def publish(title):
+            @instrumented('publish_pages')
+            def task(client, parent_results):
+                spec = specs[title]
+                parent = spec.get('parent')
+                parent_page_id = None
+                if parent in parent_results:
+                    parent_page_id = parent_results[parent].pageid
+                elif parent:
+                    parent_page_id = external_parents[parent]
+                    if parent_page_id is None:
+                        raise ValueError('Parent page {parent} not found in space {space_key}'.format(parent=parent, space_key=space_key))
+                return self._publish_page(title, space_key, spec.get('body', ''), parent_page_id, spec.get('attachments', ()))
+            return functools.partial(task, self)
+        
+        tasks = OrderedDict((title, publish(title)) for title in titles)
+        dependencies = dict((title, [specs[title]['parent']]) for title in titles if specs[title].get('parent'))
+        outcomes = run_ordered(tasks, dependencies, max_workers)
+        
+        results = []
+        for title, (result, error) in outcomes.items():
+            if error is not None:
+                result = PublishResult(title, 'failed', None, getattr(error, 'response', None), error, {})
+            results.append(result)
+        return results
+    
+    
+    def publish_table(self, df, title, space_name, parent_page_name=None, max_rows=5000, split='pages',
+                      formatters=None, escape=True, index=True, max_workers=8, **kwargs):
+        """
+        Publishes a DataFrame as a storage format table, tables longer than max_rows are split
+        across child pages or attached as a csv so every page stays quick to render and upload
+
+        Arguments:
+            df (pandas.DataFrame): The table to publish
+            title (str): The title of the page to publish the table on
+            space_name (str): The space name where the page is stored
+            parent_page_name (Optional[str]): The page to store the table page beneath
+            max_rows (int): The most rows to put on a single page
+            split (str): 'pages' to put every max_rows rows on a child page titled with its rows,
+                or 'csv' to show the first max_rows rows and attach the whole table as title.csv
+            formatters (Optional[dict]): Column name to a callable or format string eg {'price': '{:,.2f}'}
+            escape (bool): Whether to html escape cell text
+            index (bool): Whether to write the index as the first column
+            max_workers (int): The maximum number of pages to publish at once
+
+        Returns:
+            results (list): A PublishResult for the table page followed by any child pages
+
+        """
+        
+        assert isinstance(title, str), 'title should be the title of the page to publish the table on'
+        assert isinstance(max_rows, int) and max_rows > 0, 'max_rows must be a positive integer'
+        assert split in ('pages', 'csv'), "split should be either 'pages' or 'csv'"
+        # Imported here so the client doesn't load pandas unless tables are published
+        from confluenceapi.tables import split_frame, table_fragments
+        
+        def table(frame):
+            # A list of fragments is streamed into the request and can be sent again on conflicts
+            return list(table_fragments(frame, formatters, escape, index))
+        
+        page = {'title': title, 'parent': parent_page_name}
+        if len(df) <= max_rows:
+            return self.publish_pages([dict(page, body=table(df))], space_name, max_workers, **kwargs)
+        
+        if split == 'pages':
+            parts = split_frame(df, max_rows)
+            page['body'] = ['<p>{total} rows split across {count} pages</p>'.format(total=len(df), count=len(parts)),
+                            '<ac:structured-macro ac:name="children"><ac:parameter ac:name="sort">creation</ac:parameter></ac:structured-macro>']
+            children = [{'title': '{title} (rows {first} to {last})'.format(title=title, first=first, last=last),
+                         'parent': title, 'body': table(frame)} for first, last, frame in parts]
+            return self.publish_pages([page] + children, space_name, max_workers, **kwargs)
+        
+        filename = title.replace('/', '_') + '.csv'
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, filename)
+            df.to_csv(path, index=index)
+            page['body'] = table(df.iloc[:max_rows]) + [
+                '<p>Showing the first {shown} of {total} rows, the whole table is attached as '
+                '<ac:link><ri:attachment ri:filename="{filename}"/></ac:link></p>'.format(
+                    shown=max_rows, total=len(df), filename=filename.replace('&', '&amp;').replace('"', '&quot;').replace('<', '&lt;'))]
+            page['attachments'] = [path]
+            return self.publish_pages([page], space_name, max_workers, **kwargs)
+
+
+    @instrumented('render_and_publish')
+    def render_and_publish(self, jobs, space_name, parent_page_name=None, render_workers=None, max_in_flight=None,
+                           max_workers=8, **kwargs):
+        """
+        Renders pages across a pool of processes and creates or updates each one as soon as it is
+        rendered, so publishing overlaps with rendering instead of waiting for every page
+
+        Arguments:
+            jobs (iterable): (title, job) pairs, job is a BuilderRecipe or a picklable function returning
+                html, a ConfluencePageBuilder or a BuilderRecipe, see batchrender.render_many
+            space_name (str): The space name where the pages are stored
+            parent_page_name (Optional[str]): The title of the page to store new pages beneath
+            render_workers (Optional[int]): How many processes to render with, defaults to the number of cpus
+            max_in_flight (Optional[int]): The most pages rendering, rendered or being published at once,
+                defaults to twice render_workers
+            max_workers (int): The maximum number of pages to publish at once
+            initializer (Optional[callable]): Called in every render process as it starts, eg to register templates
+            initargs (tuple): The arguments for initializer
+
+        Returns:
+            results (list): A PublishResult for every page, in the order they were published
+
+        """
+        from confluenceapi.batchrender import render_many
+
+        assert isinstance(space_name, str), 'space_name should be the space name where the pages are stored'
+        assert isinstance(max_workers, int) and max_workers > 0, 'max_workers must be a positive integer'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        initializer = kwargs.pop('initializer', None)
+        initargs = kwargs.pop('initargs', ())
+        render_workers = render_workers or os.cpu_count() or 1
+        max_in_flight = max_in_flight or 2 * render_workers
+
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        parent_page_id = self._target_parent(parent_page_name, space_key)
+
+        @instrumented('render_and_publish')
+        def publish(client, title, html):
+            return client._publish_page(title, space_key, html, parent_page_id, ())
+
+        results = []
+        publishing = {}
+
+        def collect(futures):
+            for future in futures:
+                title = publishing.pop(future)
+                error = future.exception()
+                results.append(future.result() if error is None else
+                               PublishResult(title, 'failed', None, getattr(error, 'response', None), error, {}))
+
+        def held():
+            return sum(not future.done() for future in publishing)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Pages being published count towards max_in_flight too, so no new render starts until
+            # rendering and publishing pages together are below it
+            for rendered in render_many(jobs, render_workers, max_in_flight, initializer, initargs, held):
+                if not rendered.ok:
+                    results.append(PublishResult(rendered.key, 'failed', None, None, rendered.error, {}))
+                    continue
+                publishing[executor.submit(publish, self, rendered.key, rendered.html)] = rendered.key
+                while held() >= max_in_flight:
+                    collect(wait(list(publishing), return_when=FIRST_COMPLETED)[0])
+            collect(wait(list(publishing))[0])
+        return results
+
+
+    @instrumented('publish_page')
+    def _publish_page(self, title, space_key, body, parent_page_id, attachments):
+        """
+        Arguments:
+            title (str): The title of the page
+            space_key (str): The key of the space where the page is stored
+            body (str): The body text for the page, a ConfluencePageBuilder or a list of html fragments
+            parent_page_id (Optional[int]): The id of the page to store the page beneath, an existing page
+                with a different parent is moved there
+            attachments (list): Paths of files to attach to the page
+
+        Returns:
+            result (PublishResult): The outcome of creating or updating the page
+
+        """
+        
+        page_info_dict = self._find_page(title, space_key, 'version,space,ancestors')
+        if page_info_dict is None:
+            action = 'created'
+            response = self._create_page(title, space_key, body, parent_page_id)
+        else:
+            action = 'updated'
+            ancestors = page_info_dict.get('ancestors') or [{}]
+            if parent_page_id is not None and str(ancestors[-1].get('id')) == str(parent_page_id):
+                parent_page_id = None
+            response = self._put_page(int(page_info_dict['id']), body, page_info_dict, parent_page_id=parent_page_id)
+        response.raise_for_status()
+        pageid = int(self._parse(response)['id'])
+        
+        uploaded = {}
+        if attachments:
+            existing_ids = dict((result['title'], result['id']) for result in self._iter_attachments(pageid))
+            for filepath in attachments:
+                attachment_name = os.path.basename(filepath)
+                uploaded[attachment_name] = self._post_attachment(pageid, filepath, None, existing_ids.get(attachment_name))
+            failed = [name for name, attachment_response in uploaded.items() if not attachment_response.ok]
+            if failed:
+                return PublishResult(title, 'failed', pageid, response,
+                                     ValueError('Failed to upload attachments: ' + ', '.join(failed)), uploaded)
+        return PublishResult(title, action, pageid, response, None, uploaded)
+    
+    
+    @instrumented('delete_tree')
+    def delete_tree(self, page_name, space_name, dry_run=False, max_workers=8, progress=None, **kwargs):
+        """
+        Deletes a page and every page beneath it, children are always deleted before their parent
+        and independent pages are deleted in parallel
+
+        Arguments:
+            page_name (str): The title of the page at the top of the tree
+            space_name (str): The space name where the page is stored
+            dry_run (bool): Only walk the tree and report the pages that would be deleted
+            max_workers (int): The maximum number of requests to send at once
+            progress (Optional[callable]): Called with (done, total, result) as every page finishes
+
+        Returns:
+            results (list): A TreeResult for every page in the tree, parents before their children,
+                a page is kept when deleting anything beneath it failed
+
+        """
+        
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        pages, parents = self._walk_tree(page_name, space_key, 'delete_tree', max_workers)
+        if dry_run:
+            return self._planned_tree(pages, progress)
+        return self._delete_tree(pages, parents, space_key, max_workers, progress)
+    
+    
+    @instrumented('copy_tree')
+    def copy_tree(self, page_name, space_name, new_parent_name=None, new_space_name=None, title_format='{title}',
+                  attachments=True, dry_run=False, max_workers=8, progress=None, **kwargs):
+        """
+        Copies a page and every page beneath it, parents are always created before their children
+        and independent pages are copied in parallel
+
+        Arguments:
+            page_name (str): The title of the page at the top of the tree
+            space_name (str): The space name where the page is stored
+            new_parent_name (Optional[str]): The title of the page to copy the tree beneath, None for the top of the space
+            new_space_name (Optional[str]): The space name to copy the tree into, defaults to the same space
+            title_format (str): The title of every copy, formatted with the original title, copies in
+                the same space need a new title eg 'Copy of {title}'
+            attachments (bool): Whether to copy the attachments of every page as well
+            dry_run (bool): Only walk the tree and report the pages that would be made
+            max_workers (int): The maximum number of pages to copy at once
+            progress (Optional[callable]): Called with (done, total, result) as every page finishes
+
+        Returns:
+            results (list): A TreeResult for every page in the tree with the title and id of its copy,
+                parents before their children, pages beneath a page that failed to copy are not copied
+
+        """
+        
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(new_parent_name, str) or new_parent_name is None, 'new_parent_name should be the title of a page or None'
+        assert isinstance(new_space_name, str) or new_space_name is None, 'new_space_name should be a space name or None'
+        assert isinstance(title_format, str) and '{title}' in title_format, "title_format should be a string containing '{title}'"
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        target_space_key = self._get_space_key(new_space_name or space_name, space_name_as_key)
+        if target_space_key == space_key and title_format == '{title}':
+            raise ValueError("Page titles must be unique within a space, give the copies a title_format eg 'Copy of {title}'")
+        target_parent_id = self._target_parent(new_parent_name, target_space_key)
+        
+        pages, parents = self._walk_tree(page_name, space_key, 'copy_tree', max_workers, 'body.storage')
+        titles = dict((pageid, title_format.format(title=page['title'])) for pageid, page in pages.items())
+        if dry_run:
+            return self._planned_tree(pages, progress, titles)
+        return self._copy_tree(pages, parents, titles, target_space_key, target_parent_id, attachments,
+                               max_workers, progress)
+    
+    
+    @instrumented('move_tree')
+    def move_tree(self, page_name, space_name, new_parent_name=None, new_space_name=None, dry_run=False,
+                  max_workers=8, progress=None, **kwargs):
+        """
+        Moves a page and every page beneath it under a new parent. Within a space only the top page
+        is updated and the pages beneath it move along with it, into another space the tree is copied
+        with its attachments, parents first, and the originals deleted, children first, once every
+        page was copied
+
+        Arguments:
+            page_name (str): The title of the page at the top of the tree
+            space_name (str): The space name where the page is stored
+            new_parent_name (Optional[str]): The title of the page to move the tree beneath, only None
+                when moving to the top of another space
+            new_space_name (Optional[str]): The space name to move the tree into, defaults to the same space
+            dry_run (bool): Only walk the tree and report the pages that would be moved
+            max_workers (int): The maximum number of requests to send at once into another space
+            progress (Optional[callable]): Called with (done, total, result) as every page is copied and
+                then as every original is deleted
+
+        Returns:
+            results (list): A TreeResult for every page that was sent, parents before their children,
+                a page moved into another space has a new id and nothing is deleted when a copy failed
+
+        """
+        
+        assert isinstance(page_name, str), 'title should be the title of a page within the space defined'
+        assert isinstance(space_name, str), 'space_name should be the space name where the page is stored'
+        assert isinstance(new_parent_name, str) or new_space_name is not None, \
+            'new_parent_name should be the title of the new parent page when moving within a space'
+        space_name_as_key = kwargs.pop('space_name_as_key', False)
+        
+        space_key = self._get_space_key(space_name, space_name_as_key)
+        target_space_key = self._get_space_key(new_space_name or space_name, space_name_as_key)
+        if target_space_key == space_key and new_parent_name is None:
+            raise ValueError('new_parent_name is needed to move a tree within its own space')
+        target_parent_id = self._target_parent(new_parent_name, target_space_key)
+        
+        if target_space_key == space_key:
+            if dry_run:
+                return self._planned_tree(self._walk_tree(page_name, space_key, 'move_tree', max_workers)[0], progress)
+            root = self._find_page(page_name, space_key, 'version,space,body.storage')
+            if root is None:
+                raise ValueError('Page not found, has it been deleted or is it in a differant space?')
+            payload = {
+                'id': root['id'],
+                'type': 'page',
+                'title': root['title'],
+                'space': {'key': space_key},
+                'version': {'number': root['version']['number'] + 1},
+                'ancestors': [{'id': target_parent_id}],
             }
+            response = self._request('PUT', self.api_url + 'content/' + root['id'],
+                                     data=self._page_data(payload, root['body']['storage']['value']))
+            if response.ok:
+                result = TreeResult(root['title'], 'moved', int(root['id']), response, None)
+            else:
+                result = self._failed_tree_page(root, requests.HTTPError(response.reason, response=response))
+            if progress is not None:
+                progress(1, 1, result)
+            return [result]
         
-        if parent_page_name:
-            parent_page_id = self._get_pageid(parent_page_name, space_name, space_name_as_key)
-            payload["ancestors"] = [{"id":parent_page_id}]
+        pages, parents = self._walk_tree(page_name, space_key, 'move_tree', max_workers, 'body.storage')
+        if dry_run:
+            return self._planned_tree(pages, progress)
+        titles = dict((pageid, page['title']) for pageid, page in pages.items())
+        copies = self._copy_tree(pages, parents, titles, target_space_key, target_parent_id, True, max_workers, progress)
+        if not all(result.ok for result in copies):
+            return copies
+        
+        deletes = self._delete_tree(pages, parents, space_key, max_workers, progress)
+        return [copy._replace(action='moved') if deleted.ok else deleted for copy, deleted in zip(copies, deletes)]
+    
+    
+    def _target_parent(self, parent_name, space_key):
+        """
+        Arguments:
+            parent_name (Optional[str]): The title of the page to put a tree beneath
+            space_key (str): The key of the space the page is in
 
-        data = json.dumps(payload)
+        Returns:
+            pageid (Optional[int]): The id of the page, None when parent_name is None
+
+        """
         
-        response = requests.post(url=self.api_url + 'content/', headers=self.headers, auth=self.auth, data=data)
-        return response
+        if parent_name is None:
+            return None
+        pageid = self._lookup_pageid(parent_name, space_key)
+        if pageid is None:
+            raise ValueError('Parent page {parent} not found in space {space_key}'.format(parent=parent_name, space_key=space_key))
+        return pageid
+    
+    
+    def _walk_tree(self, page_name, space_key, operation, max_workers=8, expand=None):
+        """
+        Lists the pages beneath a page a level at a time, the children of every page in a level are
+        listed in parallel
+
+        Arguments:
+            page_name (str): The title of the page at the top of the tree
+            space_key (str): The key of the space where the page is stored
+            operation (str): The name to record the listing requests under
+            max_workers (int): How many pages to list the children of at once
+            expand (Optional[str]): The fields to expand on every page eg 'body.storage'
+
+        Returns:
+            pages (OrderedDict): Every page in the tree keyed by id, parents before their children
+            parents (dict): The id of the parent of every page but the top one, keyed by id
+
+        """
+        
+        root = self._find_page(page_name, space_key, expand)
+        if root is None:
+            raise ValueError('Page not found, has it been deleted or is it in a differant space?')
         
+        @instrumented(operation)
+        def children(client, pageid):
+            return list(client._iter_children(pageid, expand=expand))
+        
+        pages = OrderedDict([(int(root['id']), root)])
+        parents = {}
+        level = [int(root['id'])]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while level:
+                listings = list(executor.map(functools.partial(children, self), level))
+                next_level = []
+                for parent, listing in zip(level, listings):
+                    for page in listing:
+                        pageid = int(page['id'])
+                        pages[pageid] = page
+                        parents[pageid] = parent
+                        next_level.append(pageid)
+                level = next_level
+        return pages, parents
     
-    def _verify_space_key(self, space_key):
+    
+    def _planned_tree(self, pages, progress, titles=None):
         """
         Arguments:
-            space_key (str): The space key to be verified
+            pages (OrderedDict): Every page in the tree keyed by id
+            progress (Optional[callable]): Called with (done, total, result) for every page
+            titles (Optional[dict]): The titles to report keyed by page id, defaults to the page titles
+
+        Returns:
+            results (list): A 'planned' TreeResult for every page
+
+        """
+        
+        results = []
+        for pageid, page in pages.items():
+            results.append(TreeResult((titles or {}).get(pageid, page['title']), 'planned', pageid, None, None))
+            if progress is not None:
+                progress(len(results), len(pages), results[-1])
+        return results
+    
+    
+    def _delete_tree(self, pages, parents, space_key, max_workers, progress):
+        """
+        Arguments:
+            pages (OrderedDict): Every page in the tree keyed by id, as returned by _walk_tree
+            parents (dict): The id of the parent of every page but the top one
+            space_key (str): The key of the space the pages are in
+            max_workers (int): The maximum number of pages to delete at once
+            progress (Optional[callable]): Called with (done, total, result) as every page finishes
+
+        Returns:
+            results (list): A TreeResult for every page, in the order of pages
 
         """
         
-        response = requests.get(url=self.api_url + 'space?spaceKey={space_key}'.format(space_key=space_key),
-            headers=self.headers, auth=self.auth)
+        def delete(pageid):
+            @instrumented('delete_tree')
+            def task(client, children_results):
+                response = client._request('DELETE', client.api_url + 'content/' + str(pageid))
+                # A page that is already gone doesn't need deleting
+                if not response.ok and response.status_code != 404:
+                    response.raise_for_status()
+                client._cache_delete(('page', space_key, pages[pageid]['title']))
+                return TreeResult(pages[pageid]['title'], 'deleted', pageid, response, None)
+            return functools.partial(task, self)
         
-        check = json.loads(response.text)['results']
-        if len(check) != 1:
-            raise ValueError('space_key: {space_key} doesnt exist'.format(space_key=space_key))
+        # Leaves first, every page waits for all of its children
+        dependencies = {}
+        for pageid, parent in parents.items():
+            dependencies.setdefault(parent, []).append(pageid)
+        tasks = OrderedDict((pageid, delete(pageid)) for pageid in pages)
+        return self._run_tree(tasks, dependencies, pages, max_workers, progress)
+    
+    
+    def _copy_tree(self, pages, parents, titles, space_key, parent_id, attachments, max_workers, progress):
+        """
+        Arguments:
+            pages (OrderedDict): Every page in the tree keyed by id with its body, as returned by _walk_tree
+            parents (dict): The id of the parent of every page but the top one
+            titles (dict): The title of every copy keyed by the id of the original
+            space_key (str): The key of the space to make the copies in
+            parent_id (Optional[int]): The id of the page to put the top copy beneath
+            attachments (bool): Whether to copy the attachments of every page as well
+            max_workers (int): The maximum number of pages to copy at once
+            progress (Optional[callable]): Called with (done, total, result) as every page finishes
+
+        Returns:
+            results (list): A TreeResult for every page with the title and id of its copy, in the order of pages
+
+        """
+        
+        def copy(pageid):
+            @instrumented('copy_tree')
+            def task(client, parent_results):
+                new_parent_id = parent_results[parents[pageid]].pageid if pageid in parents else parent_id
+                response = client._create_page(titles[pageid], space_key, pages[pageid]['body']['storage']['value'], new_parent_id)
+                response.raise_for_status()
+                copyid = int(client._parse(response)['id'])
+                if attachments:
+                    client._copy_attachments(pageid, copyid)
+                return TreeResult(titles[pageid], 'copied', copyid, response, None)
+            return functools.partial(task, self)
+        
+        # Parents first, every page waits for the copy of its parent
+        dependencies = dict((pageid, [parent]) for pageid, parent in parents.items())
+        tasks = OrderedDict((pageid, copy(pageid)) for pageid in pages)
+        return self._run_tree(tasks, dependencies, pages, max_workers, progress)
+    
+    
+    def _copy_attachments(self, source_id, target_id):
+        """
+        Arguments:
+            source_id (int): The id of the page to copy the attachments of
+            target_id (int): The id of the page to attach the copies to
+
+        """
+        
+        for attachment in self._iter_attachments(source_id):
+            # Spooled to disk past 8MB so large attachments are copied with a bounded amount of memory
+            with tempfile.SpooledTemporaryFile(max_size=8 * 1024 ** 2) as spool:
+                response = self._request('GET', self.base_url + attachment['_links']['download'], stream=True)
+                with response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(1024 * 1024):
+                        spool.write(chunk)
+                spool.seek(0)
+                comment = attachment.get('metadata', {}).get('comment')
+                self._post_attachment(target_id, spool, comment, filename=attachment['title']).raise_for_status()
+    
+    
+    def _run_tree(self, tasks, dependencies, pages, max_workers, progress):
+        """
+        Arguments:
+            tasks (OrderedDict): A task for every page keyed by id, each returning a TreeResult
+            dependencies (dict): The ids each page has to wait for, keyed by id
+            pages (OrderedDict): Every page in the tree keyed by id
+            max_workers (int): The maximum number of tasks to run at once
+            progress (Optional[callable]): Called with (done, total, result) as every page finishes
 
+        Returns:
+            results (list): A TreeResult for every page, in the order of pages
+
+        """
+        
+        done = 0
+        
+        def report(pageid, result, error):
+            nonlocal done
+            done += 1
+            progress(done, len(tasks), result if error is None else self._failed_tree_page(pages[pageid], error))
+        
+        outcomes = run_ordered(tasks, dependencies, max_workers, report if progress is not None else None)
+        return [result if error is None else self._failed_tree_page(pages[pageid], error)
+                for pageid, (result, error) in outcomes.items()]
+    
+    
+    @staticmethod
+    def _failed_tree_page(page, error):
+        return TreeResult(page['title'], 'failed', int(page['id']), getattr(error, 'response', None), error)
@@ -0,0 +1,323 @@
+import time
+import threading
+import itertools
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+
+def node_url(server):
+    """
+    Arguments:
+        server (str): Where a node is running eg '172.17.0.2:8090' or 'https://node1.example.com'
+
+    Returns:
+        base_url (str): The url of the node, http unless the server gives a scheme, without a trailing slash
+
+    """
+
+    return (server if '://' in server else 'http://' + server).rstrip('/')
+
+
+def not_sent(error):
+    """
+    Arguments:
+        error (requests.RequestException): Why a request failed
+
+    Returns:
+        not_sent (bool): Whether it failed while connecting, so nothing reached the node and any
+            request, not only a GET, can be sent to another one
+
+    """
+
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if isinstance(error, requests.ConnectionError) and error.args else None
+    # urllib3 gives up with a MaxRetryError wrapping the error of the last attempt
+    reason = getattr(reason, 'reason', reason)
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class NoHealthyNode(requests.exceptions.ConnectionError):
+    """Raised when every node's circuit is open, so nothing is sent until one recovers"""
+
+
+class Node(object):
+    """
+        One node of a cluster and what the pool knows about it
+
+        Attributes:
+            base_url (str): The url of the node eg 'https://node1.example.com'
+            state (str): The circuit, 'closed' while healthy, 'open' while no requests are sent to it
+                and 'half_open' while a single trial request decides which it goes back to
+            outstanding (int): How many requests have been sent to it and not answered yet
+            failures (int): How many requests in a row have failed
+            check_failures (int): How many active health checks in a row have failed
+            requests (int): How many requests have been sent to it
+            errors (int): How many of them failed
+    """
+
+    __slots__ = ('base_url', 'state', 'outstanding', 'failures', 'check_failures', 'requests', 'errors', 'opened_at', 'trial')
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.state = 'closed'
+        self.outstanding = 0
+        self.failures = 0
+        self.check_failures = 0
+        self.requests = 0
+        self.errors = 0
+        self.opened_at = 0.0
+        self.trial = False
+
+
+    def __repr__(self):
+        return 'Node({0!r}, state={1!r}, outstanding={2})'.format(self.base_url, self.state, self.outstanding)
+
+
+class NodePool(object):
+    """
+        The nodes of a clustered (Data Center) deployment for a client to spread its requests across.
+        Every response is a passive health check, a node that fails failure_threshold requests in a
+        row has its circuit opened and gets no requests for reset_timeout seconds, then a single trial
+        request closes it again or keeps it open. Active health checks poll every node's /status in
+        the background, so a node that is draining or back up is noticed without waiting for a request,
+        a node's circuit is opened once failure_threshold checks in a row have failed.
+
+        .. code-block:: python
+
+          from confluenceapi import Confluence, NodePool
+
+          # Every node gets the same credentials, requests go to the node with the fewest in flight
+          lc = Confluence(['https://node1.example.com', 'https://node2.example.com'], credentials)
+
+          nodes = NodePool(['node1:8090', 'node2:8090', 'node3:8090'], strategy='round_robin',
+                           failure_threshold=5, reset_timeout=60, health_check_interval=5)
+          lc = Confluence(nodes, credentials)
+
+          nodes.stats()  # [{'node': 'http://node1:8090', 'state': 'closed', 'outstanding': 2, ...}, ...]
+    """
+
+    strategies = ('least_outstanding', 'round_robin')
+
+    def __init__(self, servers, strategy='least_outstanding', failure_threshold=3, reset_timeout=30.0,
+                 health_check_interval=10.0, health_path='/status', health_timeout=5.0, session=None):
+        """
+        Arguments:
+            servers (list): Where every node is running eg ['node1:8090', 'https://node2.example.com'],
+                http unless a server gives its scheme
+            strategy (str): 'least_outstanding' to send each request to the node with the fewest
+                requests in flight, or 'round_robin' to take the nodes in turn
+            failure_threshold (int): How many requests, or health checks, in a row a node can fail before its
+                circuit opens, any requests error, eg connection errors and timeouts, and 5xx responses count as failures
+            reset_timeout (float): How many seconds an open circuit waits before a trial request
+            health_check_interval (Optional[float]): Seconds between active health checks of every node,
+                None to rely on the passive checks only, the checks start with the first request
+            health_path (str): The path on every node that answers 200 while it is healthy
+            health_timeout (float): Timeout in seconds for a health check
+            session (Optional[requests.Session]): The session to send health checks with, it shouldn't retry
+                so a dead node fails its check at once, a client given a pool without one sets a session
+                with its own tls settings
+
+        """
+
+        servers = [servers] if isinstance(servers, str) else list(servers)
+        assert servers and all(isinstance(server, str) for server in servers), \
+            'servers must be a list of strings to where the nodes are running'
+        assert strategy in self.strategies, 'strategy must be one of ' + ', '.join(self.strategies)
+        assert isinstance(failure_threshold, int) and failure_threshold > 0, 'failure_threshold must be a positive integer'
+        assert reset_timeout >= 0, 'reset_timeout must be a non negative number of seconds'
+        assert health_check_interval is None or health_check_interval > 0, \
+            'health_check_interval must be a positive number of seconds or None'
+
+        self.nodes = [Node(node_url(server)) for server in servers]
+        assert len(set(node.base_url for node in self.nodes)) == len(self.nodes), 'servers must be unique'
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.health_check_interval = health_check_interval
+        self.health_path = health_path
+        self.health_timeout = health_timeout
+        self.session = session
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        """Stops the active health checks"""
+
+        self._closed.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+    def acquire(self, exclude=()):
+        """
+        Picks the node to send a request to and counts the request as outstanding on it
+
+        Arguments:
+            exclude (list): Nodes not to pick, eg those a request already failed on
+
+        Returns:
+            node (Optional[Node]): The node to use, None when every node not excluded has an open circuit
+                but some were excluded
+
+        Raises:
+            NoHealthyNode: When every node's circuit is open
+
+        """
+
+        self._start_health_checks()
+        with self._lock:
+            now = time.monotonic()
+            available = []
+            for node in self.nodes:
+                if node.state == 'open' and now - node.opened_at >= self.reset_timeout:
+                    node.state, node.trial = 'half_open', False
+                # A half open node takes one trial request at a time until it is known to be healthy
+                if node.state == 'closed' or (node.state == 'half_open' and not node.trial):
+                    available.append(node)
+            if not available:
+                raise NoHealthyNode('Every node has failed, the first is retried in {0:.1f}s'.format(
+                    max(0.0, min(node.opened_at for node in self.nodes) + self.reset_timeout - now)))
+
+            candidates = [node for node in available if node not in exclude]
+            if not candidates:
+                return None
+            # Rotating the starting point spreads ties, and is all round robin needs
+            turn = next(self._turn) % len(candidates)
+            candidates = candidates[turn:] + candidates[:turn]
+            if self.strategy == 'least_outstanding':
+                node = min(candidates, key=lambda candidate: candidate.outstanding)
+            else:
+                node = candidates[0]
+            if node.state == 'half_open':
+                node.trial = True
+            node.outstanding += 1
+            node.requests += 1
+            return node
+
+
+    def release(self, node, ok):
+        """
+        Records the outcome of a request acquire picked the node for
+
+        Arguments:
+            node (Node): The node the request was sent to
+            ok (Optional[bool]): Whether the node answered, False for any requests error and 5xx responses,
+                None when the request failed for a reason that has nothing to do with the node
+
+        """
+
+        with self._lock:
+            node.outstanding -= 1
+            if ok is None:
+                # Not a verdict either way, a half open node can take another trial
+                node.trial = False
+            else:
+                self._record(node, ok)
+
+
+    def check(self):
+        """
+        Checks every node's health path now, closing the circuit of a node that is healthy and opening
+        it once a node has failed failure_threshold checks in a row
+
+        Returns:
+            healthy (dict): Whether every node is healthy, keyed by its url
+
+        """
+
+        session = self.session or requests
+        healthy = {}
+        for node in self.nodes:
+            try:
+                response = session.get(node.base_url + self.health_path, timeout=self.health_timeout)
+                # Data Center nodes answer {"state": "RUNNING"} and something else while starting or draining
+                ok = response.status_code == 200 and self._state(response) in (None, 'RUNNING')
+            except requests.RequestException:
+                ok = False
+            with self._lock:
+                if ok:
+                    node.check_failures = 0
+                    if node.state != 'closed':
+                        node.state, node.failures, node.trial = 'closed', 0, False
+                else:
+                    node.check_failures += 1
+                    if node.check_failures >= self.failure_threshold and node.state != 'open':
+                        self._open(node)
+            healthy[node.base_url] = ok
+        return healthy
+
+
+    def stats(self):
+        """
+        Returns:
+            stats (list): The url, circuit state, outstanding requests, requests, errors and
+                consecutive failures of every node
+
+        """
+
+        with self._lock:
+            return [{'node': node.base_url, 'state': node.state, 'outstanding': node.outstanding,
+                     'requests': node.requests, 'errors': node.errors, 'failures': node.failures}
+                    for node in self.nodes]
+
+
+    def _record(self, node, ok):
+        if ok:
+            node.failures = 0
+            if node.state == 'half_open':
+                node.state, node.trial = 'closed', False
+            return
+        node.errors += 1
+        node.failures += 1
+        if node.state == 'half_open' or node.failures >= self.failure_threshold:
+            self._open(node)
+
+
+    def _open(self, node):
+        node.state, node.trial = 'open', False
+        node.opened_at = time.monotonic()
+
+
+    @staticmethod
+    def _state(response):
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        return body.get('state') if isinstance(body, dict) else None
+
+
+    def _start_health_checks(self):
+        if self._thread is not None or self.health_check_interval is None or self._closed.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='confluenceapi-healthcheck', daemon=True)
+                self._thread.start()
+
+
+    def _run(self):
+        while not self._closed.wait(self.health_check_interval):
+            self.check()
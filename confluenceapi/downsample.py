@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+
+def _x_values(df):
+    """
+    Arguments:
+        df (pandas.DataFrame): The series to plot, indexed by its x axis
+
+    Returns:
+        x (numpy.ndarray): The index as floats, positions when it isn't numbers or dates
+
+    """
+
+    index = df.index
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(float)
+    if pd.api.types.is_numeric_dtype(index) and not isinstance(index, pd.MultiIndex):
+        return index.to_numpy(dtype=float)
+    return np.arange(len(index), dtype=float)
+
+
+def _numeric(df):
+    numeric = df.select_dtypes(include='number')
+    assert numeric.shape[1] > 0, "df should have at least one numeric column to downsample"
+    return numeric.to_numpy(dtype=float)
+
+
+def _edges(length, buckets):
+    """
+    Arguments:
+        length (int): How many rows to split
+        buckets (int): How many buckets to split them into
+
+    Returns:
+        edges (numpy.ndarray): buckets + 1 row positions, bucket i is edges[i]:edges[i + 1]
+
+    """
+
+    return np.linspace(0, length, buckets + 1).astype(int)
+
+
+def lttb(df, max_points, y=None):
+    """
+    Largest triangle three buckets, keeps the rows that best preserve the visual shape of a line
+
+    Arguments:
+        df (pandas.DataFrame): The series to plot, indexed by its x axis
+        max_points (int): How many rows to keep, at least 3
+        y (Optional[str]): The column that picks the rows, defaults to the average of every
+            numeric column scaled to 0-1 so no column dominates
+
+    Returns:
+        df (pandas.DataFrame): At most max_points of the original rows, in order, rows missing the
+            values that pick them are left out
+
+    """
+
+    assert isinstance(max_points, int) and max_points >= 3, "max_points should be an integer of at least 3 for lttb"
+    if len(df) <= max_points:
+        return df
+
+    x = _x_values(df)
+    if y is not None:
+        values = df[y].to_numpy(dtype=float)
+    else:
+        values = _numeric(df)
+        present = ~np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            low, high = np.fmin.reduce(values, axis=0), np.fmax.reduce(values, axis=0)
+            scaled = (values - low) / np.where(high - low == 0, 1, high - low)
+            # A row is only missing when every column is, the others average what it has
+            values = np.where(present, scaled, 0.0).sum(axis=1) / present.sum(axis=1)
+
+    # Gaps are left out rather than picked as points at zero
+    present = ~np.isnan(values)
+    if not present.all():
+        df, x, values = df[present], x[present], values[present]
+        if len(df) <= max_points:
+            return df
+
+    # The first and last rows are always kept, the rest are split into max_points - 2 buckets
+    edges = _edges(len(df) - 2, max_points - 2) + 1
+    sums_x = np.add.reduceat(x[1:-1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(values[1:-1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    # Each bucket is compared against the average point of the bucket after it
+    next_x = np.append((sums_x / counts)[1:], x[-1])
+    next_y = np.append((sums_y / counts)[1:], values[-1])
+
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, len(df) - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        areas = np.abs((x[previous] - next_x[bucket]) * (values[start:end] - values[previous])
+                       - (x[previous] - x[start:end]) * (next_y[bucket] - values[previous]))
+        previous = start + int(np.argmax(areas))
+        keep[bucket + 1] = previous
+    return df.iloc[keep]
+
+
+def minmax(df, max_points):
+    """
+    Keeps the rows with the lowest and highest value of every numeric column in each bucket,
+    so spikes are never lost
+
+    Arguments:
+        df (pandas.DataFrame): The series to plot, indexed by its x axis
+        max_points (int): The most rows to keep, at least two per numeric column
+
+    Returns:
+        df (pandas.DataFrame): At most max_points of the original rows, in order
+
+    """
+
+    values = _numeric(df)
+    assert isinstance(max_points, int) and max_points >= 2 * values.shape[1], \
+        "max_points should be an integer of at least two per numeric column for minmax"
+    if len(df) <= max_points:
+        return df
+
+    buckets = max_points // (2 * values.shape[1])
+    edges = _edges(len(df), buckets)
+    size = int(np.diff(edges).max())
+    # Pad every bucket to the same size so all of them are reduced in one go
+    positions = edges[:-1, None] + np.arange(size)[None, :]
+    valid = positions < edges[1:, None]
+    positions = np.where(valid, positions, edges[:-1, None])
+    grouped = values[positions]
+    # Gaps are never an extreme, a bucket with nothing but gaps in a column keeps no row for it
+    present = valid[:, :, None] & ~np.isnan(grouped)
+    lows = np.where(present, grouped, np.inf).argmin(axis=1)
+    highs = np.where(present, grouped, -np.inf).argmax(axis=1)
+    rows = np.take_along_axis(positions, np.concatenate([lows, highs], axis=1), axis=1)
+    found = np.tile(present.any(axis=1), 2)
+    return df.iloc[np.unique(rows[found])]
+
+
+def mean(df, max_points):
+    """
+    Averages every numeric column over equal sized buckets of rows, each bucket is labelled with
+    the x value of its first row and other columns keep their first value
+
+    Arguments:
+        df (pandas.DataFrame): The series to plot, indexed by its x axis
+        max_points (int): How many rows to average down to
+
+    Returns:
+        df (pandas.DataFrame): max_points rows of bucket averages
+
+    """
+
+    assert isinstance(max_points, int) and max_points >= 1, "max_points should be a positive integer for mean"
+    if len(df) <= max_points:
+        return df
+
+    edges = _edges(len(df), max_points)
+    starts = edges[:-1]
+    result = df.iloc[starts].copy()
+    for column in df.select_dtypes(include='number').columns:
+        values = df[column].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        totals = np.add.reduceat(np.where(present, values, 0.0), starts)
+        counts = np.add.reduceat(present.astype(int), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[column] = totals / counts
+    return result
+
+
+methods = {'lttb': lttb, 'minmax': minmax, 'mean': mean}
+
+
+def downsample(df, max_points, method='lttb'):
+    """
+    Arguments:
+        df (pandas.DataFrame): The series to plot, indexed by its x axis
+        max_points (int): The most rows to keep
+        method (str): 'lttb' to keep the rows that best preserve the shape, 'minmax' to keep the
+            extremes of every bucket or 'mean' to average each bucket
+
+    Returns:
+        df (pandas.DataFrame): The downsampled frame, df itself when it is already small enough
+
+    """
+
+    assert isinstance(df, pd.DataFrame), "df should be a pandas data frame object"
+    assert method in methods, "method should be one of " + ", ".join(sorted(methods))
+    return methods[method](df, max_points)
@@ -0,0 +1,197 @@
+import json
+import codecs
+import functools
+
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+
+
+class _Reader(object):
+    """Decoded text of a json document read chunk by chunk, with a position into it"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder('utf-8')().decode
+        self.text = ''
+        self.position = 0
+        self.eof = False
+
+
+    def fill(self, wanted=1):
+        """
+        Reads chunks until at least wanted more characters are buffered, dropping the text already parsed
+
+        Returns:
+            filled (bool): False when the document had nothing more to read
+
+        """
+
+        parts = [self.text[self.position:]]
+        start = size = len(parts[0])
+        for chunk in self._chunks:
+            if chunk:
+                parts.append(self._decode(chunk))
+                size += len(parts[-1])
+                if size - start >= wanted:
+                    break
+        else:
+            parts.append(self._decode(b'', True))
+            size += len(parts[-1])
+            self.eof = True
+        self.text = ''.join(parts)
+        self.position = 0
+        return size > start
+
+
+    def peek(self):
+        """The next character that isn't whitespace, without consuming it"""
+        while True:
+            while self.position < len(self.text) and self.text[self.position] in _whitespace:
+                self.position += 1
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.fill():
+                raise ValueError('The json document ended early')
+
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError('Expected {0!r} at {1!r}'.format(character, self.text[self.position:self.position + 20]))
+        self.position += 1
+
+
+    def value(self):
+        """Decodes the next complete json value, reading more chunks until it is all there"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.position)
+            except ValueError:
+                # Buffer twice as much before trying again, so a long value is parsed a bounded number of times
+                if not self.fill(max(1, len(self.text) - self.position)):
+                    raise
+                continue
+            # A number at the very end of the text could still go on in the next chunk
+            if end == len(self.text) and not self.eof and self.fill():
+                continue
+            self.position = end
+            return value
+
+
+def iter_items(chunks, key='results', meta=None):
+    """
+    Parses a json object like {"results": [...], "_links": {...}} from a stream, yielding every item of
+    one of its arrays as soon as it has been read, so the whole document is never held in memory
+
+    Arguments:
+        chunks (iterable): The document as bytes chunks eg response.iter_content(64 * 1024)
+        key (str): The key of the array to yield the items of
+        meta (Optional[dict]): Filled with every other field of the object, complete once the items are consumed
+
+    Yields:
+        item (object): Every item of the array, decoded
+
+    """
+
+    meta = {} if meta is None else meta
+    reader = _Reader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() != ']':
+                while True:
+                    yield reader.value()
+                    if reader.peek() == ']':
+                        break
+                    reader.expect(',')
+            reader.expect(']')
+        else:
+            meta[name] = reader.value()
+        if reader.peek() == '}':
+            return
+        reader.expect(',')
+
+
+def expand_for(fields):
+    """
+    Arguments:
+        fields (list): Dotted field paths eg ['title', 'version.number', 'body.storage.value']
+
+    Returns:
+        expand (Optional[str]): The expansions the content api needs to return those fields eg 'version,body.storage'
+
+    """
+
+    expansions = []
+    for field in fields:
+        parts = field.split('.')
+        # Top level fields, links and the names of unexpanded fields always come back
+        if len(parts) == 1 or parts[0] in ('_links', '_expandable'):
+            continue
+        expansion = '.'.join(parts[:-1])
+        if expansion not in expansions:
+            expansions.append(expansion)
+    return ','.join(expansions) or None
+
+
+class Record(object):
+    """
+        A lightweight result holding only the fields that were asked for, fields are read as
+        attributes named after their path eg 'version.number' is record.version_number
+    """
+
+    __slots__ = ()
+    _fields = ()
+    _paths = ()
+
+    def __init__(self, item):
+        for name, path in zip(self.__slots__, self._paths):
+            value = item
+            for part in path:
+                value = value.get(part) if isinstance(value, dict) else None
+            setattr(self, name, value)
+
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, ', '.join(
+            '{0}={1!r}'.format(name, getattr(self, name)) for name in self.__slots__))
+
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+    def as_dict(self):
+        """
+        Returns:
+            fields (dict): The value of every field keyed by its dotted path
+        """
+
+        return dict((field, getattr(self, name)) for field, name in zip(self._fields, self.__slots__))
+
+
+@functools.lru_cache(maxsize=64)
+def record_type(fields):
+    """
+    Arguments:
+        fields (tuple): Dotted field paths eg ('id', 'title', 'version.number')
+
+    Returns:
+        record_type (type): A Record subclass with a slot for every field, made once per set of fields
+
+    """
+
+    names = tuple(field.replace('.', '_').lstrip('_') for field in fields)
+    assert len(set(names)) == len(names), 'fields should map to unique attribute names'
+    return type('SearchRecord', (Record,), {'__slots__': names, '_fields': tuple(fields),
+                                            '_paths': tuple(tuple(field.split('.')) for field in fields)})
@@ -0,0 +1,201 @@
+import re
+import threading
+from collections import Counter
+
+
+class MetricsCollector(object):
+    """
+        Records the count, latency histogram, status codes and bytes sent and received of every
+        request a client makes. Each request is labelled with its logical operation (the innermost
+        client method that made it, eg 'get_space_key' or 'put_page'), the public method it was
+        made for (eg 'update_page') and its endpoint (eg 'GET content/{id}').
+
+        .. code-block:: python
+
+          from confluenceapi import Confluence, MetricsCollector
+
+          metrics = MetricsCollector()
+          lc = Confluence(conf_server, credentials, metrics=metrics)
+          lc.update_page('Page about DS', 'Data Science', '<p>Nightly numbers</p>')
+
+          metrics.as_dict()['operations']['find_page']['count']
+          print(metrics.to_prometheus())
+    """
+
+    default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    _id_pattern = re.compile(r'/\d+(?=/|$)')
+    _download_pattern = re.compile(r'^(download/attachments/\{id\})/.+$')
+
+    def __init__(self, buckets=None):
+        """
+        Arguments:
+            buckets (Optional[tuple]): Upper bounds in seconds of the latency histogram buckets
+
+        """
+
+        self.buckets = tuple(sorted(buckets or self.default_buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+
+    @classmethod
+    def endpoint(cls, path):
+        """
+        Arguments:
+            path (str): The path of a request relative to the api, eg 'content/123/child/attachment'
+
+        Returns:
+            endpoint (str): The path with ids and file names replaced by placeholders, eg 'content/{id}/child/attachment'
+
+        """
+
+        endpoint = cls._id_pattern.sub('/{id}', '/' + path.strip('/'))[1:]
+        # Attachment downloads end in the file name, which would make a new series per file
+        return cls._download_pattern.sub(r'\1/{name}', endpoint)
+
+
+    def record(self, operation, caller, method, endpoint, status, latency, bytes_sent=0, bytes_received=0):
+        """
+        Arguments:
+            operation (str): The client method that made the request
+            caller (str): The public client method the request was made for
+            method (str): The http method
+            endpoint (str): The templated endpoint, see endpoint()
+            status (Optional[int]): The response status code, None when no response was received
+            latency (float): How long the request took in seconds
+            bytes_sent (int): The size of the request body
+            bytes_received (int): The size of the response body
+
+        """
+
+        key = (operation, caller, method, endpoint)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'count': 0, 'sum': 0.0, 'max': 0.0,
+                                              'buckets': [0] * len(self.buckets), 'status': Counter(),
+                                              'bytes_sent': 0, 'bytes_received': 0}
+            series['count'] += 1
+            series['sum'] += latency
+            series['max'] = max(series['max'], latency)
+            for index, bound in enumerate(self.buckets):
+                if latency <= bound:
+                    series['buckets'][index] += 1
+                    break
+            series['status'][str(status) if status is not None else 'error'] += 1
+            series['bytes_sent'] += bytes_sent
+            series['bytes_received'] += bytes_received
+
+
+    def reset(self):
+        """Forgets everything recorded so far"""
+
+        with self._lock:
+            self._series.clear()
+
+
+    def _aggregate(self, label):
+        """
+        Arguments:
+            label (callable): Maps a series key to the name it is grouped under
+
+        Returns:
+            groups (dict): The combined metrics of every series, keyed by name
+
+        """
+
+        groups = {}
+        for key, series in self._series.items():
+            name = label(key)
+            group = groups.setdefault(name, {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(self.buckets),
+                                             'status': Counter(), 'bytes_sent': 0, 'bytes_received': 0})
+            group['count'] += series['count']
+            group['sum'] += series['sum']
+            group['max'] = max(group['max'], series['max'])
+            group['buckets'] = [a + b for a, b in zip(group['buckets'], series['buckets'])]
+            group['status'].update(series['status'])
+            group['bytes_sent'] += series['bytes_sent']
+            group['bytes_received'] += series['bytes_received']
+
+        return dict((name, {
+            'count': group['count'],
+            'latency': {'sum': group['sum'], 'mean': group['sum'] / group['count'], 'max': group['max'],
+                        'buckets': dict(zip(self.buckets, self._cumulative(group['buckets'])))},
+            'status': dict(group['status']),
+            'bytes_sent': group['bytes_sent'],
+            'bytes_received': group['bytes_received'],
+        }) for name, group in groups.items())
+
+
+    @staticmethod
+    def _cumulative(counts):
+        total = 0
+        cumulative = []
+        for count in counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+
+    def as_dict(self):
+        """
+        Returns:
+            metrics (dict): The metrics grouped by 'operations', 'callers' and 'endpoints', each with
+                a count, latency sum, mean, max and cumulative histogram, status codes and bytes
+
+        """
+
+        with self._lock:
+            return {
+                'operations': self._aggregate(lambda key: key[0]),
+                'callers': self._aggregate(lambda key: key[1]),
+                'endpoints': self._aggregate(lambda key: key[2] + ' ' + key[3]),
+            }
+
+
+    @staticmethod
+    def _escape(value):
+        # Label values escape backslashes, quotes and new lines in the exposition format
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+    def to_prometheus(self, prefix='confluenceapi'):
+        """
+        Arguments:
+            prefix (str): The prefix for every metric name
+
+        Returns:
+            text (str): The metrics in the Prometheus text exposition format
+
+        """
+
+        def labels(key, **extra):
+            pairs = list(zip(('operation', 'caller', 'method', 'endpoint'), key)) + sorted(extra.items())
+            return '{' + ','.join('{0}="{1}"'.format(name, self._escape(value)) for name, value in pairs) + '}'
+
+        lines = [
+            '# HELP {prefix}_requests_total Requests made to the Confluence api'.format(prefix=prefix),
+            '# TYPE {prefix}_requests_total counter'.format(prefix=prefix),
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            for key, values in series:
+                for status, count in sorted(values['status'].items()):
+                    lines.append('{prefix}_requests_total{labels} {count}'.format(prefix=prefix, labels=labels(key, status=status), count=count))
+
+            lines.append('# HELP {prefix}_request_duration_seconds Latency of requests to the Confluence api'.format(prefix=prefix))
+            lines.append('# TYPE {prefix}_request_duration_seconds histogram'.format(prefix=prefix))
+            for key, values in series:
+                for bound, count in zip(self.buckets, self._cumulative(values['buckets'])):
+                    lines.append('{prefix}_request_duration_seconds_bucket{labels} {count}'.format(prefix=prefix, labels=labels(key, le=bound), count=count))
+                lines.append('{prefix}_request_duration_seconds_bucket{labels} {count}'.format(prefix=prefix, labels=labels(key, le='+Inf'), count=values['count']))
+                lines.append('{prefix}_request_duration_seconds_sum{labels} {total}'.format(prefix=prefix, labels=labels(key), total=values['sum']))
+                lines.append('{prefix}_request_duration_seconds_count{labels} {count}'.format(prefix=prefix, labels=labels(key), count=values['count']))
+
+            for name, field in (('sent', 'bytes_sent'), ('received', 'bytes_received')):
+                lines.append('# HELP {prefix}_bytes_{name}_total Bytes {name} in request bodies'.format(prefix=prefix, name=name))
+                lines.append('# TYPE {prefix}_bytes_{name}_total counter'.format(prefix=prefix, name=name))
+                for key, values in series:
+                    lines.append('{prefix}_bytes_{name}_total{labels} {total}'.format(prefix=prefix, name=name, labels=labels(key), total=values[field]))
+        return '\n'.join(lines) + '\n'
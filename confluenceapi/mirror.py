@@ -0,0 +1,288 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from confluenceapi.sync import write_json_atomic
+
+
+class SpaceMirror(object):
+    """
+        Keeps a local copy of a space: the storage format and metadata of every page and optionally
+        every attachment. After the first run only content modified since the last checkpoint is
+        listed, and only pages and attachments whose version moved are downloaded again.
+
+        Layout of the mirror directory::
+
+            manifest.json                 checkpoint (in UTC) and the version of everything mirrored
+            pages/<id>.xml                storage format body
+            pages/<id>.json               id, title, version, ancestors and links
+            attachments/<page id>/<name>  attachment data
+
+        .. code-block:: python
+
+          from confluenceapi import Confluence
+
+          lc = Confluence(conf_server, credentials)
+          stats = lc.mirror_space('Data Science', 'backups/ds', attachments=True, max_workers=16)
+          # {'pages': 120, 'attachments': 14, 'unchanged': 3040, 'removed': 0, 'failed': 0}
+    """
+
+    # How often (in downloads) the manifest is saved so an interrupted run can resume
+    save_every = 50
+
+    # Minutes every run overlaps the last one by, CQL dates have minute precision and re-listing is
+    # cheap as unchanged versions are never downloaded again
+    overlap = 60
+
+    # CQL dates are read in the time zone of the user running the query, which the api doesn't give.
+    # Without time_zone the checkpoint is moved back by the furthest any zone is behind UTC instead
+    furthest_behind_utc = timedelta(hours=12)
+
+    def __init__(self, client, space_key, directory, attachments=False, max_workers=8, time_zone=None):
+        """
+        Arguments:
+            client (Confluence): The client to download with
+            space_key (str): The key of the space to mirror
+            directory (str): The local directory to mirror into
+            attachments (bool): Whether to download attachments as well
+            max_workers (int): The maximum number of downloads to run at once
+            time_zone (Optional[str or tzinfo]): The time zone of the Confluence user, eg 'Europe/London'.
+                Without it every incremental run lists everything modified in the twelve hours before
+                the checkpoint as well (furthest_behind_utc), with it only the overlap is listed again
+
+        """
+
+        assert isinstance(space_key, str), 'space_key should be the key of the space to mirror'
+        assert isinstance(directory, str), 'directory should be the local directory to mirror into'
+        assert isinstance(max_workers, int) and max_workers > 0, 'max_workers must be a positive integer'
+
+        self.client = client
+        self.space_key = space_key
+        self.directory = directory
+        self.attachments = attachments
+        self.max_workers = max_workers
+        if isinstance(time_zone, str):
+            from zoneinfo import ZoneInfo
+            time_zone = ZoneInfo(time_zone)
+        self.time_zone = time_zone
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self._lock = threading.Lock()
+        self._since_save = 0
+        self.manifest = self._load_manifest()
+
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as handle:
+                manifest = json.load(handle)
+            if manifest.get('space_key') == self.space_key:
+                return manifest
+        return {'space_key': self.space_key, 'checkpoint': None, 'pages': {}, 'attachments': {}}
+
+
+    def _save_manifest(self, force=False):
+        with self._lock:
+            self._since_save += 1
+            if force or self._since_save >= self.save_every:
+                self._since_save = 0
+                write_json_atomic(self.manifest_path, self.manifest)
+
+
+    def run(self, full=False):
+        """
+        Arguments:
+            full (bool): List the whole space instead of only what changed since the checkpoint,
+                this also removes local copies of pages that were deleted on the server
+
+        Returns:
+            stats (dict): How many pages and attachments were downloaded, unchanged, removed or failed
+
+        """
+
+        for subdirectory in ('pages', 'attachments'):
+            os.makedirs(os.path.join(self.directory, subdirectory), exist_ok=True)
+
+        checkpoint = None if full else self.manifest.get('checkpoint')
+        stats = {'pages': 0, 'attachments': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        newest = [checkpoint]
+
+        kinds = [('page', self.manifest['pages'], self._download_page)]
+        if self.attachments:
+            kinds.append(('attachment', self.manifest['attachments'], self._download_attachment))
+
+        for content_type, known, download in kinds:
+            cql = 'space = "{space_key}" and type = {content_type}'.format(space_key=self.space_key, content_type=content_type)
+            if checkpoint:
+                cql += ' and lastModified >= "{date}"'.format(date=self._cql_date(checkpoint))
+            expand = 'version,container' if content_type == 'attachment' else 'version'
+
+            seen = set()
+            self._download_changed(self.client.iter_search(cql, expand=expand), known, download, seen, newest, stats)
+
+            if checkpoint is None:
+                for contentid in set(known) - seen:
+                    self._remove(content_type, contentid)
+                    stats['removed'] += 1
+
+        if stats['failed'] == 0:
+            # Only move the checkpoint on when nothing was missed, otherwise the next run retries it
+            self.manifest['checkpoint'] = newest[0]
+        self._save_manifest(force=True)
+        return stats
+
+
+    def _download_changed(self, results, known, download, seen, newest, stats):
+        """
+        Arguments:
+            results (iterator): Content returned by the search, with its version expanded
+            known (dict): The manifest versions for this kind of content keyed by id
+            download (callable): Downloads one piece of content
+            seen (set): Collects the ids of everything listed
+            newest (list): Holds the latest modification time seen, as a checkpoint
+            stats (dict): The counters to update
+
+        """
+
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for result in results:
+                contentid = result['id']
+                seen.add(contentid)
+                when = self._checkpoint(result['version'].get('when'))
+                if when is not None and (newest[0] is None or when > newest[0]):
+                    newest[0] = when
+
+                if known.get(contentid, {}).get('version') == result['version']['number']:
+                    stats['unchanged'] += 1
+                    continue
+
+                pending.add(executor.submit(download, result))
+                # Keep the number of queued downloads bounded so memory stays flat on huge spaces
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._count(done, stats)
+            self._count(pending, stats)
+
+
+    def _count(self, futures, stats):
+        for future in futures:
+            if future.exception() is not None:
+                stats['failed'] += 1
+            else:
+                stats[future.result()] += 1
+
+
+    @staticmethod
+    def _checkpoint(when):
+        """
+        Arguments:
+            when (Optional[str]): A version timestamp eg '2018-01-31T09:15:02.000+01:00'
+
+        Returns:
+            checkpoint (Optional[str]): The timestamp in UTC to the minute eg '2018-01-31T08:15Z',
+                so checkpoints compare as strings whatever offset the server gave
+
+        """
+
+        if not when:
+            return None
+        moment = datetime.fromisoformat(when.replace('Z', '+00:00'))
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc)
+        return moment.strftime('%Y-%m-%dT%H:%MZ')
+
+
+    def _cql_date(self, checkpoint):
+        """
+        Arguments:
+            checkpoint (str): A checkpoint in UTC eg '2018-01-31T08:15Z'
+
+        Returns:
+            date (str): The checkpoint as a CQL date in the user's time zone, moved back by the overlap
+
+        """
+
+        moment = datetime.strptime(checkpoint, '%Y-%m-%dT%H:%MZ').replace(tzinfo=timezone.utc)
+        if self.time_zone is not None:
+            local = moment.astimezone(self.time_zone).replace(tzinfo=None)
+        else:
+            # Early enough whatever zone the user is in, at worst some unchanged content is listed again
+            local = moment.replace(tzinfo=None) - self.furthest_behind_utc
+        return (local - timedelta(minutes=self.overlap)).strftime('%Y-%m-%d %H:%M')
+
+
+    def _download_page(self, result):
+        """
+        Arguments:
+            result (dict): A page from the search results
+
+        Returns:
+            kind (str): 'pages', the counter to increment
+
+        """
+
+        pageid = result['id']
+        response = self.client._get_version(int(pageid), 'body.storage,version,ancestors')
+        page = self.client._json(response)
+
+        body = page.pop('body')['storage']['value']
+        path = os.path.join(self.directory, 'pages', pageid)
+        with open(path + '.xml', 'w', encoding='utf-8') as handle:
+            handle.write(body)
+        write_json_atomic(path + '.json', page)
+
+        with self._lock:
+            self.manifest['pages'][pageid] = {'version': page['version']['number'], 'title': page['title']}
+        self._save_manifest()
+        return 'pages'
+
+
+    def _download_attachment(self, result):
+        """
+        Arguments:
+            result (dict): An attachment from the search results, with its container expanded
+
+        Returns:
+            kind (str): 'attachments', the counter to increment
+
+        """
+
+        pageid = result['container']['id']
+        folder = os.path.join(self.directory, 'attachments', pageid)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, os.path.basename(result['title']))
+
+        response = self.client._request('GET', self.client.base_url + result['_links']['download'],
+                                        operation='mirror_space', stream=True)
+        with response:
+            response.raise_for_status()
+            with open(path + '.part', 'wb') as handle:
+                for chunk in response.iter_content(1024 * 1024):
+                    handle.write(chunk)
+        os.replace(path + '.part', path)
+
+        with self._lock:
+            self.manifest['attachments'][result['id']] = {'version': result['version']['number'],
+                                                          'page': pageid, 'title': result['title']}
+        self._save_manifest()
+        return 'attachments'
+
+
+    def _remove(self, content_type, contentid):
+        """
+        Arguments:
+            content_type (str): 'page' or 'attachment'
+            contentid (str): The id of the content that no longer exists on the server
+
+        """
+
+        if content_type == 'page':
+            self.manifest['pages'].pop(contentid, None)
+            paths = [os.path.join(self.directory, 'pages', contentid + extension) for extension in ('.xml', '.json')]
+        else:
+            entry = self.manifest['attachments'].pop(contentid, {})
+            paths = [os.path.join(self.directory, 'attachments', entry.get('page', ''), entry.get('title', ''))]
+        for path in paths:
+            if os.path.isfile(path):
+                os.remove(path)
@@ -1,5 +1,174 @@
-from jinja2 import Template
-import pandas as pd
+import io
+import threading
+
+
+class TemplateRegistry(object):
+    """
+        Compiles each template once and keeps it by name, so building a page only renders.
+        Autoescaping is off by default on purpose: every builder method has always passed its
+        text through as storage format html (warnings, code and custom html rely on it), so
+        register a template with autoescape=True when it renders untrusted text.
+
+        .. code-block:: python
+
+          from confluenceapi import ConfluencePageBuilder
+          from confluenceapi.pagebuilder import registry
+
+          registry.register('status', '<ac:structured-macro ac:name="status">'
+                                       '<ac:parameter ac:name="colour">{{ colour }}</ac:parameter>'
+                                       '<ac:parameter ac:name="title">{{ title }}</ac:parameter>'
+                                       '</ac:structured-macro>', autoescape=True)
+
+          cp = ConfluencePageBuilder()
+          cp.add_component('status', colour='Green', title='Passing')
+    """
+
+    def __init__(self, environment=None):
+        """
+            Arguments:
+            environment (jinja2.Environment): The environment to compile templates with, defaults to one without autoescaping
+            """
+        self._environment = environment
+        self._templates = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+
+    @property
+    def environment(self):
+        """The jinja2 environment, jinja2 is only imported once the first template is compiled"""
+        if self._environment is None:
+            from jinja2 import Environment
+            self._environment = Environment(autoescape=False)
+        return self._environment
+
+
+    def register(self, name, source, autoescape=False, lazy=False):
+        """
+            Arguments:
+            name (str): The name to render the template by, replacing any template already registered with it
+            source (str): The jinja2 template source
+            autoescape (bool): Whether to html escape every value rendered into the template
+            lazy (bool): Compile the template the first time it is rendered instead of now
+
+            Returns:
+            template (jinja2.Template): The compiled template, None when lazy
+            """
+        assert isinstance(name, str), "name should be a string representing the name of the template"
+        assert isinstance(source, str), "source should be a string representing the jinja2 template"
+
+        if autoescape:
+            source = '{% autoescape true %}' + source + '{% endautoescape %}'
+        with self._lock:
+            self._templates.pop(name, None)
+            self._sources[name] = source
+        return None if lazy else self.get(name)
+
+
+    def get(self, name):
+        """
+            Arguments:
+            name (str): The name of a registered template
+
+            Returns:
+            template (jinja2.Template): The compiled template
+            """
+        template = self._templates.get(name)
+        if template is not None:
+            return template
+        with self._lock:
+            if name not in self._sources:
+                raise ValueError('No template registered as {name}'.format(name=name))
+            if name not in self._templates:
+                self._templates[name] = self.environment.from_string(self._sources[name])
+            return self._templates[name]
+
+
+    def render(self, name, **context):
+        """
+            Arguments:
+            name (str): The name of a registered template
+            context: The values to render the template with
+
+            Returns:
+            html (str): The rendered template
+            """
+        return self.get(name).render(**context)
+
+
+    def __contains__(self, name):
+        return name in self._sources
+
+
+    def names(self):
+        """
+            Returns:
+            names (list): The names of every registered template
+            """
+        return sorted(self._sources)
+
+
+# Shared by every ConfluencePageBuilder, the built in components are compiled once on first use
+registry = TemplateRegistry()
+
+registry.register('title', """
+            <{{ heading }}>{{ title }}</{{ heading }}>
+            """, lazy=True)
+
+registry.register('chart', """
+            <ac:structured-macro ac:name="chart">
+            {% if title %}<ac:parameter ac:name="title">{{ title }}</ac:parameter>{% endif %}
+            <ac:parameter ac:name="type">{{ graph_type }}</ac:parameter>
+            <ac:rich-text-body>{{ html_df }}</ac:rich-text-body>
+            </ac:structured-macro>
+            """, lazy=True)
+
+registry.register('warning', """
+            <ac:structured-macro ac:name="{{ warning_type }}">
+            {% if title %}<ac:parameter ac:name="title">{{ title }}</ac:parameter>{% endif %}
+            {% if icon == false%}<ac:parameter ac:name="icon">false</ac:parameter>{% endif %}
+            <ac:rich-text-body>{{ text }}</ac:rich-text-body>
+            </ac:structured-macro>
+            """, lazy=True)
+
+registry.register('code_block', """
+            <ac:structured-macro ac:name="code">
+            {% if title %}<ac:parameter ac:name="title">{{ title }}</ac:parameter>{% endif %}
+            {% if theme %}<ac:parameter ac:name="theme">{{ theme }}</ac:parameter>{% endif %}
+            {% if linenumbers == true %}<ac:parameter ac:name="linenumbers">true</ac:parameter>{% endif %}
+            {% if language %}<ac:parameter ac:name="language">{{ language }}</ac:parameter>{% endif %}
+            {% if collapse == true %}<ac:parameter ac:name="collapse">true</ac:parameter>{% endif %}
+            <ac:plain-text-body><![CDATA[{{ code }}]]></ac:plain-text-body>
+            </ac:structured-macro>
+            """, lazy=True)
+
+registry.register('tag_user', """
+            <ac:link><ri:user ri:username="{{ username }}"/></ac:link>
+            """, lazy=True)
+
+registry.register('page_link', """
+            <ac:link><ri:page ri:space-key="{{ space }}" ri:content-title="{{ page }}"/></ac:link>
+            """, lazy=True)
+
+registry.register('pdf_preview', """
+            <ac:structured-macro ac:name="viewpdf">
+            <ac:parameter ac:name="name"><ri:attachment ri:filename="{{ filename }}"/></ac:parameter>
+            </ac:structured-macro>
+            """, lazy=True)
+
+registry.register('table_of_contents', """
+            <ac:structured-macro ac:name="toc">
+            <ac:parameter ac:name="printable">{{ printable }}</ac:parameter>
+            <ac:parameter ac:name="style">{{ style }}</ac:parameter>
+            <ac:parameter ac:name="maxLevel">{{ max_level }}</ac:parameter>
+            <ac:parameter ac:name="indent">{{ indent }}</ac:parameter>
+            <ac:parameter ac:name="minLevel">{{ min_level }}</ac:parameter>
+            {% if exclude %}<ac:parameter ac:name="exclude">{{ exclude }}</ac:parameter>{% endif %}
+            <ac:parameter ac:name="type">{{ toc_type }}</ac:parameter>
+            <ac:parameter ac:name="outline">{{ outline }}</ac:parameter>
+            {% if include %}<ac:parameter ac:name="include">{{ include }}</ac:parameter>{% endif %}
+            </ac:structured-macro>
+            """, lazy=True)
 
 
 class ConfluencePageBuilder(object):
@@ -45,13 +214,36 @@ class ConfluencePageBuilder(object):
         cp.add_new_line()
         cp.add_warning("We just appended this warning!", "warning")
         lc.update_page('Page about DS', 'Data Science', cp.render())
-        
+
+        # Or put the parts that change in named sections and update only those later on
+        cp.restart()
+        cp.add_title("Nightly numbers", "h2")
+        cp.add_section("status", "<p>Running</p>")
+        lc.update_page('Page about DS', 'Data Science', cp.render())
+        lc.update_section('Page about DS', 'Data Science', 'status', '<p>Finished</p>')
+
         """
     
-    def __init__(self):
-        self.html = ""
-    
-    
+    def __init__(self, templates=None):
+        """
+            Arguments:
+            templates (TemplateRegistry): Where to find compiled components, defaults to the shared module level registry
+            """
+        self.templates = templates if templates is not None else registry
+        self._fragments = []
+
+
+    @property
+    def html(self):
+        """The html built so far, kept for compatibility, prefer render, iter_render or render_to"""
+        return self.render()
+
+
+    @html.setter
+    def html(self, html):
+        self._fragments = [html]
+
+
     def add_title(self, title, heading="h1"):
         """
             Arguments:
@@ -61,168 +253,151 @@ class ConfluencePageBuilder(object):
         assert isinstance(title, str), "title should be a string representating the title to be added"
         assert isinstance(heading, str) and heading in ['h'+str(x) for x in range(1,8)], \
             "heading should be a string representating html heading tag, one of ('h1','h2','h3'....'h7')"
-        
-        t = Template("""
-            <{{ heading }}>{{ title }}</{{ heading }}>
-            """)
-        self.html += t.render(title=title, heading=heading)
-            
-            
-            def add_new_line(self):
+
+        self._fragments.append(self.templates.render('title', title=title, heading=heading))
+
+
+    def add_new_line(self):
         """Adds a new line"""
-                self.html += "<br></br>"
+        self._fragments.append("<br></br>")
 
 
-def add_table(self, df, escape=False):
-    """
-        Arguments:
-        df (pandas.DataFrame): Table to populate the page with
-        escape (bool): Whether to escape from html (allows html in df to be rendered)
+    def add_table(self, df, escape=False, formatters=None, max_rows=None, index=True):
         """
-            assert isinstance(df, pd.DataFrame), "df should be a pandas data frame object"
-        
-            # Pandas will truncate after 50 chars if this isnt in
-            with pd.option_context('display.max_colwidth', -1):
-                self.html += df.to_html(escape=escape)
+            Arguments:
+            df (pandas.DataFrame): Table to populate the page with
+            escape (bool): Whether to escape from html (allows html in df to be rendered)
+            formatters (dict): Column name to a callable or format string eg {'price': '{:,.2f}'}, None formats the index
+            max_rows (int): Only write the first max_rows rows followed by a note of how many were left out
+            index (bool): Whether to write the index as the first column
+            """
+        import pandas as pd
+        from confluenceapi.tables import table_fragments
+        assert isinstance(df, pd.DataFrame), "df should be a pandas data frame object"
+        assert isinstance(formatters, dict) or formatters is None, "formatters should be a dict of column names to callables or format strings"
+        assert (isinstance(max_rows, int) and max_rows >= 0) or max_rows is None, "max_rows should be a non negative integer or None"
 
+        total = len(df)
+        if max_rows is not None and total > max_rows:
+            df = df.iloc[:max_rows]
+        # Whole columns are formatted at once and the rows come in chunks, which stay separate fragments to stream
+        self._fragments.extend(table_fragments(df, formatters, escape, index))
+        if len(df) < total:
+            self._fragments.append('<p>Showing the first {shown} of {total} rows</p>'.format(shown=len(df), total=total))
 
-def add_chart(self, df, graph_type, title=None):
-    """
-        Arguments:
-        df (pandas.DataFrame): Table to populate the chart with
-        title (str): The title for the chart
-        graph_type (str): The graph type can be one of 'bar', 'pie', 'area' or 'line'
+
+    def add_chart(self, df, graph_type, title=None, max_points=None, downsample='lttb'):
         """
-            assert isinstance(df, pd.DataFrame), "df should be a pandas data frame object"
-            assert isinstance(graph_type, str) and graph_type in ['bar', 'pie', 'line', 'area'], "graph_type should be a string of either 'bar', 'pie', 'line' or 'area'"
-            assert isinstance(title, str) or title is None, "title should be a string representating the title for the graph"
-        
-            t = Template("""
-                <ac:structured-macro ac:name="chart">
-                {% if title %}<ac:parameter ac:name="title">{{ title }}</ac:parameter>{% endif %}
-                <ac:parameter ac:name="type">{{ graph_type }}</ac:parameter>
-                <ac:rich-text-body>{{ html_df }}</ac:rich-text-body>
-                </ac:structured-macro>
-                """)
-            self.html += t.render(title=title, html_df=df.to_html(), graph_type=graph_type)
+            Arguments:
+            df (pandas.DataFrame): Table to populate the chart with
+            title (str): The title for the chart
+            graph_type (str): The graph type can be one of 'bar', 'pie', 'area' or 'line'
+            max_points (int): Downsample frames with more rows than this so the chart stays small and quick to render
+            downsample (str): How to downsample, 'lttb' keeps the shape, 'minmax' keeps the extremes and 'mean' averages
+            """
+        import pandas as pd
+        from confluenceapi import downsample as downsampling
+        from confluenceapi.tables import to_storage_table
+        assert isinstance(df, pd.DataFrame), "df should be a pandas data frame object"
+        assert isinstance(graph_type, str) and graph_type in ['bar', 'pie', 'line', 'area'], "graph_type should be a string of either 'bar', 'pie', 'line' or 'area'"
+        assert isinstance(title, str) or title is None, "title should be a string representating the title for the graph"
+        assert (isinstance(max_points, int) and max_points > 0) or max_points is None, "max_points should be a positive integer or None"
+        assert downsample in downsampling.methods, "downsample should be a string of either 'lttb', 'minmax' or 'mean'"
 
+        if max_points is not None:
+            df = downsampling.downsample(df, max_points, downsample)
+        self._fragments.append(self.templates.render('chart', title=title, html_df=to_storage_table(df), graph_type=graph_type))
 
-def add_warning(self, text, warning_type="warning", title=None, icon=True):
-    """
-        Arguments:
-        text (str): The text to put into the warning
-        warning_type (str): The warning_type for the macro, can be one of 'warning', 'note', 'tip' or 'info'
-        title (str): The title for the warning
-        icon (bool): Whether to display an icon on the macro or not
+
+    def add_warning(self, text, warning_type="warning", title=None, icon=True):
         """
-            assert warning_type in ['warning', 'note', 'tip', 'info'], 'warning_note can only take the forms of "note", "tip", "info" and "warning"'
-            assert isinstance(title, str) or title is None, "title should be a string representing the title for the warning macro to display"
-            assert isinstance(icon, bool), "title should be a bool representing whether to display an icon on the macro or not"
-        
-            t = Template("""
-                <ac:structured-macro ac:name="{{ warning_type }}">
-                {% if title %}<ac:parameter ac:name="title">{{ title }}</ac:parameter>{% endif %}
-                {% if icon == false%}<ac:parameter ac:name="icon">false</ac:parameter>{% endif %}
-                <ac:rich-text-body>{{ text }}</ac:rich-text-body>
-                </ac:structured-macro>
-                """)
-            self.html += t.render(text=text, warning_type=warning_type, icon=icon, title=title)
-
-
-def add_code_block(self, code, title=None, theme=None, linenumbers=False,
-                   language=None, collapse=False):
-    """
-        Arguments:
-        code (str): The code to put into the code block
-        title (str): The title for the warning
-        theme (str): The theme for the code block
-        linenumbers (bool): Whether or not to display the codeblock with line numbers or not
-        language (str): The language for the code block to apply syntax highlighting to
-        collapse (bool): Whether or not to collapse the codebock on init
+            Arguments:
+            text (str): The text to put into the warning
+            warning_type (str): The warning_type for the macro, can be one of 'warning', 'note', 'tip' or 'info'
+            title (str): The title for the warning
+            icon (bool): Whether to display an icon on the macro or not
+            """
+        assert warning_type in ['warning', 'note', 'tip', 'info'], 'warning_note can only take the forms of "note", "tip", "info" and "warning"'
+        assert isinstance(title, str) or title is None, "title should be a string representing the title for the warning macro to display"
+        assert isinstance(icon, bool), "title should be a bool representing whether to display an icon on the macro or not"
+
+        self._fragments.append(self.templates.render('warning', text=text, warning_type=warning_type, icon=icon, title=title))
+
+
+    def add_code_block(self, code, title=None, theme=None, linenumbers=False,
+                       language=None, collapse=False):
         """
-            
-            assert isinstance(code, str), "code should be a string representing the code to display"
-            assert isinstance(title, str) or title is None, \
-                "title should be a string representing the title for the codeblock to display"
-                    assert isinstance(theme, str) or theme is None, \
-                        "theme should be a string representing the theme to display the codeblock in"
-                            assert isinstance(linenumbers, bool), \
-                                "linenumbers should be a bool representing whether or not to display the codeblock with line numbers or not"
-                                    assert isinstance(language, str) or language is None, \
-                                        "language should be a string representing the language of the codeblock to display"
-                                            assert isinstance(collapse, bool), \
-                                                "collapse should be a bool representing whether or not to collapse the codebock on init"
-                                                    
-                                                    t = Template("""
-                                                        <ac:structured-macro ac:name="code">
-                                                        {% if title %}<ac:parameter ac:name="title">{{ title }}</ac:parameter>{% endif %}
-                                                        {% if theme %}<ac:parameter ac:name="theme">{{ theme }}</ac:parameter>{% endif %}
-                                                        {% if linenumbers == true %}<ac:parameter ac:name="linenumbers">true</ac:parameter>{% endif %}
-                                                        {% if language %}<ac:parameter ac:name="language">{{ language }}</ac:parameter>{% endif %}
-                                                        {% if collapse == true %}<ac:parameter ac:name="collapse">true</ac:parameter>{% endif %}
-                                                        <ac:plain-text-body><![CDATA[{{ code }}]]></ac:plain-text-body>
-                                                        </ac:structured-macro>
-                                                        """)
-                                                    self.html += t.render(code=code, title=title, theme=theme, linenumbers=linenumbers,
-                                                                          language=language, collapse=collapse)
-
-
-def add_tag_user(self, username):
-    """
-        Arguments:
-        username (str): The username to tag
+            Arguments:
+            code (str): The code to put into the code block
+            title (str): The title for the warning
+            theme (str): The theme for the code block
+            linenumbers (bool): Whether or not to display the codeblock with line numbers or not
+            language (str): The language for the code block to apply syntax highlighting to
+            collapse (bool): Whether or not to collapse the codebock on init
+            """
+
+        assert isinstance(code, str), "code should be a string representing the code to display"
+        assert isinstance(title, str) or title is None, \
+            "title should be a string representing the title for the codeblock to display"
+        assert isinstance(theme, str) or theme is None, \
+            "theme should be a string representing the theme to display the codeblock in"
+        assert isinstance(linenumbers, bool), \
+            "linenumbers should be a bool representing whether or not to display the codeblock with line numbers or not"
+        assert isinstance(language, str) or language is None, \
+            "language should be a string representing the language of the codeblock to display"
+        assert isinstance(collapse, bool), \
+            "collapse should be a bool representing whether or not to collapse the codebock on init"
+
+        self._fragments.append(self.templates.render('code_block', code=code, title=title, theme=theme, linenumbers=linenumbers,
+                                                     language=language, collapse=collapse))
+
+
+    def add_tag_user(self, username):
         """
-            assert isinstance(username, str), "username should be a string representing the username you wish to tag"
-        
-            t = Template("""
-                <ac:link><ri:user ri:username="{{ username }}"/></ac:link>
-                """)
-            self.html += t.render(username=username)
+            Arguments:
+            username (str): The username to tag
+            """
+        assert isinstance(username, str), "username should be a string representing the username you wish to tag"
 
+        self._fragments.append(self.templates.render('tag_user', username=username))
 
-def add_page_link(self, page_name, space_key):
-    """
-        Arguments:
-        page_name (str): The page name to link to within the given space
-        space_key (str): The space key for the given page
+
+    def add_page_link(self, page_name, space_key):
         """
-            assert isinstance(page, str), "page should be a string representing the page to link to within the given space"
-            assert isinstance(space, str), "space should be a string representing the space link to for the given page"
-        
-            t =  Template("""
-                <ac:link><ri:page ri:space-key="{{ space }}" ri:content-title="{{ page }}"/></ac:link>
-                """)
-            self.html += t.render(page=page, space=space)
+            Arguments:
+            page_name (str): The page name to link to within the given space
+            space_key (str): The space key for the given page
+            """
+        assert isinstance(page_name, str), "page_name should be a string representing the page to link to within the given space"
+        assert isinstance(space_key, str), "space_key should be a string representing the space link to for the given page"
 
+        self._fragments.append(self.templates.render('page_link', page=page_name, space=space_key))
 
-def add_pdf_preview(self, filename):
-    """
-        Arguments:
-        filename (str): The filename of the pdf to view (must be attached to the page to preview)
+
+    def add_pdf_preview(self, filename):
+        """
+            Arguments:
+            filename (str): The filename of the pdf to view (must be attached to the page to preview)
+            """
+        assert isinstance(filename, str), "filename should be a string representing the pdf file you wish to preview"
+        self._fragments.append(self.templates.render('pdf_preview', filename=filename))
+
+
+    def add_table_of_contents(self, toc_type="list", min_level=1, max_level=7,
+                              style="disc", outline=False, indent="0px",
+                              exclude=None, include=None, printable=True):
         """
-            assert isinstance(filename, str), "filename should be a string representing the pdf file you wish to preview"
-            t = Template("""
-                <ac:structured-macro ac:name="viewpdf">
-                <ac:parameter ac:name="name"><ri:attachment ri:filename="{{ filename }}"/></ac:parameter>
-                </ac:structured-macro>
-                """)
-            self.html += t.render(filename=filename)
-
-        def add_table_of_contents(self, toc_type="list", min_level=1, max_level=7,
-                                  style="disc", outline=False, indent="0px",
-                                  exclude=None, include=None, printable=True):
-                                  """
-                                      Arguments:
-                                      toc_type (str): Possible options are 'list' or 'flat'.
-                                      min_level (int): The highest heading level to start your TOC  list.  For example, entering 2 will include levels 2, and lower, headings, but will not include level 1 headings.
-                                      max_level (int): The lowest heading level to include.  For example, entering 2 will include levels 1 and 2, but will not include level 3 headings and below.
-                                      style (str): The style of the toc list bullet points can be any valid CSS style eg 'circle', 'disc', 'square', 'decimal', 'lower-alpha, 'lower-roman', 'upper-roman'
-                                      outline (bool): Whether to apply outline numbering to your headings, for example: 1.1, 1.2, 1.3.
-                                      indent (str): Sets the indent for a list according to CSS quantities. Entering 10px will successively indent heading groups by 10px. For example, level 1 headings will be indented 10px and level 2 headings will be indented an additional 10px.
-                                      exclude (str): Filter headings to enclude according to specific criteria
-                                      include (str): Filter headings to include according to specific criteria.
-                                      printable (bool): Whether to allow the TOC to be visible when you print the page.
-                                      """
+            Arguments:
+            toc_type (str): Possible options are 'list' or 'flat'.
+            min_level (int): The highest heading level to start your TOC  list.  For example, entering 2 will include levels 2, and lower, headings, but will not include level 1 headings.
+            max_level (int): The lowest heading level to include.  For example, entering 2 will include levels 1 and 2, but will not include level 3 headings and below.
+            style (str): The style of the toc list bullet points can be any valid CSS style eg 'circle', 'disc', 'square', 'decimal', 'lower-alpha, 'lower-roman', 'upper-roman'
+            outline (bool): Whether to apply outline numbering to your headings, for example: 1.1, 1.2, 1.3.
+            indent (str): Sets the indent for a list according to CSS quantities. Entering 10px will successively indent heading groups by 10px. For example, level 1 headings will be indented 10px and level 2 headings will be indented an additional 10px.
+            exclude (str): Filter headings to enclude according to specific criteria
+            include (str): Filter headings to include according to specific criteria.
+            printable (bool): Whether to allow the TOC to be visible when you print the page.
+            """
         assert isinstance(toc_type, str) and toc_type in ['list', 'flat'], "toc_type should be a string representing the table of contents type, can be 'list' or 'flat'"
         assert isinstance(min_level, int), "min_level should be a integer representing the highest heading level to start your TOC  list"
         assert isinstance(max_level, int), "max_level should be a integer representing the lowest heading level to include in your TOC  list"
@@ -233,42 +408,83 @@ def add_pdf_preview(self, filename):
         assert isinstance(include, str) or include is None, "include should be a string representing the regex criteria to filter the headings on which to include"
         assert isinstance(printable, bool), "printable should be a boolen value representing whether to allow the TOC to be visible when you print the page."
 
-        t = Template("""
-            <ac:structured-macro ac:name="toc">
-            <ac:parameter ac:name="printable">{{ printable }}</ac:parameter>
-            <ac:parameter ac:name="style">{{ style }}</ac:parameter>
-            <ac:parameter ac:name="maxLevel">{{ max_level }}</ac:parameter>
-            <ac:parameter ac:name="indent">{{ indent }}</ac:parameter>
-            <ac:parameter ac:name="minLevel">{{ min_level }}</ac:parameter>
-            {% if exclude %}<ac:parameter ac:name="exclude">{{ exclude }}</ac:parameter>{% endif %}
-            <ac:parameter ac:name="type">{{ toc_type }}</ac:parameter>
-            <ac:parameter ac:name="outline">{{ outline }}</ac:parameter>
-            {% if include %}<ac:parameter ac:name="include">{{ include }}</ac:parameter>{% endif %}
-            </ac:structured-macro>
-            """)
-        self.html += t.render(style=style, outline=outline, printable=printable,
-                              max_level=max_level, indent=indent, min_level=min_level,
-                              exclude=exclude, toc_type=toc_type, include=include)
+        self._fragments.append(self.templates.render('table_of_contents', style=style, outline=outline, printable=printable,
+                                                     max_level=max_level, indent=indent, min_level=min_level,
+                                                     exclude=exclude, toc_type=toc_type, include=include))
 
-def add_custom_html(self, html):
-    """
-        Arguments:
-        html (str): The custom html you wish to add to the page
+
+    def add_component(self, name, **context):
         """
-            assert isinstance(html, str), "html should be a string representing the custom html you wish to add to the page"
-            self.html += html
-        
+            Arguments:
+            name (str): The name of a template registered with the builder's TemplateRegistry
+            context: The values to render the template with
+            """
+        assert isinstance(name, str), "name should be a string representing the name of a registered template"
+        self._fragments.append(self.templates.render(name, **context))
 
-        def restart(self):
-        """Restarts the html generator"""
-                self.html = ""
 
+    def add_section(self, name, body):
+        """
+            Arguments:
+            name (str): The name of the section, Confluence.update_section replaces just this section later on
+            body (str or ConfluencePageBuilder): The html to put in the section
+            """
+        from confluenceapi.sections import section_markers
+        assert isinstance(body, str) or isinstance(body, ConfluencePageBuilder), \
+            "body should be a string of html or a ConfluencePageBuilder to put in the section"
+
+        start, end = section_markers(name)
+        self._fragments.append(start)
+        self._fragments.extend([body] if isinstance(body, str) else body.iter_render())
+        self._fragments.append(end)
 
-def render(self):
-    """Renders the built html
-        
-        Returns:
-        html (str): The generated html ready to be uploaded through the confluence api
+
+    def add_custom_html(self, html):
         """
-            return self.html
+            Arguments:
+            html (str): The custom html you wish to add to the page
+            """
+        assert isinstance(html, str), "html should be a string representing the custom html you wish to add to the page"
+        self._fragments.append(html)
+
 
+    def restart(self):
+        """Restarts the html generator"""
+        self._fragments = []
+
+
+    def render(self):
+        """Renders the built html
+
+            Returns:
+            html (str): The generated html ready to be uploaded through the confluence api
+            """
+        return ''.join(self._fragments)
+
+
+    def iter_render(self):
+        """Renders the built html piece by piece, the client streams a builder like this without joining it
+
+            Returns:
+            fragments (iterator): The html fragments in order, joined they are the same as render()
+            """
+        return iter(list(self._fragments))
+
+
+    def render_to(self, fileobj):
+        """Writes the built html to a file without joining it into one string first
+
+            Arguments:
+            fileobj (file): A file-like object opened for writing in text or binary mode, binary files get utf-8
+
+            Returns:
+            size (int): How many characters or bytes were written
+            """
+        binary = isinstance(fileobj, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(fileobj, 'mode', '')
+        size = 0
+        for fragment in self._fragments:
+            if binary:
+                fragment = fragment.encode('utf-8')
+            fileobj.write(fragment)
+            size += len(fragment)
+        return size
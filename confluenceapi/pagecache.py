@@ -0,0 +1,150 @@
+import os
+import tempfile
+import threading
+
+
+class DiskPageCache(object):
+    """
+        A persistent cache of page bodies keyed by page id and version, bounded in size with
+        least recently used eviction. Because a page body never changes for a given version,
+        an entry only has to be revalidated with a cheap version lookup.
+
+        .. code-block:: python
+
+          from confluenceapi import Confluence, DiskPageCache
+
+          lc = Confluence(conf_server, credentials, page_cache=DiskPageCache('~/.cache/confluence', max_bytes=512 * 1024 ** 2))
+
+          lc.get_page_contents('Page about DS', 'Data Science')  # Downloaded
+          lc.get_page_contents('Page about DS', 'Data Science')  # Version checked, read from disk
+    """
+
+    suffix = '.xml'
+
+    def __init__(self, directory, max_bytes=256 * 1024 ** 2):
+        """
+        Arguments:
+            directory (str): Where to store the cached page bodies
+            max_bytes (int): The maximum total size of the cache on disk
+
+        """
+
+        assert isinstance(directory, str), 'directory should be the folder to store cached pages in'
+        assert isinstance(max_bytes, int) and max_bytes > 0, 'max_bytes must be a positive integer'
+
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._sizes = {}
+        for name in os.listdir(self.directory):
+            if name.endswith(self.suffix):
+                self._sizes[name] = os.path.getsize(os.path.join(self.directory, name))
+
+
+    def _name(self, pageid, version):
+        return '{pageid}-{version}{suffix}'.format(pageid=pageid, version=version, suffix=self.suffix)
+
+
+    def get(self, pageid, version):
+        """
+        Arguments:
+            pageid (int): The page id
+            version (int): The current version number of the page
+
+        Returns:
+            body (Optional[str]): The cached body for exactly this version, None if it isn't cached
+
+        """
+
+        name = self._name(pageid, version)
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name not in self._sizes:
+                self.misses += 1
+                return None
+            try:
+                with open(path, encoding='utf-8', newline='') as handle:
+                    body = handle.read()
+                # The modification time doubles as the last access time for eviction
+                os.utime(path)
+            except OSError:
+                self._sizes.pop(name, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return body
+
+
+    def set(self, pageid, version, body):
+        """
+        Arguments:
+            pageid (int): The page id
+            version (int): The version number the body belongs to
+            body (str): The page body
+
+        """
+
+        name = self._name(pageid, version)
+        prefix = '{pageid}-'.format(pageid=pageid)
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as temp:
+            temp.write(body)
+
+        with self._lock:
+            os.replace(temp_path, os.path.join(self.directory, name))
+            self._sizes[name] = os.path.getsize(os.path.join(self.directory, name))
+            # Older versions of the page will never be asked for again
+            for stale in [other for other in self._sizes if other.startswith(prefix) and other != name]:
+                self._remove(stale)
+            self._evict()
+
+
+    def clear(self):
+        """Removes every cached page"""
+
+        with self._lock:
+            for name in list(self._sizes):
+                self._remove(name)
+            self.hits = self.misses = 0
+
+
+    def _remove(self, name):
+        self._sizes.pop(name, None)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        modified = {}
+        for name in list(self._sizes):
+            try:
+                modified[name] = os.path.getmtime(os.path.join(self.directory, name))
+            except OSError:
+                # Removed behind our back, so it no longer takes up any space
+                total -= self._sizes.pop(name)
+        for name in sorted(modified, key=modified.get):
+            if total <= self.max_bytes:
+                break
+            total -= self._sizes[name]
+            self._remove(name)
+
+
+    def stats(self):
+        """
+        Returns:
+            stats (dict): The hits, misses, number of pages and bytes used by the cache
+
+        """
+
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'pages': len(self._sizes), 'bytes': sum(self._sizes.values())}
@@ -0,0 +1,136 @@
+import time
+import threading
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value):
+    """
+    Arguments:
+        value (Optional[str]): A Retry-After header, either seconds or an http date
+
+    Returns:
+        seconds (Optional[float]): How long the server asked to wait, None if it didn't say
+
+    """
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter(object):
+    """
+        A token bucket shared by every thread and asyncio task that uses it. When the server
+        throttles (429 or 503) the limiter pauses everyone for the Retry-After time, or an
+        exponential backoff, and halves its rate, then creeps back up to the configured rate
+        as requests succeed again.
+
+        .. code-block:: python
+
+          from confluenceapi import Confluence, RateLimiter
+
+          limiter = RateLimiter(rate=20, burst=40)
+          lc = Confluence(conf_server, credentials, rate_limit=limiter, pool_size=32)
+
+          with ThreadPoolExecutor(32) as pool:
+              list(pool.map(lambda title: lc.update_page(title, 'Data Science', html), titles))
+    """
+
+    def __init__(self, rate=10.0, burst=None, min_rate=0.5, max_backoff=60.0):
+        """
+        Arguments:
+            rate (float): The sustained number of requests per second allowed
+            burst (Optional[int]): How many requests can be made at once after being idle, defaults to rate
+            min_rate (float): The lowest rate to slow down to while the server is throttling
+            max_backoff (float): The longest pause in seconds when the server doesn't send Retry-After
+
+        """
+
+        assert rate > 0, 'rate must be a positive number of requests per second'
+        assert burst is None or burst >= 1, 'burst must be at least 1'
+
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min(float(min_rate), self.rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.max_backoff = max_backoff
+        self.throttled = 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive = 0
+        self._lock = threading.Lock()
+
+
+    def _reserve(self):
+        """
+        Takes a token, going into debt when there are none left
+
+        Returns:
+            delay (float): How many seconds the caller has to wait before sending its request
+
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(delay, self._blocked_until - now)
+
+
+    def acquire(self):
+        """Blocks the calling thread until a request may be sent"""
+
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+    async def acquire_async(self):
+        """Waits without blocking the event loop until a request may be sent"""
+
+        # Imported here so threaded clients don't pay for loading asyncio
+        import asyncio
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+    def throttle(self, retry_after=None):
+        """
+        Tells the limiter the server rejected a request for going too fast
+
+        Arguments:
+            retry_after (Optional[float]): How many seconds the server asked to wait
+
+        Returns:
+            delay (float): How long every caller will be paused for
+
+        """
+
+        with self._lock:
+            self.throttled += 1
+            self._consecutive += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after is None:
+                retry_after = min(self.max_backoff, 0.5 * 2 ** (self._consecutive - 1))
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            return retry_after
+
+
+    def success(self):
+        """Tells the limiter a request went through, so it can speed back up"""
+
+        with self._lock:
+            self._consecutive = 0
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
@@ -0,0 +1,52 @@
+import re
+
+
+ANCHOR = '<ac:structured-macro ac:name="anchor"><ac:parameter ac:name="">{name}</ac:parameter></ac:structured-macro>'
+
+# Confluence adds attributes like ac:schema-version and ac:macro-id to the macro when it saves a page
+ANCHOR_PATTERN = (r'<ac:structured-macro\b[^>]*\bac:name="anchor"[^>]*>\s*'
+                  r'<ac:parameter ac:name="">{name}</ac:parameter>\s*</ac:structured-macro>')
+
+NAME_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+def check_name(name):
+    assert isinstance(name, str) and NAME_PATTERN.match(name) is not None, \
+        "name should be a string of letters, digits, '_', '-' or '.' naming the section"
+
+
+def section_markers(name):
+    """
+    Arguments:
+        name (str): The name of the section
+
+    Returns:
+        markers (tuple): The anchor macros that start and end the section, the start anchor can be
+            linked to as #name and the end anchor is named name-end
+
+    """
+
+    check_name(name)
+    return ANCHOR.format(name=name), ANCHOR.format(name=name + '-end')
+
+
+def split_section(html, name):
+    """
+    Arguments:
+        html (str): A page body in storage format
+        name (str): The name of the section
+
+    Returns:
+        parts (Optional[tuple]): The html before the section's start anchor, the html between its
+            anchors and the html after its end anchor, None when the page has no such section
+
+    """
+
+    check_name(name)
+    start = re.search(ANCHOR_PATTERN.format(name=re.escape(name)), html)
+    if start is None:
+        return None
+    end = re.compile(ANCHOR_PATTERN.format(name=re.escape(name + '-end'))).search(html, start.end())
+    if end is None:
+        raise ValueError('Section {name} has no end anchor, was it edited by hand?'.format(name=name))
+    return html[:start.start()], html[start.end():end.start()], html[end.end():]
@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import uuid
+import mimetypes
+
+
+class StreamConsumed(Exception):
+    """Raised when a body read from a one-shot source is sent again, eg when a request is retried"""
+
+
+class MultipartEncoder(object):
+    """
+        Streams a multipart/form-data body in fixed size chunks instead of building it in memory,
+        so attachments of any size can be uploaded with a bounded amount of memory.
+
+        Files can be given as a path, bytes, a file-like object or an iterator of bytes. Files opened
+        from a path are closed as soon as they have been sent, or when close() is called.
+
+        .. code-block:: python
+
+          def progress(bytes_sent, total_bytes, bytes_per_second):
+              print('{0}/{1} bytes at {2:.0f} B/s'.format(bytes_sent, total_bytes, bytes_per_second))
+
+          encoder = MultipartEncoder(fields=[('comment', 'Nightly build')],
+                                     files=[('file', 'model.bin', '/data/model.bin')],
+                                     progress=progress)
+          requests.post(url, data=encoder, headers={'Content-Type': encoder.content_type})
+    """
+
+    def __init__(self, fields=None, files=None, chunk_size=1024 * 1024, progress=None):
+        """
+        Arguments:
+            fields (Optional[list]): (name, value) pairs of plain form fields
+            files (Optional[list]): (name, filename, source) tuples where source is a path, bytes,
+                a file-like object opened in binary mode or an iterator of bytes
+            chunk_size (int): How many bytes to read from each file at a time
+            progress (Optional[callable]): Called after every chunk with the bytes sent so far,
+                the total number of bytes (None when unknown) and the throughput in bytes per second
+
+        """
+
+        assert isinstance(chunk_size, int) and chunk_size > 0, 'chunk_size must be a positive integer'
+        assert progress is None or callable(progress), 'progress must be a callable or None'
+
+        self.fields = list(fields or [])
+        self.files = list(files or [])
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary=' + self.boundary
+        self.bytes_sent = 0
+        # Paths are opened again and bytes read again, so only bodies from those can be sent twice
+        self.replayable = all(isinstance(source, (str, bytes, bytearray, memoryview)) for _, _, source in self.files)
+        self._generator = None
+        self._opened = []
+
+        # requests reads the length from here to send a Content-Length, 0 means chunked encoding
+        self.len = self._total_length() or 0
+
+
+    def _field_header(self, name):
+        return ('--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                .format(boundary=self.boundary, name=name)).encode('utf-8')
+
+
+    def _file_header(self, name, filename):
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return ('--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                'Content-Type: {content_type}\r\n\r\n'
+                .format(boundary=self.boundary, name=name, filename=filename.replace('"', '%22'),
+                        content_type=content_type)).encode('utf-8')
+
+
+    def _footer(self):
+        return '--{boundary}--\r\n'.format(boundary=self.boundary).encode('utf-8')
+
+
+    @staticmethod
+    def _source_length(source):
+        """
+        Arguments:
+            source (object): A path, bytes, file-like object or iterator of bytes
+
+        Returns:
+            length (Optional[int]): How many bytes are left to read from source, None if it can't be known
+
+        """
+
+        if isinstance(source, str):
+            return os.path.getsize(source)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return len(source)
+        if hasattr(source, 'seek') and hasattr(source, 'tell'):
+            try:
+                position = source.tell()
+                end = source.seek(0, os.SEEK_END)
+                source.seek(position)
+                return end - position
+            except (OSError, ValueError):
+                return None
+        return None
+
+
+    def _total_length(self):
+        """
+        Returns:
+            length (Optional[int]): The size of the whole body in bytes, None if any file size is unknown
+
+        """
+
+        total = len(self._footer())
+        for name, value in self.fields:
+            total += len(self._field_header(name)) + len(str(value).encode('utf-8')) + 2
+        for name, filename, source in self.files:
+            length = self._source_length(source)
+            if length is None:
+                return None
+            total += len(self._file_header(name, filename)) + length + 2
+        return total
+
+
+    def _read_source(self, source):
+        """
+        Arguments:
+            source (object): A path, bytes, file-like object or iterator of bytes
+
+        Yields:
+            chunk (bytes): At most chunk_size bytes of the source at a time
+
+        """
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            for start in range(0, len(view), self.chunk_size):
+                yield bytes(view[start:start + self.chunk_size])
+        elif isinstance(source, str) or hasattr(source, 'read'):
+            handle = open(source, 'rb') if isinstance(source, str) else source
+            if handle is not source:
+                self._opened.append(handle)
+            try:
+                chunk = handle.read(self.chunk_size)
+                while chunk:
+                    yield chunk
+                    chunk = handle.read(self.chunk_size)
+            finally:
+                if handle is not source:
+                    handle.close()
+                    self._opened.remove(handle)
+        else:
+            for chunk in source:
+                if chunk:
+                    yield bytes(chunk)
+
+
+    def _iter_body(self):
+        for name, value in self.fields:
+            yield self._field_header(name) + str(value).encode('utf-8') + b'\r\n'
+        for name, filename, source in self.files:
+            yield self._file_header(name, filename)
+            for chunk in self._read_source(source):
+                yield chunk
+            yield b'\r\n'
+        yield self._footer()
+
+
+    def __iter__(self):
+        if self._generator is not None:
+            if not self.replayable:
+                raise StreamConsumed('a MultipartEncoder reading from a file object or iterator can only be sent once')
+            # Closes any file the last attempt still had open before starting again
+            self._generator.close()
+            self.bytes_sent = 0
+        self._generator = self._iter_body()
+        start = time.monotonic()
+        total = self.len or None
+        for chunk in self._generator:
+            self.bytes_sent += len(chunk)
+            yield chunk
+            if self.progress is not None:
+                elapsed = time.monotonic() - start
+                self.progress(self.bytes_sent, total, self.bytes_sent / elapsed if elapsed > 0 else 0.0)
+
+
+    def close(self):
+        """Closes every file this encoder opened, even if the body was only partially sent"""
+
+        if self._generator is not None:
+            self._generator.close()
+        for handle in self._opened:
+            handle.close()
+        self._opened = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JSONStream(object):
+    """
+        Streams a json document whose largest string value, eg a page body, comes from an iterable
+        of str fragments. Each fragment is escaped and sent as it is produced, so the value is never
+        joined into one string or copied into a serialised document.
+
+        .. code-block:: python
+
+          payload = {'type': 'page', 'title': 'Report', 'space': {'key': 'DS'},
+                     'body': {'storage': {'value': JSONStream.placeholder, 'representation': 'storage'}}}
+          requests.post(url, data=JSONStream(payload, builder.iter_render()), headers=headers)
+
+          # Given a function returning the fragments the body can be sent again, eg when a request is retried
+          requests.post(url, data=JSONStream(payload, builder.iter_render), headers=headers)
+    """
+
+    placeholder = '\x00confluenceapi-stream\x00'
+
+    def __init__(self, document, fragments, chunk_size=64 * 1024):
+        """
+        Arguments:
+            document (dict): The json document, with placeholder as the value to stream
+            fragments (iterable or callable): The str fragments that make up the streamed value, or a
+                function returning them, a list or a function lets the body be sent more than once
+            chunk_size (int): Fragments are buffered until at least this many characters can be sent at once
+
+        """
+
+        assert isinstance(chunk_size, int) and chunk_size > 0, 'chunk_size must be a positive integer'
+
+        encoded = json.dumps(document)
+        marker = json.dumps(self.placeholder)
+        assert encoded.count(marker) == 1, 'document must contain the placeholder exactly once'
+
+        head, tail = encoded.split(marker)
+        self._head = (head + '"').encode('utf-8')
+        self._tail = ('"' + tail).encode('utf-8')
+        self.fragments = fragments
+        self.chunk_size = chunk_size
+        self.replayable = callable(fragments) or isinstance(fragments, (list, tuple))
+        self.bytes_sent = 0
+        self._started = False
+
+
+    def _iter_body(self, fragments):
+        yield self._head
+        buffered, size = [], 0
+        for fragment in fragments:
+            buffered.append(fragment)
+            size += len(fragment)
+            if size >= self.chunk_size:
+                yield self._escape(buffered)
+                buffered, size = [], 0
+        yield self._escape(buffered) + self._tail
+
+
+    @staticmethod
+    def _escape(fragments):
+        # Escaped the same as the whole string would be, without the surrounding quotes
+        return json.dumps(''.join(fragments))[1:-1].encode('utf-8')
+
+
+    def __iter__(self):
+        if self._started and not self.replayable:
+            raise StreamConsumed('a JSONStream of a one-shot iterator can only be sent once, '
+                                 'give it a list or a function returning the fragments to send it again')
+        self._started = True
+        # Only the attempt being sent counts, a retry starts the body again
+        self.bytes_sent = 0
+        fragments = self.fragments() if callable(self.fragments) else self.fragments
+        for chunk in self._iter_body(fragments):
+            self.bytes_sent += len(chunk)
+            yield chunk
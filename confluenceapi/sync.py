@@ -0,0 +1,194 @@
+import os
+import json
+import atexit
+import hashlib
+import tempfile
+import threading
+from collections import namedtuple
+
+
+class SyncResult(namedtuple('SyncResult', ['written', 'response', 'digest'])):
+    """
+        The outcome of a write made with sync=True
+
+        Attributes:
+            written (bool): Whether anything was sent to the server
+            response (Optional[requests.models.Response]): The response from the write, None when it was skipped
+            digest (str): The sha256 of the content that was compared
+    """
+
+    __slots__ = ()
+
+
+def rewindable(source):
+    """
+    Arguments:
+        source (object): Content given to be hashed and then sent
+
+    Returns:
+        rewindable (bool): Whether the content can be read again after hashing it, generators,
+            iterators and unseekable streams can only be read once
+
+    """
+
+    if isinstance(source, (str, bytes, bytearray, memoryview)):
+        return True
+    if hasattr(source, 'read'):
+        return hasattr(source, 'seek') and getattr(source, 'seekable', lambda: True)()
+    return hasattr(source, '__iter__') and iter(source) is not source
+
+
+def content_digest(source, chunk_size=1024 * 1024):
+    """
+    Arguments:
+        source (object): Bytes, a path to a file, a seekable binary file-like object or an
+            iterable of str fragments, which hash the same as the joined string
+        chunk_size (int): How many bytes to hash at a time
+
+    Returns:
+        digest (str): The hex sha256 of the content, file-like objects are left where they started
+
+    Raises:
+        ValueError: For a file-like object that can't be rewound, hashing it would use up its content
+
+    """
+
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif isinstance(source, str):
+        with open(source, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(chunk_size), b''):
+                digest.update(chunk)
+    elif hasattr(source, 'read'):
+        if not rewindable(source):
+            raise ValueError('Only seekable file-like objects can be hashed, hashing would use up the content')
+        position = source.tell()
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+        source.seek(position)
+    elif hasattr(source, '__iter__'):
+        for fragment in source:
+            digest.update(fragment.encode('utf-8') if isinstance(fragment, str) else fragment)
+    else:
+        raise ValueError('Only bytes, file paths, seekable file-like objects and fragments can be hashed')
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    """
+    Arguments:
+        path (str): The json file to write
+        data (object): Anything json serialisable
+
+    """
+
+    # Write to a temporary file first so an interrupted run never leaves a truncated file
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'w') as temp:
+        json.dump(data, temp)
+    os.replace(temp_path, path)
+
+
+class Manifest(object):
+    """
+        A local record of the content hash and version of everything written with sync=True,
+        so unchanged content can be skipped without downloading it from the server.
+
+        .. code-block:: python
+
+          from confluenceapi import Confluence, Manifest
+
+          lc = Confluence(conf_server, credentials, manifest=Manifest('confluence-manifest.json'))
+          result = lc.update_page('Page about DS', 'Data Science', html, sync=True)
+          result.written  # False when html and the page version are the same as the last sync
+
+          lc.close()  # Writes whatever the manifest hasn't saved yet, so does exiting the interpreter
+    """
+
+    def __init__(self, path=None, save_every=50):
+        """
+        Arguments:
+            path (Optional[str]): The json file to persist the manifest to, None to keep it in memory only
+            save_every (int): How many changes to hold before the file is written again, flush writes them
+                straight away and anything unsaved is written when the interpreter exits
+
+        """
+
+        assert isinstance(save_every, int) and save_every > 0, 'save_every must be a positive integer'
+
+        self.path = path
+        self.save_every = save_every
+        self._entries = {}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if path is not None:
+            if os.path.exists(path):
+                with open(path) as handle:
+                    self._entries = json.load(handle)
+            atexit.register(self.flush)
+
+
+    def get(self, key):
+        """
+        Arguments:
+            key (str): The key of a page or attachment
+
+        Returns:
+            entry (Optional[dict]): The 'digest' and 'version' last written for the key
+
+        """
+
+        with self._lock:
+            return self._entries.get(key)
+
+
+    def set(self, key, digest, version):
+        """
+        Arguments:
+            key (str): The key of a page or attachment
+            digest (str): The sha256 of the content that was written
+            version (int): The version number the server gave the content
+
+        """
+
+        with self._lock:
+            self._entries[key] = {'digest': digest, 'version': version}
+            self._changed()
+
+
+    def delete(self, key):
+        """
+        Arguments:
+            key (str): The key to forget, missing keys are ignored
+
+        """
+
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._changed()
+
+
+    def flush(self):
+        """Writes any changes not saved yet to the file"""
+
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+
+    def _changed(self):
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self._save()
+
+
+    def _save(self):
+        self._unsaved = 0
+        if self.path is not None:
+            write_json_atomic(self.path, self._entries)
+
+
+    def __len__(self):
+        return len(self._entries)
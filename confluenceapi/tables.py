@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from pandas.io.formats.format import format_array
+
+
+def _column_strings(series, formatter=None, escape=True, na_rep=''):
+    """
+    Arguments:
+        series (pandas.Series): A column, or the index as a series
+        formatter (Optional[callable or str]): Formats a single value, or a format string eg '{:,.2f}'
+        escape (bool): Whether to html escape the formatted values
+        na_rep (str): What to show for missing values
+
+    Returns:
+        cells (list): The formatted cell text of every row
+
+    """
+
+    missing = series.isna()
+    if formatter is not None:
+        formatter = formatter.format if isinstance(formatter, str) else formatter
+        strings = series.map(formatter, na_action='ignore').astype(str)
+    else:
+        strings = series.astype(str)
+    # Numbers and dates never contain markup so only text columns need escaping
+    if escape and not (pd.api.types.is_numeric_dtype(series) and formatter is None):
+        strings = (strings.str.replace('&', '&amp;', regex=False)
+                          .str.replace('<', '&lt;', regex=False)
+                          .str.replace('>', '&gt;', regex=False))
+    if missing.any():
+        strings = strings.where(~missing.to_numpy(), na_rep)
+    return strings.tolist()
+
+
+def _float_strings(series, na_rep=''):
+    """
+    Arguments:
+        series (pandas.Series): A float column, or the index as a series
+        na_rep (str): What to show for missing values
+
+    Returns:
+        cells (list): The cell text of every row, the same as DataFrame.to_html writes it with the
+            number of decimals (or scientific notation) chosen for the whole column
+
+    """
+
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    return [cell.strip() for cell in format_array(values, None, na_rep=na_rep)]
+
+
+def _label(label):
+    return ' '.join(str(part) for part in label) if isinstance(label, tuple) else str(label)
+
+
+def table_fragments(df, formatters=None, escape=True, index=True, na_rep='', chunk_rows=2000):
+    """
+    Writes a DataFrame as a Confluence storage format table, a whole column is formatted and
+    escaped at once and rows are joined chunk_rows at a time, so large frames are fast and
+    come out as a handful of fragments to stream. Floats without a formatter are written the way
+    DataFrame.to_html writes them
+
+    Arguments:
+        df (pandas.DataFrame): The table to write
+        formatters (Optional[dict]): Column name to a callable or format string eg {'price': '{:,.2f}'},
+            the index can be formatted with the key None
+        escape (bool): Whether to html escape cell text, turn off to render html kept in the frame
+        index (bool): Whether to write the index as the first column
+        na_rep (str): What to show for missing values
+        chunk_rows (int): How many rows go in each fragment
+
+    Yields:
+        fragment (str): The table markup, joined it is the whole table
+
+    """
+
+    assert isinstance(df, pd.DataFrame), "df should be a pandas data frame object"
+    assert isinstance(chunk_rows, int) and chunk_rows > 0, "chunk_rows should be a positive integer"
+    formatters = formatters or {}
+
+    labels = [_label(column) for column in df.columns]
+    if index:
+        labels.insert(0, _label(df.index.name) if df.index.name is not None else '')
+    if escape:
+        labels = [label.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;') for label in labels]
+    yield '<table><tbody><tr><th>' + '</th><th>'.join(labels) + '</th></tr>'
+
+    # pandas picks the decimals of a float column from all of its values, so floats are formatted up front
+    floats = dict((position, _float_strings(df.iloc[:, position], na_rep)) for position, column in enumerate(df.columns)
+                  if formatters.get(column) is None and pd.api.types.is_float_dtype(df.iloc[:, position]))
+    if index and formatters.get(None) is None and pd.api.types.is_float_dtype(df.index):
+        floats[None] = _float_strings(df.index.to_series(), na_rep)
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        columns = [floats[position][start:start + chunk_rows] if position in floats else
+                   _column_strings(chunk.iloc[:, position], formatters.get(column), escape, na_rep)
+                   for position, column in enumerate(df.columns)]
+        if index:
+            if None in floats:
+                columns.insert(0, floats[None][start:start + chunk_rows])
+            else:
+                index_values = chunk.index.to_series().map(_label) if isinstance(chunk.index, pd.MultiIndex) else chunk.index.to_series()
+                columns.insert(0, _column_strings(index_values, formatters.get(None), escape, na_rep))
+        rows = map('</td><td>'.join, zip(*columns)) if columns else ('' for _ in range(len(chunk)))
+        yield '<tr><td>' + '</td></tr><tr><td>'.join(rows) + '</td></tr>'
+
+    yield '</tbody></table>'
+
+
+def to_storage_table(df, formatters=None, escape=True, index=True, na_rep=''):
+    """
+    Arguments:
+        df (pandas.DataFrame): The table to write
+        formatters (Optional[dict]): Column name to a callable or format string, see table_fragments
+        escape (bool): Whether to html escape cell text
+        index (bool): Whether to write the index as the first column
+        na_rep (str): What to show for missing values
+
+    Returns:
+        html (str): The Confluence storage format table
+
+    """
+
+    return ''.join(table_fragments(df, formatters, escape, index, na_rep))
+
+
+def split_frame(df, max_rows):
+    """
+    Arguments:
+        df (pandas.DataFrame): The table to split
+        max_rows (int): The most rows in each part
+
+    Returns:
+        parts (list): (first row, last row, frame) for every part, rows counted from 1
+
+    """
+
+    assert isinstance(max_rows, int) and max_rows > 0, "max_rows should be a positive integer"
+    return [(start + 1, min(start + max_rows, len(df)), df.iloc[start:start + max_rows])
+            for start in range(0, max(len(df), 1), max_rows)]
@@ -0,0 +1,310 @@
+import os
+import time
+import atexit
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class WriteDropped(Exception):
+    """Set on the future of a write that was never sent, because the queue was full or closed"""
+
+
+class _PendingWrite(object):
+    """The latest call queued for one page, section or attachment and everyone waiting on it"""
+
+    __slots__ = ('method', 'args', 'kwargs', 'due', 'futures')
+
+    def __init__(self, method, args, kwargs, due):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.due = due
+        self.futures = []
+
+
+class WriteBehind(object):
+    """
+        Queues page, section and attachment writes and sends them from a background thread.
+        Writes to the same page made within window seconds of each other are coalesced, only the
+        latest body is sent and every caller's future gets its response. A page write replaces the
+        whole body, so it also takes over any section writes to that page still waiting to be sent.
+
+        .. code-block:: python
+
+          from confluenceapi import Confluence, WriteBehind
+
+          lc = Confluence(conf_server, credentials)
+          with WriteBehind(lc, window=5) as writer:
+              for minute in range(10):
+                  writer.update_page('Status', 'Data Science', '<p>{0} minutes in</p>'.format(minute))
+              future = writer.update_section('Status', 'Data Science', 'summary', '<p>Done</p>')
+
+              writer.flush()       # Send everything queued now instead of waiting for the window
+              future.result()      # The SyncResult of the section update
+
+          writer.stats()  # {'queued': 11, 'merged': 9, 'written': 2, 'failed': 0, 'dropped': 0, 'pending': 0}
+    """
+
+    def __init__(self, client, window=2.0, max_workers=4, max_pending=1000, flush_on_exit=True):
+        """
+        Arguments:
+            client (Confluence): The client to write with
+            window (float): How many seconds to hold a write for, so later writes to the same page can replace it
+            max_workers (int): How many writes to send at once, writes to the same page are always sent one at a time
+            max_pending (int): How many pages, sections and attachments can be waiting at once,
+                writes to anything else are dropped until the queue drains
+            flush_on_exit (bool): Send whatever is still queued when the interpreter exits
+
+        """
+
+        assert window >= 0, 'window must be a non negative number of seconds'
+        assert isinstance(max_workers, int) and max_workers > 0, 'max_workers must be a positive integer'
+        assert isinstance(max_pending, int) and max_pending > 0, 'max_pending must be a positive integer'
+
+        self.client = client
+        self.window = window
+        self.max_pending = max_pending
+        self.counts = {'queued': 0, 'merged': 0, 'written': 0, 'failed': 0, 'dropped': 0}
+        self._pending = {}
+        self._in_flight = set()
+        self._flushing = 0
+        self._closed = False
+        self._exiting = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._thread = threading.Thread(target=self._run, name='confluenceapi-writebehind', daemon=True)
+        self._thread.start()
+        self._flush_on_exit = flush_on_exit
+        if flush_on_exit:
+            atexit.register(self._close_at_exit)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def update_page(self, page_name, space_name, body, **kwargs):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            body (str): The html to populate the page with, see Confluence.update_page
+            kwargs: Passed on to Confluence.update_page
+
+        Returns:
+            future (concurrent.futures.Future): Resolves to the response of the write this one ended up in
+
+        """
+
+        key = ('page', space_name, page_name, kwargs.get('space_name_as_key', False))
+        return self._queue(key, 'update_page', (page_name, space_name, body), kwargs)
+
+
+    def update_section(self, page_name, space_name, section_name, body, **kwargs):
+        """
+        Arguments:
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            section_name (str): The name of the section to replace
+            body (str): The html to put in the section, see Confluence.update_section
+            kwargs: Passed on to Confluence.update_section
+
+        Returns:
+            future (concurrent.futures.Future): Resolves to the SyncResult of the write this one ended up in,
+                or to the response of a later update_page to the same page that replaced it
+
+        """
+
+        key = ('section', space_name, page_name, kwargs.get('space_name_as_key', False), section_name)
+        return self._queue(key, 'update_section', (page_name, space_name, section_name, body), kwargs)
+
+
+    def update_attachment(self, filepath, page_name, space_name, comment=None, **kwargs):
+        """
+        Arguments:
+            filepath (str): The path to the file, it is read when the write is sent rather than when it is queued
+            page_name (str): The title of the page
+            space_name (str): The space name where the page is stored
+            comment (Optional[str]): A comment to accompany the attachment
+            kwargs: Passed on to Confluence.update_attachment
+
+        Returns:
+            future (concurrent.futures.Future): Resolves to the response of the upload this one ended up in
+
+        """
+
+        filename = kwargs.get('filename') or os.path.basename(filepath)
+        key = ('attachment', space_name, page_name, kwargs.get('space_name_as_key', False), filename)
+        return self._queue(key, 'update_attachment', (filepath, page_name, space_name, comment), kwargs)
+
+
+    def flush(self, timeout=None):
+        """
+        Sends every queued write now without waiting for its window and waits for them to finish
+
+        Arguments:
+            timeout (Optional[float]): The most seconds to wait, None to wait for as long as it takes
+
+        Returns:
+            flushed (bool): Whether nothing was left queued or being sent before the timeout
+
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                while self._pending or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+
+    def close(self, timeout=None):
+        """
+        Stops taking writes, sends everything still queued and stops the background thread,
+        writes still queued after the timeout are dropped
+
+        Arguments:
+            timeout (Optional[float]): The most seconds to wait for the queue to drain
+
+        """
+
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            # At interpreter exit concurrent.futures stops its executors before atexit handlers run,
+            # so whatever is still queued is sent from this thread instead
+            inline = list(self._pending.items()) if self._exiting else []
+            for key, write in inline:
+                del self._pending[key]
+                self._in_flight.add(key[1:4])
+        for key, write in inline:
+            self._write(key, write)
+        self.flush(timeout)
+
+        with self._condition:
+            dropped = list(self._pending.values())
+            self._pending.clear()
+            self.counts['dropped'] += len(dropped)
+            self._condition.notify_all()
+        for write in dropped:
+            self._resolve(write.futures, None, WriteDropped('The writer was closed before this write was sent'))
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=timeout is None)
+        if self._flush_on_exit:
+            atexit.unregister(self._close_at_exit)
+
+
+    def _close_at_exit(self):
+        self._exiting = True
+        self.close()
+
+
+    def stats(self):
+        """
+        Returns:
+            stats (dict): How many writes were queued, merged into a later write, written, failed
+                or dropped and how many pages, sections and attachments are waiting to be sent
+
+        """
+
+        with self._condition:
+            stats = dict(self.counts)
+            stats['pending'] = len(self._pending)
+            return stats
+
+
+    def _queue(self, key, method, args, kwargs):
+        # Keys are (kind, space_name, page_name, space_name_as_key, ...), key[1:4] is the page
+        future = Future()
+        with self._condition:
+            self.counts['queued'] += 1
+            write = self._pending.get(key)
+            if write is not None:
+                # Only the latest body is sent, the earlier callers get its response too
+                write.args, write.kwargs = args, kwargs
+                self.counts['merged'] += 1
+            elif self._closed or len(self._pending) >= self.max_pending:
+                self.counts['dropped'] += 1
+                reason = 'closed' if self._closed else 'full, {0} writes are waiting'.format(len(self._pending))
+                future.set_exception(WriteDropped('The write behind queue is ' + reason))
+                return future
+            else:
+                write = self._pending[key] = _PendingWrite(method, args, kwargs, time.monotonic() + self.window)
+                self._condition.notify_all()
+            for section_key in self._superseded(key):
+                # Sent first, the older section html would overwrite what this page write puts there
+                write.futures.extend(self._pending.pop(section_key).futures)
+                self.counts['merged'] += 1
+            write.futures.append(future)
+        return future
+
+
+    def _run(self):
+        with self._condition:
+            while not (self._closed and not self._pending and not self._in_flight):
+                now = time.monotonic()
+                waiting = []
+                for key, write in list(self._pending.items()):
+                    # Writes to the same page wait for the one being sent, so a page and its sections
+                    # can't land out of order or conflict with each other
+                    if key[1:4] in self._in_flight:
+                        continue
+                    if write.due <= now or self._flushing or self._closed:
+                        del self._pending[key]
+                        self._in_flight.add(key[1:4])
+                        try:
+                            self._executor.submit(self._write, key, write)
+                        except RuntimeError as error:
+                            # The executor was shut down, fail the write rather than leave a flush waiting on it
+                            self._in_flight.discard(key[1:4])
+                            self.counts['failed'] += 1
+                            self._resolve(write.futures, None, error)
+                    else:
+                        waiting.append(write.due - now)
+                self._condition.wait(min(waiting) if waiting else None)
+
+
+    def _superseded(self, key):
+        # The queued section writes to the page a page write is for
+        if key[0] != 'page':
+            return []
+        return [other for other in self._pending if other[0] == 'section' and other[1:4] == key[1:4]]
+
+
+    def _write(self, key, write):
+        result, error = None, None
+        try:
+            result = getattr(self.client, write.method)(*write.args, **write.kwargs)
+        except Exception as exception:
+            error = exception
+        response = getattr(result, 'response', result)
+        failed = error is not None or (response is not None and not getattr(response, 'ok', True))
+
+        self._resolve(write.futures, result, error)
+        with self._condition:
+            self.counts['failed' if failed else 'written'] += 1
+            self._in_flight.discard(key[1:4])
+            self._condition.notify_all()
+
+
+    @staticmethod
+    def _resolve(futures, result, error):
+        for future in futures:
+            if not future.set_running_or_notify_cancel():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -11,5 +11,10 @@ setup(name='confluenceapi',
       packages=['confluenceapi'],
       zip_safe=True,
       install_requires=[
+          'jinja2',
           'pandas',
-      ],)
+          'requests',
+      ],
+      extras_require={
+          'async': ['aiohttp'],
+      },)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+
+import pytest
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import AsyncConfluence
+
+
+def test_space_names_are_quoted_in_the_search():
+    async def publish(server):
+        async with AsyncConfluence(server, ('admin', 'admin')) as lc:
+            response = await lc.add_page('Reports', 'R&D #1 + Ops', body='<p>Reports</p>')
+            assert response.status == 200
+            return await lc.get_page_contents('Reports', 'R&D #1 + Ops')
+
+    with MockConfluence(spaces={'RD': 'R&D #1 + Ops'}) as mock:
+        assert asyncio.run(publish(mock.server)) == '<p>Reports</p>'
+
+
+def test_https_servers_keep_their_scheme():
+    lc = AsyncConfluence('https://confluence.example.com/', ('admin', 'admin'))
+
+    assert lc.api_url == 'https://confluence.example.com/rest/api/'
+
+
+def run(server, work, auth=('admin', 'admin')):
+    async def main():
+        async with AsyncConfluence(server, auth) as lc:
+            return await work(lc)
+    return asyncio.run(main())
+
+
+def test_pages_are_added_updated_and_deleted():
+    async def work(lc):
+        await lc.add_page('Reports', 'Data Science', body='<p>First</p>')
+        await lc.add_page('Weekly', 'Data Science', 'Reports', '<p>Child</p>')
+        assert (await lc.update_page('Reports', 'Data Science', '<p>Second</p>')).status == 200
+        contents = await lc.get_page_contents('Reports', 'Data Science')
+        assert (await lc.delete_page('Weekly', 'Data Science')).status == 204
+        return contents
+
+    with MockConfluence() as mock:
+        assert run(mock.server, work) == '<p>Second</p>'
+        assert [item['title'] for item in mock.content.values()] == ['Reports']
+
+
+def test_attachments_are_uploaded_updated_and_deleted(tmp_path):
+    path = tmp_path / 'demo.txt'
+    path.write_text('first')
+
+    async def work(lc):
+        await lc.add_page('Reports', 'Data Science')
+        assert (await lc.upload_attachment(str(path), 'Reports', 'Data Science', 'First upload!')).status == 200
+        path.write_text('second')
+        assert (await lc.update_attachment(str(path), 'Reports', 'Data Science')).status == 200
+        with pytest.raises(ValueError):
+            await lc.delete_attachment('missing.txt', 'Reports', 'Data Science')
+        return [item['data'] for item in mock.content.values() if item['type'] == 'attachment']
+
+    with MockConfluence() as mock:
+        assert run(mock.server, work) == [b'second']
+
+
+def test_rejected_credentials_raise_when_entering(caplog):
+    async def work(lc):
+        raise AssertionError('The client should not have been entered')
+
+    with MockConfluence() as mock:
+        mock.fail(401, path='/rest/api/content/search')
+        with caplog.at_level(logging.WARNING, logger='confluenceapi.aio'):
+            with pytest.raises(PermissionError):
+                run(mock.server, work, ('admin', 'wrong'))
+        assert '401' in caplog.text
+
+
+def test_requests_carry_basic_auth():
+    lc = AsyncConfluence('confluence.example.com', ('admin', 'secret'))
+
+    assert lc._auth_header == {'Authorization': 'Basic YWRtaW46c2VjcmV0'}
+
+
+def test_a_conflicting_update_is_sent_again():
+    async def work(lc):
+        await lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        mock.fail(409, path='/rest/api/content/1001', method='PUT')
+        assert (await lc.update_page('Reports', 'Data Science', '<p>Mine</p>')).status == 200
+
+        mock.fail(409, times=5, path='/rest/api/content/1001', method='PUT')
+        mock.reset()
+        assert (await lc.update_page('Reports', 'Data Science', '<p>Again</p>', max_conflict_retries=2)).status == 409
+        assert mock.stats()['PUT content/{id}'] == 3
+
+    with MockConfluence() as mock:
+        run(mock.server, work)
+        assert mock.content[1001]['version'] == 2 and mock.content[1001]['body'] == '<p>Mine</p>'
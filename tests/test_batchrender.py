@@ -0,0 +1,62 @@
+import functools
+import pickle
+import time
+
+from confluenceapi import BuilderRecipe
+from confluenceapi.batchrender import render_many
+
+
+def page(number, delay=0.0):
+    time.sleep(delay)
+    return '<p>{0}</p>'.format(number)
+
+
+def broken():
+    raise ValueError('No data for this customer')
+
+
+def test_a_recipe_builds_the_same_page_as_the_builder():
+    recipe = BuilderRecipe().add_title('Report', 'h2').add_custom_html('<p>Body</p>')
+    copy = pickle.loads(pickle.dumps(recipe))
+
+    assert len(copy) == 2
+    assert copy.render() == recipe.build().render()
+    assert '<h2>Report</h2>' in copy.render()
+
+
+def test_in_flight_jobs_stay_within_max_in_flight():
+    taken = []
+
+    def jobs():
+        for number in range(20):
+            taken.append(number)
+            yield number, functools.partial(page, number, 0.01)
+
+    seen = 0
+    for result in render_many(jobs(), max_workers=2, max_in_flight=3):
+        # Jobs not yet yielded are the ones taken minus those already seen, including this one
+        assert len(taken) - seen <= 3
+        seen += 1
+    assert seen == 20
+
+
+def test_results_come_back_in_input_order_when_ordered():
+    # The first jobs take the longest, so they finish last
+    jobs = [(number, functools.partial(page, number, 0.05 * (4 - number))) for number in range(5)]
+
+    results = list(render_many(jobs, max_workers=5, ordered=True))
+
+    assert [result.key for result in results] == [0, 1, 2, 3, 4]
+    assert [result.html for result in results] == ['<p>{0}</p>'.format(number) for number in range(5)]
+    assert sorted(result.key for result in render_many(jobs, max_workers=5)) == [0, 1, 2, 3, 4]
+
+
+def test_an_error_in_a_worker_reaches_the_caller():
+    jobs = [('good', functools.partial(page, 1)), ('broken', broken), ('unpicklable', lambda: '<p>Never sent</p>')]
+
+    results = dict((result.key, result) for result in render_many(jobs, max_workers=2))
+
+    assert results['good'].ok and results['good'].html == '<p>1</p>'
+    assert isinstance(results['broken'].error, ValueError)
+    assert str(results['broken'].error) == 'No data for this customer'
+    assert not results['unpicklable'].ok and results['unpicklable'].html is None
@@ -0,0 +1,55 @@
+import time
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence, LRUCache
+
+
+def test_the_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'evictions': 1, 'size': 2}
+
+
+def test_entries_expire_after_their_ttl():
+    cache = LRUCache(ttl=0.1)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+
+    time.sleep(0.15)
+    assert cache.get('a', 'expired') == 'expired'
+    assert len(cache) == 0
+
+
+def test_lookups_are_served_from_the_cache():
+    with MockConfluence() as mock:
+        cache = LRUCache()
+        lc = Confluence(mock.server, ('admin', 'admin'), cache=cache)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        lc.get_page_contents('Reports', 'Data Science')
+        mock.reset()
+
+        lc.get_page_contents('Reports', 'Data Science')
+
+        # Neither the space nor the page had to be searched for again
+        assert mock.stats() == {'GET plugins/viewstorage/viewpagestorage.action': 1}
+
+
+def test_without_a_cache_each_call_looks_the_space_and_page_up_once():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), cache=False)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        mock.reset()
+
+        lc.get_page_contents('Reports', 'Data Science')
+        assert mock.stats() == {'GET content/search': 1, 'GET content': 1,
+                                'GET plugins/viewstorage/viewpagestorage.action': 1}
+
+        mock.reset()
+        lc.delete_page('Reports', 'Data Science')
+        assert mock.stats() == {'GET content/search': 1, 'GET content': 1, 'DELETE content/{id}': 1}
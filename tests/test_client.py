@@ -0,0 +1,90 @@
+import logging
+
+import pytest
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+
+
+def test_tls_verify_sets_certificate_checking_on_the_session():
+    lc = Confluence('https://confluence.example.com', ('admin', 'admin'), tls_verify='/etc/ssl/ca.pem')
+
+    assert lc.session.verify == '/etc/ssl/ca.pem'
+    assert Confluence('https://confluence.example.com', ('admin', 'admin'), tls_verify=False).session.verify is False
+    assert Confluence('https://confluence.example.com', ('admin', 'admin'), check_credentials=False).session.verify is True
+
+
+def test_check_credentials_false_skips_the_credential_check():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), check_credentials=False)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        assert lc._verified is None
+
+
+def test_rejected_credentials_raise_on_the_first_request():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'wrong'))
+        mock.fail(401, path='/rest/api/content/search')
+
+        with pytest.raises(PermissionError):
+            lc.add_page('Reports', 'Data Science')
+
+
+def test_verify_logs_rejected_credentials(caplog):
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'wrong'))
+        mock.fail(401, path='/rest/api/content/search')
+
+        with caplog.at_level(logging.WARNING, logger='confluenceapi.client'):
+            assert lc.verify() is False
+        assert '401' in caplog.text
+        # The result is kept, so the first request doesn't check again
+        assert lc.verify() is False
+
+
+def test_a_conflicting_update_is_sent_again_on_the_new_version():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        conflicts = []
+
+        def someone_else_saves(event):
+            # Another writer saves version 2 just before each of the first PUTs arrives
+            if event['method'] == 'PUT' and len(conflicts) < 2:
+                conflicts.append(event)
+                mock.content[1001]['version'] += 1
+
+        lc.add_hook('pre_request', someone_else_saves)
+        mock.reset()
+        response = lc.update_page('Reports', 'Data Science', '<p>Mine</p>')
+
+        assert response.ok
+        assert mock.content[1001]['version'] == 4 and mock.content[1001]['body'] == '<p>Mine</p>'
+        assert mock.stats()['PUT content/{id}'] == 3
+
+
+def test_conflicts_are_returned_once_the_retries_run_out():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        mock.fail(409, times=5, path='/rest/api/content/1001', method='PUT')
+        mock.reset()
+
+        response = lc.update_page('Reports', 'Data Science', '<p>Mine</p>', max_conflict_retries=1)
+
+        assert response.status_code == 409
+        assert mock.stats()['PUT content/{id}'] == 2
+
+
+def test_a_one_shot_body_is_not_sent_twice_on_a_conflict():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        mock.fail(409, path='/rest/api/content/1001', method='PUT')
+        mock.reset()
+
+        response = lc.update_page('Reports', 'Data Science', iter(['<p>Mine</p>']))
+
+        assert response.status_code == 409
+        assert mock.stats()['PUT content/{id}'] == 1
@@ -0,0 +1,108 @@
+import time
+import socket
+
+import pytest
+import requests
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence, NodePool
+from confluenceapi.cluster import NoHealthyNode
+
+
+def dead_server():
+    # A port nothing listens on, so connecting to it is refused straight away
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return '127.0.0.1:{0}'.format(sock.getsockname()[1])
+
+
+def test_requests_fail_over_from_a_dead_node_without_retrying_it():
+    with MockConfluence() as mock:
+        nodes = NodePool([dead_server(), mock.server], failure_threshold=2, health_check_interval=None)
+        lc = Confluence(nodes, ('admin', 'admin'), max_retries=3, backoff_factor=1)
+
+        started = time.monotonic()
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        for _ in range(4):
+            assert lc.get_page_contents('Reports', 'Data Science') == '<p>Reports</p>'
+
+        # Retrying the refused connections with backoff would have taken several seconds
+        assert time.monotonic() - started < 2
+        dead, live = nodes.stats()
+        assert dead['state'] == 'open' and dead['failures'] == 2
+        assert live['state'] == 'closed' and live['errors'] == 0
+
+
+def test_the_circuit_opens_after_failure_threshold_and_recovers_after_a_trial():
+    nodes = NodePool(['node1:8090', 'node2:8090'], failure_threshold=2, reset_timeout=0.1, health_check_interval=None)
+    first, second = nodes.nodes
+
+    for _ in range(2):
+        assert nodes.acquire(exclude=[second]) is first
+        nodes.release(first, False)
+    assert first.state == 'open'
+    assert nodes.acquire(exclude=[second]) is None
+
+    for _ in range(2):
+        assert nodes.acquire() is second
+        nodes.release(second, False)
+    assert second.state == 'open'
+    with pytest.raises(NoHealthyNode):
+        nodes.acquire()
+
+    time.sleep(0.15)
+    node = nodes.acquire()
+    assert node.state == 'half_open'
+    nodes.release(node, True)
+    assert node.state == 'closed' and node.failures == 0
+
+
+def test_health_checks_open_a_circuit_only_after_failure_threshold_failures():
+    with MockConfluence() as mock:
+        nodes = NodePool([mock.server], failure_threshold=2, health_check_interval=None)
+        node = nodes.nodes[0]
+
+        mock.fail(500, path='/status')
+        assert nodes.check() == {node.base_url: False}
+        assert node.state == 'closed'
+
+        assert nodes.check() == {node.base_url: True}
+        mock.fail(500, times=2, path='/status')
+        nodes.check()
+        nodes.check()
+        assert node.state == 'open'
+
+        assert nodes.check() == {node.base_url: True}
+        assert node.state == 'closed'
+
+
+def test_health_checks_use_a_session_that_never_retries():
+    with MockConfluence() as live, MockConfluence() as failing:
+        lc = Confluence([live.server, failing.server], ('admin', 'admin'), max_retries=3, backoff_factor=1,
+                        tls_verify='/etc/ssl/ca.pem')
+        nodes = lc.nodes
+        nodes.health_check_interval = None
+
+        assert nodes.session is not lc.session and nodes.session.verify == '/etc/ssl/ca.pem'
+        failing.fail(500, times=5, path='/status')
+        started = time.monotonic()
+        assert nodes.check() == {nodes.nodes[0].base_url: True, nodes.nodes[1].base_url: False}
+
+        # The client's session would have retried the 500 three times with backoff
+        assert time.monotonic() - started < 1
+        assert failing.stats() == {'GET status': 1}
+        lc.close()
+
+
+def test_a_pool_given_to_the_client_gets_its_tls_settings():
+    nodes = NodePool(['node1:8090', 'node2:8090'], health_check_interval=None)
+    Confluence(nodes, ('admin', 'admin'), tls_verify=False)
+
+    assert nodes.session.verify is False
+
+    # A pool with a session of its own keeps it
+    session = requests.Session()
+    session.verify = '/etc/ssl/ca.pem'
+    own = NodePool(['node1:8090'], health_check_interval=None, session=session)
+    Confluence(own, ('admin', 'admin'), tls_verify=False)
+    assert own.session is session and session.verify == '/etc/ssl/ca.pem'
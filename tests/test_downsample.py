@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from confluenceapi.downsample import downsample
+
+
+def series_with_gap():
+    # A gentle wave between 10 and 12 with a run of missing readings in the middle
+    values = 11 + np.sin(np.linspace(0, 20, 1000))
+    values[400:450] = np.nan
+    return pd.DataFrame({'reading': values}, index=pd.date_range('2018-01-01', periods=1000, freq='min'))
+
+
+def test_lttb_skips_gaps():
+    df = series_with_gap()
+    result = downsample(df, 100, method='lttb')
+
+    assert len(result) == 100
+    assert result['reading'].notna().all()
+    assert result['reading'].min() >= 10
+    assert result.index.is_monotonic_increasing
+
+
+def test_lttb_averaged_columns_skip_gaps():
+    df = series_with_gap()
+    df['other'] = df['reading'] * 2
+    result = downsample(df, 100, method='lttb')
+
+    assert len(result) == 100
+    assert result.notna().all().all()
+
+
+def test_minmax_skips_gaps():
+    df = series_with_gap()
+    result = downsample(df, 100, method='minmax')
+
+    assert 0 < len(result) <= 100
+    assert result['reading'].notna().all()
+    assert result['reading'].min() >= 10
+    assert result.index.is_monotonic_increasing
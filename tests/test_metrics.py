@@ -0,0 +1,99 @@
+import pytest
+import requests
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence, MetricsCollector
+
+
+def test_the_collector_groups_requests_by_operation_caller_and_endpoint():
+    metrics = MetricsCollector(buckets=(0.1, 1.0))
+    metrics.record('find_page', 'update_page', 'GET', 'content', 200, 0.05, 0, 100)
+    metrics.record('put_page', 'update_page', 'PUT', 'content/{id}', 409, 0.5, 300, 20)
+    metrics.record('put_page', 'update_page', 'PUT', 'content/{id}', None, 2.0, 300, 0)
+
+    result = metrics.as_dict()
+
+    assert result['callers']['update_page']['count'] == 3
+    assert result['operations']['put_page']['status'] == {'409': 1, 'error': 1}
+    assert result['operations']['put_page']['latency']['buckets'] == {0.1: 0, 1.0: 1}
+    assert result['operations']['put_page']['latency']['max'] == 2.0
+    assert result['endpoints']['GET content']['bytes_received'] == 100
+    assert result['endpoints']['PUT content/{id}']['bytes_sent'] == 600
+
+    metrics.reset()
+    assert metrics.as_dict() == {'operations': {}, 'callers': {}, 'endpoints': {}}
+
+
+def test_endpoints_replace_ids_and_file_names():
+    assert MetricsCollector.endpoint('content/123/child/attachment') == 'content/{id}/child/attachment'
+    assert MetricsCollector.endpoint('/download/attachments/123/report 2.csv') == 'download/attachments/{id}/{name}'
+
+
+def test_prometheus_output_escapes_label_values():
+    metrics = MetricsCollector(buckets=(1.0,))
+    metrics.record('find_page', 'say "hi"\\now\nplease', 'GET', 'content', 200, 0.5, 10, 20)
+
+    text = metrics.to_prometheus(prefix='wiki')
+
+    labels = 'operation="find_page",caller="say \\"hi\\"\\\\now\\nplease",method="GET",endpoint="content"'
+    assert 'wiki_requests_total{' + labels + ',status="200"} 1' in text
+    assert 'wiki_request_duration_seconds_bucket{' + labels + ',le="1.0"} 1' in text
+    assert 'wiki_request_duration_seconds_bucket{' + labels + ',le="+Inf"} 1' in text
+    assert 'wiki_bytes_received_total{' + labels + '} 20' in text
+    # Every sample stays on its own line
+    assert all(line.startswith(('#', 'wiki_')) for line in text.splitlines())
+
+
+def test_the_client_records_every_request():
+    metrics = MetricsCollector()
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), metrics=metrics)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        metrics.reset()
+        mock.reset()
+        lc.update_page('Reports', 'Data Science', '<p>Changed</p>')
+
+        result = metrics.as_dict()
+
+        assert result['callers']['update_page']['count'] == sum(mock.stats().values())
+        assert result['endpoints']['PUT content/{id}']['status'] == {'200': 1}
+        assert result['operations']['put_page']['bytes_sent'] > len('<p>Changed</p>')
+
+
+def test_hooks_run_around_every_request():
+    events = []
+
+    def trace(event):
+        event['kwargs']['headers']['X-Trace'] = 'abc'
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), hooks={'pre_request': trace, 'post_request': events.append})
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        assert events and all(event['kwargs']['headers']['X-Trace'] == 'abc' for event in events)
+        assert 'X-Trace' not in lc.session.headers
+        assert events[-1]['caller'] == 'add_page' and events[-1]['method'] == 'POST'
+        assert events[-1]['status'] == 200 and events[-1]['response'].ok and events[-1]['error'] is None
+
+        lc.remove_hook('post_request', events.append)
+        count = len(events)
+        lc.get_page_contents('Reports', 'Data Science')
+        assert len(events) == count
+
+
+def test_a_failed_request_reaches_the_hooks_and_metrics():
+    metrics = MetricsCollector()
+    events = []
+
+    with MockConfluence() as mock:
+        server = mock.server
+    lc = Confluence(server, ('admin', 'admin'), max_retries=0, metrics=metrics, check_credentials=False,
+                    hooks={'post_request': events.append})
+
+    with pytest.raises(requests.ConnectionError):
+        lc.get_page_contents('Reports', 'Data Science')
+
+    assert events[-1]['response'] is None and events[-1]['status'] is None
+    assert isinstance(events[-1]['error'], requests.ConnectionError)
+    assert metrics.as_dict()['callers']['get_page_contents']['status'] == {'error': 1}
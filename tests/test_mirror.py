@@ -0,0 +1,112 @@
+import json
+import os
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+
+
+def modified(mock, title, when):
+    for item in mock.content.values():
+        if item['title'] == title:
+            item['modified'] = when
+
+
+def manifest(directory):
+    with open(os.path.join(directory, 'manifest.json')) as handle:
+        return json.load(handle)
+
+
+def test_mirror_space_downloads_pages_and_attachments(tmp_path):
+    attachment = tmp_path / 'data.csv'
+    attachment.write_text('a,b\n1,2\n')
+    directory = str(tmp_path / 'mirror')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        lc.add_page('Models', 'Data Science', body='<p>Models</p>', parent_page_name='Reports')
+        lc.upload_attachment(str(attachment), 'Reports', 'Data Science')
+        modified(mock, 'Reports', '2020-06-01 09:30')
+
+        stats = lc.mirror_space('Data Science', directory, attachments=True)
+
+        assert stats == {'pages': 2, 'attachments': 1, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        with open(os.path.join(directory, 'pages', '1001.xml')) as handle:
+            assert handle.read() == '<p>Reports</p>'
+        with open(os.path.join(directory, 'pages', '1002.json')) as handle:
+            assert json.load(handle)['ancestors'] == [{'id': '1001'}]
+        with open(os.path.join(directory, 'attachments', '1001', 'data.csv')) as handle:
+            assert handle.read() == 'a,b\n1,2\n'
+        assert manifest(directory)['pages']['1001'] == {'version': 1, 'title': 'Reports'}
+
+
+def test_incremental_runs_only_list_content_since_the_checkpoint(tmp_path):
+    directory = str(tmp_path / 'mirror')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        for title in ('Old', 'Recent', 'Latest'):
+            lc.add_page(title, 'Data Science', body='<p>{0}</p>'.format(title))
+        modified(mock, 'Old', '2020-05-31 12:00')
+        modified(mock, 'Recent', '2020-05-31 23:30')
+        modified(mock, 'Latest', '2020-06-01 00:00')
+
+        lc.mirror_space('Data Science', directory, time_zone='UTC')
+        assert manifest(directory)['checkpoint'] == '2020-06-01T00:00Z'
+
+        # With the time zone only the hour of overlap before the checkpoint is listed again
+        stats = lc.mirror_space('Data Science', directory, time_zone='UTC')
+        assert stats == {'pages': 0, 'attachments': 0, 'unchanged': 2, 'removed': 0, 'failed': 0}
+
+        # Without it the twelve hours before the overlap are listed as well
+        stats = lc.mirror_space('Data Science', directory)
+        assert stats['unchanged'] == 3
+
+        lc.update_page('Latest', 'Data Science', '<p>Changed</p>')
+        modified(mock, 'Latest', '2020-06-02 08:00')
+        stats = lc.mirror_space('Data Science', directory, time_zone='UTC')
+
+        assert stats == {'pages': 1, 'attachments': 0, 'unchanged': 1, 'removed': 0, 'failed': 0}
+        assert manifest(directory)['checkpoint'] == '2020-06-02T08:00Z'
+        with open(os.path.join(directory, 'pages', '1003.xml')) as handle:
+            assert handle.read() == '<p>Changed</p>'
+
+
+def test_a_failed_download_keeps_the_checkpoint(tmp_path):
+    directory = str(tmp_path / 'mirror')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), max_retries=0)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        modified(mock, 'Reports', '2020-06-01 00:00')
+        lc.mirror_space('Data Science', directory, time_zone='UTC')
+
+        lc.update_page('Reports', 'Data Science', '<p>Changed</p>')
+        modified(mock, 'Reports', '2020-06-02 00:00')
+        mock.fail(500, path='/rest/api/content/1001', method='GET')
+        stats = lc.mirror_space('Data Science', directory, time_zone='UTC')
+
+        assert stats['failed'] == 1
+        assert manifest(directory)['checkpoint'] == '2020-06-01T00:00Z'
+
+        # The next run lists the page again and catches up
+        stats = lc.mirror_space('Data Science', directory, time_zone='UTC')
+        assert stats['pages'] == 1
+        assert manifest(directory)['checkpoint'] == '2020-06-02T00:00Z'
+
+
+def test_a_full_run_removes_deleted_pages(tmp_path):
+    directory = str(tmp_path / 'mirror')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        lc.add_page('Scratch', 'Data Science', body='<p>Scratch</p>')
+        lc.mirror_space('Data Science', directory)
+
+        lc.delete_page('Scratch', 'Data Science')
+        stats = lc.mirror_space('Data Science', directory, full=True)
+
+        assert stats == {'pages': 0, 'attachments': 0, 'unchanged': 1, 'removed': 1, 'failed': 0}
+        assert sorted(os.listdir(os.path.join(directory, 'pages'))) == ['1001.json', '1001.xml']
+        assert '1002' not in manifest(directory)['pages']
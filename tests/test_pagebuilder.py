@@ -0,0 +1,53 @@
+import pytest
+
+from confluenceapi import ConfluencePageBuilder, TemplateRegistry
+
+
+def test_reading_html_keeps_the_fragments():
+    builder = ConfluencePageBuilder()
+    builder.add_title('Weekly report')
+    builder.add_custom_html('<p>First</p>')
+    fragments = list(builder.iter_render())
+
+    assert builder.html == ''.join(fragments)
+    assert list(builder.iter_render()) == fragments
+
+
+def test_templates_leave_html_alone_unless_autoescaped():
+    templates = TemplateRegistry()
+    templates.register('raw', '<p>{{ text }}</p>')
+    templates.register('escaped', '<p>{{ text }}</p>', autoescape=True)
+
+    assert templates.render('raw', text='<b>R&D</b>') == '<p><b>R&D</b></p>'
+    assert templates.render('escaped', text='<b>R&D</b>') == '<p>&lt;b&gt;R&amp;D&lt;/b&gt;</p>'
+
+
+def test_templates_are_compiled_once_and_can_be_replaced():
+    templates = TemplateRegistry()
+    assert templates.register('status', '{{ colour }}', lazy=True) is None
+    assert 'status' in templates and templates.names() == ['status']
+
+    compiled = templates.get('status')
+    assert templates.get('status') is compiled
+
+    templates.register('status', '[{{ colour }}]')
+    assert templates.render('status', colour='Green') == '[Green]'
+    with pytest.raises(ValueError):
+        templates.get('missing')
+
+
+def test_a_builder_renders_components_from_its_own_registry():
+    templates = TemplateRegistry()
+    templates.register('title', '<h9>{{ title }}</h9>')
+    templates.register('badge', '<span>{{ label }}</span>', autoescape=True)
+    builder = ConfluencePageBuilder(templates)
+
+    builder.add_title('Weekly')
+    builder.add_component('badge', label='<new>')
+
+    assert builder.render() == '<h9>Weekly</h9><span>&lt;new&gt;</span>'
+
+    # The shared registry is left as it was
+    shared = ConfluencePageBuilder()
+    shared.add_title('Weekly')
+    assert '<h1>Weekly</h1>' in shared.render()
@@ -0,0 +1,24 @@
+import os
+
+from confluenceapi import DiskPageCache
+
+
+def test_line_endings_survive_a_round_trip(tmp_path):
+    cache = DiskPageCache(str(tmp_path))
+    body = '<ac:plain-text-body><![CDATA[line one\r\nline two\r\n]]></ac:plain-text-body>'
+    cache.set(1, 3, body)
+
+    assert cache.get(1, 3) == body
+
+
+def test_eviction_skips_files_removed_by_someone_else(tmp_path):
+    cache = DiskPageCache(str(tmp_path), max_bytes=25)
+    cache.set(1, 1, 'a' * 10)
+    cache.set(2, 1, 'b' * 10)
+    os.remove(os.path.join(str(tmp_path), '1-1.xml'))
+
+    cache.set(3, 1, 'c' * 10)
+
+    assert cache.get(2, 1) == 'b' * 10
+    assert cache.get(3, 1) == 'c' * 10
+    assert cache.stats()['pages'] == 2
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_paginate_follows_next_links(stream):
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        for number in range(5):
+            lc.add_page('Report {0}'.format(number), 'Data Science', body='<p>{0}</p>'.format(number))
+        mock.reset()
+
+        results = list(lc._paginate(lc.api_url + 'content?type=page&spaceKey=DS', limit=2, expand='version', stream=stream))
+
+        assert [result['title'] for result in results] == ['Report {0}'.format(number) for number in range(5)]
+        assert all(result['version']['number'] == 1 for result in results)
+        assert mock.stats() == {'GET content': 3}
+
+
+def test_paginate_steps_with_start_when_the_server_sends_no_links():
+    urls = []
+
+    def drop_links(event):
+        # Older servers answer without _links, so the client has to count the results itself
+        urls.append(event['url'])
+        page = event['response'].json()
+        page.pop('_links')
+        event['response']._content = json.dumps(page).encode('utf-8')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        for number in range(4):
+            lc.add_page('Report {0}'.format(number), 'Data Science', body='<p>{0}</p>'.format(number))
+        lc.add_hook('post_request', drop_links)
+
+        results = list(lc._paginate(lc.api_url + 'content?type=page&spaceKey=DS', limit=2))
+
+        assert [result['title'] for result in results] == ['Report {0}'.format(number) for number in range(4)]
+        # A full last page can't tell it was the last, so one more, empty, page is asked for
+        assert [url.split('limit=2')[1] for url in urls] == ['', '&start=2', '&start=4']
@@ -0,0 +1,15 @@
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+
+
+def test_an_existing_page_is_moved_under_its_parent():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        lc.add_page('Weekly', 'Data Science', body='<p>Old</p>')
+
+        results = lc.publish_pages([{'title': 'Weekly', 'parent': 'Reports', 'body': '<p>New</p>'}], 'Data Science')
+
+        assert results[0].action == 'updated'
+        assert [child['title'] for child in lc.iter_children('Reports', 'Data Science')] == ['Weekly']
+        assert lc.get_page_contents('Weekly', 'Data Science') == '<p>New</p>'
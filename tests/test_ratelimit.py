@@ -0,0 +1,88 @@
+import time
+from email.utils import formatdate
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence, RateLimiter
+from confluenceapi.ratelimit import parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert 8 < parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+
+
+def test_a_throttled_request_waits_for_retry_after():
+    with MockConfluence() as mock:
+        limiter = RateLimiter(rate=100)
+        lc = Confluence(mock.server, ('admin', 'admin'), rate_limit=limiter)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        mock.fail(429, times=2, headers={'Retry-After': '0.2'})
+        started = time.monotonic()
+        assert lc.get_page_contents('Reports', 'Data Science') == '<p>Reports</p>'
+
+        assert time.monotonic() - started >= 0.4
+        assert limiter.throttled == 2
+        assert limiter.rate < 100
+
+
+def test_503_is_treated_as_throttling():
+    with MockConfluence() as mock:
+        limiter = RateLimiter(rate=100)
+        lc = Confluence(mock.server, ('admin', 'admin'), rate_limit=limiter)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        mock.fail(503, headers={'Retry-After': '0'})
+        assert lc.get_page_contents('Reports', 'Data Science') == '<p>Reports</p>'
+        assert limiter.throttled == 1
+
+
+def test_the_throttled_response_is_returned_once_retries_run_out():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), rate_limit=100, max_throttle_retries=1)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        mock.fail(429, times=2, headers={'Retry-After': '0'})
+        response = lc.delete_page('Reports', 'Data Science')
+
+        assert response.status_code == 429
+        assert lc.rate_limiter.throttled == 2
+
+
+def test_throttling_pauses_every_caller_of_a_shared_limiter():
+    limiter = RateLimiter(rate=1000)
+    limiter.throttle(0.3)
+
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.25
+
+    # Successes creep the halved rate back up to the configured one
+    assert limiter.rate == 500
+    for _ in range(20):
+        limiter.success()
+    assert limiter.rate == 1000
+
+
+def test_a_throttled_post_is_only_sent_again_when_asked_to():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+
+        mock.fail(503, method='POST')
+        assert lc.add_page('Reports', 'Data Science', body='<p>Reports</p>').status_code == 503
+        assert mock.stats()['POST content'] == 1
+
+        mock.fail(429, headers={'Retry-After': '0'}, method='POST')
+        assert lc.add_page('Reports', 'Data Science', body='<p>Reports</p>').ok
+        assert mock.stats()['POST content'] == 3
+
+
+def test_a_throttled_get_is_retried_without_a_limiter():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        mock.fail(429)
+        assert lc.get_page_contents('Reports', 'Data Science') == '<p>Reports</p>'
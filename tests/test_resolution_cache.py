@@ -0,0 +1,50 @@
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+
+
+def recreate(mock, title):
+    # Another client deletes the page and makes a new one with the same title, so it gets a new id
+    other = Confluence(mock.server, ('admin', 'admin'), cache=False)
+    other.delete_page(title, 'Data Science')
+    other.add_page(title, 'Data Science', body='<p>Recreated</p>')
+    return other
+
+
+def test_a_stale_page_id_is_looked_up_again(tmp_path):
+    path = tmp_path / 'demo.txt'
+    path.write_text('demo')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        assert lc.get_page_contents('Reports', 'Data Science') == '<p>Reports</p>'
+
+        recreate(mock, 'Reports')
+        assert lc.get_page_contents('Reports', 'Data Science') == '<p>Recreated</p>'
+
+        recreate(mock, 'Reports')
+        assert lc.upload_attachment(str(path), 'Reports', 'Data Science').status_code == 200
+
+        recreate(mock, 'Reports')
+        assert lc.delete_page('Reports', 'Data Science').status_code == 204
+        assert lc._find_page('Reports', 'DS') is None
+
+
+def test_a_stale_attachment_id_is_looked_up_again(tmp_path):
+    path = tmp_path / 'demo.txt'
+    path.write_text('demo')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        other = Confluence(mock.server, ('admin', 'admin'), cache=False)
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        lc.upload_attachment(str(path), 'Reports', 'Data Science')
+
+        other.delete_attachment('demo.txt', 'Reports', 'Data Science')
+        other.upload_attachment(str(path), 'Reports', 'Data Science')
+        assert lc.update_attachment(str(path), 'Reports', 'Data Science').status_code == 200
+
+        other.delete_attachment('demo.txt', 'Reports', 'Data Science')
+        other.upload_attachment(str(path), 'Reports', 'Data Science')
+        assert lc.delete_attachment('demo.txt', 'Reports', 'Data Science').status_code == 204
+        assert list(lc.iter_attachments('Reports', 'Data Science')) == []
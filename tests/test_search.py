@@ -0,0 +1,74 @@
+import json
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+from confluenceapi import jsonstream
+from confluenceapi.jsonstream import expand_for, iter_items
+
+
+def test_iter_items_across_chunk_boundaries():
+    document = {'results': [{'title': 'Café ☕', 'size': 123456789}, {'title': 'Second', 'size': 7}],
+                'size': 2, '_links': {'next': '/rest/api/content/search?start=2'}}
+    data = json.dumps(document, ensure_ascii=False).encode('utf-8')
+    meta = {}
+
+    # One byte at a time splits multi-byte characters, strings and numbers between chunks
+    items = list(iter_items((data[i:i + 1] for i in range(len(data))), 'results', meta))
+
+    assert items == document['results']
+    assert meta == {'size': 2, '_links': document['_links']}
+
+
+def test_iter_items_parses_a_long_value_a_bounded_number_of_times(monkeypatch):
+    body = 'x' * 100000
+    data = json.dumps({'results': [{'body': body}]}).encode('utf-8')
+    calls = []
+
+    class CountingDecoder(json.JSONDecoder):
+        def raw_decode(self, text, position=0):
+            calls.append(len(text) - position)
+            return super(CountingDecoder, self).raw_decode(text, position)
+
+    monkeypatch.setattr(jsonstream, '_decoder', CountingDecoder())
+
+    items = list(iter_items(data[i:i + 64] for i in range(0, len(data), 64)))
+
+    assert items == [{'body': body}]
+    # The buffer doubles between attempts, so the text scanned stays a small multiple of the document
+    assert sum(calls) < 4 * len(data)
+
+
+def test_iter_items_of_an_empty_array():
+    assert list(iter_items([b'{"results": [], "size": 0}'])) == []
+    assert list(iter_items([b'{}'])) == []
+
+
+def test_expand_for_only_asks_for_nested_fields():
+    assert expand_for(['id', 'title', 'version.number', 'body.storage.value', '_links.webui']) == 'version,body.storage'
+    assert expand_for(['id', 'title']) is None
+
+
+def test_search_projects_fields_over_every_page_of_results():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        for number in range(5):
+            lc.add_page('Report {0}'.format(number), 'Data Science', body='<p>{0}</p>'.format(number))
+        lc.update_page('Report 3', 'Data Science', '<p>Again</p>')
+
+        records = list(lc.search('space = DS and type = page', fields=('title', 'version.number', 'body.storage.value'), limit=2))
+
+        assert [record.title for record in records] == ['Report {0}'.format(number) for number in range(5)]
+        assert [record.version_number for record in records] == [1, 1, 1, 2, 1]
+        assert records[3].body_storage_value == '<p>Again</p>'
+        assert records[0].as_dict() == {'title': 'Report 0', 'version.number': 1, 'body.storage.value': '<p>0</p>'}
+
+
+def test_search_without_fields_yields_whole_results():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        results = list(lc.search('space = DS and type = page', fields=None))
+
+        assert [result['title'] for result in results] == ['Reports']
+        assert results[0]['space'] == {'key': 'DS'}
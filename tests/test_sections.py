@@ -0,0 +1,61 @@
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence, ConfluencePageBuilder
+
+
+def page_with_summary(summary):
+    builder = ConfluencePageBuilder()
+    builder.add_title('Status')
+    builder.add_section('summary', '<p>{0}</p>'.format(summary))
+    builder.add_custom_html('<p>Footer</p>')
+    return builder
+
+
+def test_only_the_section_is_replaced():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Status', 'Data Science', body=page_with_summary('Old'))
+
+        result = lc.update_section('Status', 'Data Science', 'summary', '<p>New</p>')
+
+        assert result.written
+        assert lc.get_page_contents('Status', 'Data Science') == page_with_summary('New').render()
+        assert not lc.update_section('Status', 'Data Science', 'summary', '<p>New</p>').written
+
+
+def test_a_missing_section_is_appended_or_raises():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Status', 'Data Science', body='<p>Intro</p>')
+
+        try:
+            lc.update_section('Status', 'Data Science', 'summary', '<p>New</p>', append=False)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('update_section should raise for a missing section when append is False')
+
+        lc.update_section('Status', 'Data Science', 'summary', '<p>New</p>')
+        builder = ConfluencePageBuilder()
+        builder.add_section('summary', '<p>New</p>')
+        assert lc.get_page_contents('Status', 'Data Science') == '<p>Intro</p>' + builder.render()
+
+
+def test_a_conflicting_save_is_patched_on_top_of():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        other = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Status', 'Data Science', body=page_with_summary('Old'))
+        edited = page_with_summary('Old').render().replace('Footer', 'Edited footer')
+
+        def save_first(event):
+            # Someone else saves the page between our read and our write, once
+            if event['method'] == 'PUT' and not saved:
+                saved.append(other.update_page('Status', 'Data Science', edited))
+        saved = []
+        lc.add_hook('pre_request', save_first)
+
+        result = lc.update_section('Status', 'Data Science', 'summary', '<p>New</p>')
+
+        assert saved and saved[0].ok
+        assert result.written and result.response.ok
+        assert lc.get_page_contents('Status', 'Data Science') == edited.replace('<p>Old</p>', '<p>New</p>')
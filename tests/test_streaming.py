@@ -0,0 +1,130 @@
+import io
+import json
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import pytest
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence, ConfluencePageBuilder
+from confluenceapi.streaming import JSONStream, MultipartEncoder, StreamConsumed
+
+
+def document():
+    return {'type': 'page', 'body': {'storage': {'value': JSONStream.placeholder, 'representation': 'storage'}}}
+
+
+def test_the_streamed_document_is_the_same_json():
+    fragments = ['<p>"quoted"</p>', '\n<p>Café ☕</p>', '\\']
+    stream = JSONStream(document(), fragments, chunk_size=4)
+
+    body = json.loads(b''.join(stream).decode('utf-8'))
+
+    assert body['body']['storage']['value'] == ''.join(fragments)
+    assert stream.bytes_sent == len(b''.join(stream))
+
+
+def test_a_list_or_function_of_fragments_can_be_sent_again():
+    builder = ConfluencePageBuilder()
+    builder.add_title('Report')
+    for stream in (JSONStream(document(), ['<p>One</p>', '<p>Two</p>']), JSONStream(document(), builder.iter_render)):
+        assert stream.replayable
+        assert b''.join(stream) == b''.join(stream)
+
+
+def test_a_one_shot_iterator_can_only_be_sent_once():
+    stream = JSONStream(document(), iter(['<p>One</p>']))
+    assert not stream.replayable
+    b''.join(stream)
+
+    with pytest.raises(StreamConsumed):
+        b''.join(stream)
+
+
+def test_a_throttled_builder_update_is_sent_again():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), rate_limit=100)
+        lc.add_page('Report', 'Data Science', body='<p>Old</p>')
+        builder = ConfluencePageBuilder()
+        builder.add_title('Report')
+
+        mock.fail(429, headers={'Retry-After': '0'}, method='PUT')
+        assert lc.update_page('Report', 'Data Science', builder).ok
+
+        assert lc.get_page_contents('Report', 'Data Science') == builder.render()
+        assert lc.rate_limiter.throttled == 1
+
+
+def parts(encoder, body):
+    message = BytesParser(policy=HTTP).parsebytes(b'Content-Type: ' + encoder.content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    return [(part.get_param('name', header='content-disposition'), part.get_filename(), part.get_payload(decode=True))
+            for part in message.iter_parts()]
+
+
+def test_the_multipart_body_holds_every_field_and_file(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'a,b\n' * 1000)
+    encoder = MultipartEncoder(fields=[('comment', 'Nightly')],
+                               files=[('file', 'data.csv', str(path)), ('file', 'notes.txt', b'notes')], chunk_size=100)
+
+    body = b''.join(encoder)
+
+    assert encoder.len == len(body) == encoder.bytes_sent
+    assert parts(encoder, body) == [('comment', None, b'Nightly'), ('file', 'data.csv', b'a,b\n' * 1000),
+                                    ('file', 'notes.txt', b'notes')]
+
+
+def test_a_body_from_paths_and_bytes_is_the_same_when_sent_again(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'0123456789' * 100)
+    encoder = MultipartEncoder(files=[('file', 'data.csv', str(path)), ('file', 'raw.bin', b'raw')], chunk_size=64)
+
+    chunks = iter(encoder)
+    first_chunk = next(chunks)
+    # A retry starts again from the top, even when the last attempt stopped part way through
+    body = b''.join(encoder)
+
+    assert encoder.replayable
+    assert body.startswith(first_chunk) and body == b''.join(encoder)
+
+
+def test_a_body_from_a_file_object_or_iterator_is_only_sent_once():
+    for source in (io.BytesIO(b'data'), iter([b'da', b'ta'])):
+        encoder = MultipartEncoder(files=[('file', 'data.bin', source)])
+        assert not encoder.replayable
+        b''.join(encoder)
+        with pytest.raises(StreamConsumed):
+            b''.join(encoder)
+
+    # The length of an iterator isn't known, so the body is sent chunked
+    assert MultipartEncoder(files=[('file', 'data.bin', iter([b'data']))]).len == 0
+
+
+def test_files_opened_from_a_path_are_closed(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'x' * 1000)
+
+    encoder = MultipartEncoder(files=[('file', 'data.csv', str(path))], chunk_size=10)
+    b''.join(encoder)
+    assert encoder._opened == []
+
+    with MultipartEncoder(files=[('file', 'data.csv', str(path))], chunk_size=10) as encoder:
+        chunks = iter(encoder)
+        next(chunks), next(chunks)
+        handle = encoder._opened[0]
+    assert handle.closed and encoder._opened == []
+
+
+def test_a_throttled_attachment_upload_is_sent_again(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'a,b\n1,2\n')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Report', 'Data Science', body='<p>Report</p>')
+
+        mock.fail(429, headers={'Retry-After': '0'}, method='POST', path='/rest/api/content/1001/child/attachment')
+        assert lc.upload_attachment(str(path), 'Report', 'Data Science').ok
+
+        attachment = next(item for item in mock.content.values() if item['type'] == 'attachment')
+        assert attachment['data'] == b'a,b\n1,2\n'
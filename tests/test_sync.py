@@ -0,0 +1,117 @@
+import io
+import json
+
+import pytest
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence, Manifest
+from confluenceapi.sync import content_digest
+
+
+def test_manifest_saves_in_batches_and_on_flush(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    manifest = Manifest(path, save_every=3)
+
+    manifest.set('page:1', 'a', 1)
+    manifest.set('page:2', 'b', 1)
+    assert not (tmp_path / 'manifest.json').exists()
+
+    manifest.set('page:3', 'c', 1)
+    assert len(json.loads((tmp_path / 'manifest.json').read_text())) == 3
+
+    manifest.delete('page:1')
+    manifest.flush()
+    reloaded = Manifest(path)
+    assert len(reloaded) == 2
+    assert reloaded.get('page:2') == {'digest': 'b', 'version': 1}
+
+
+def test_one_shot_streams_are_not_hashed():
+    class Pipe(io.RawIOBase):
+        def readable(self):
+            return True
+
+        def seekable(self):
+            return False
+
+    with pytest.raises(ValueError):
+        content_digest(Pipe())
+    assert content_digest(io.BytesIO(b'data')) == content_digest(b'data')
+
+
+def test_sync_refuses_a_generator_before_reading_it(tmp_path):
+    source = tmp_path / 'a.txt'
+    source.write_bytes(b'data')
+    chunks = iter([b'da', b'ta'])
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), manifest=Manifest())
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        lc.upload_attachment(str(source), 'Reports', 'Data Science')
+
+        with pytest.raises(ValueError):
+            lc.update_attachment(chunks, 'Reports', 'Data Science', filename='a.txt', sync=True)
+        assert next(chunks) == b'da'
+
+
+def test_update_page_skips_an_unchanged_body(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), manifest=Manifest(path))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        # Without a manifest entry the body is compared with the server
+        assert not lc.update_page('Reports', 'Data Science', '<p>Reports</p>', sync=True).written
+        assert lc.update_page('Reports', 'Data Science', ['<p>New', '</p>'], sync=True).written
+        mock.reset()
+        assert not lc.update_page('Reports', 'Data Science', '<p>New</p>', sync=True).written
+        assert 'PUT content/{id}' not in mock.stats()
+
+        # An edit made on the server moves the version on, so the page is written again
+        mock.content[1001]['version'] += 1
+        assert lc.update_page('Reports', 'Data Science', '<p>New</p>', sync=True).written
+        lc.close()
+
+        assert Manifest(path).get('page:1001')['version'] == 4
+
+
+def test_update_attachment_skips_an_unchanged_file(tmp_path):
+    source = tmp_path / 'data.csv'
+    source.write_bytes(b'a,b\n1,2\n')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), manifest=Manifest())
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        lc.upload_attachment(str(source), 'Reports', 'Data Science')
+
+        # The first check downloads the attachment as the sizes match, later ones trust the manifest
+        assert not lc.update_attachment(str(source), 'Reports', 'Data Science', sync=True).written
+        mock.reset()
+        with open(str(source), 'rb') as handle:
+            assert not lc.update_attachment(handle, 'Reports', 'Data Science', filename='data.csv', sync=True).written
+        assert not any(request.startswith('POST') or request.startswith('GET download') for request in mock.stats())
+
+        source.write_bytes(b'a,b\n3,4\n')
+        assert lc.update_attachment(str(source), 'Reports', 'Data Science', sync=True).written
+        attachment = next(item for item in mock.content.values() if item['type'] == 'attachment')
+        assert attachment['data'] == b'a,b\n3,4\n' and attachment['version'] == 2
+
+
+def test_upload_attachments_reports_unchanged_files(tmp_path):
+    paths = []
+    for name in ('a.txt', 'b.txt'):
+        path = tmp_path / name
+        path.write_text(name)
+        paths.append(str(path))
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), manifest=Manifest())
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+        lc.upload_attachments(paths, 'Reports', 'Data Science', sync=True)
+
+        (tmp_path / 'b.txt').write_text('changed')
+        results = lc.upload_attachments(paths, 'Reports', 'Data Science', sync=True)
+
+        assert results['a.txt'].action == 'unchanged'
+        assert results['b.txt'].action == 'updated'
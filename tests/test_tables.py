@@ -0,0 +1,77 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+from confluenceapi.tables import table_fragments, to_storage_table
+
+
+def cells(html):
+    return [re.findall(r'<t[dh]>(.*?)</t[dh]>', row) for row in re.findall(r'<tr>(.*?)</tr>', html, re.S)]
+
+
+def test_text_is_escaped_unless_asked_not_to():
+    df = pd.DataFrame({'<b>name</b>': ['<i>Ann</i> & co', 'Bob']})
+
+    assert cells(to_storage_table(df, index=False)) == [['&lt;b&gt;name&lt;/b&gt;'], ['&lt;i&gt;Ann&lt;/i&gt; &amp; co'], ['Bob']]
+    assert cells(to_storage_table(df, escape=False, index=False))[1] == ['<i>Ann</i> & co']
+
+
+def test_formatters_take_callables_and_format_strings():
+    df = pd.DataFrame({'price': [1234.5, np.nan], 'name': ['a', 'b']}, index=pd.Index([1, 2], name='id'))
+
+    html = to_storage_table(df, formatters={'price': '{:,.2f}', 'name': str.upper, None: '#{}'.format}, na_rep='-')
+
+    assert cells(html) == [['id', 'price', 'name'], ['#1', '1,234.50', 'A'], ['#2', '-', 'B']]
+
+
+def test_floats_are_written_like_to_html():
+    df = pd.DataFrame({'ratio': [0.1 + 0.2, 1e-7, 3.0], 'amount': [1234567.891, 2.0, 3.5],
+                       'score': [1.123456789, 2.0, -3.25], 'count': [1, 2, 3]})
+    # The header row of to_html has a style so only its body rows are picked up
+    expected = [row[1:] for row in cells(df.to_html())]
+
+    # Every chunk uses the decimals of the whole column
+    html = ''.join(table_fragments(df, chunk_rows=1))
+
+    assert [row[1:] for row in cells(html)[1:]] == expected
+    assert cells(html)[2] == ['1', '1.000000e-07', '2.000', '2.000000', '2']
+
+
+def test_rows_are_joined_in_chunks():
+    df = pd.DataFrame({'n': range(5)})
+
+    fragments = list(table_fragments(df, index=False, chunk_rows=2))
+
+    assert len(fragments) == 5
+    assert cells(''.join(fragments)) == [['n'], ['0'], ['1'], ['2'], ['3'], ['4']]
+
+
+def test_publish_table_splits_a_large_table_across_child_pages():
+    df = pd.DataFrame({'n': range(5)})
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+
+        results = lc.publish_table(df, 'Numbers', 'Data Science', max_rows=2, index=False)
+
+        assert [result.title for result in results] == ['Numbers', 'Numbers (rows 1 to 2)', 'Numbers (rows 3 to 4)', 'Numbers (rows 5 to 5)']
+        assert all(result.action == 'created' for result in results)
+        assert cells(lc.get_page_contents('Numbers (rows 3 to 4)', 'Data Science')) == [['n'], ['2'], ['3']]
+        assert '5 rows split across 3 pages' in lc.get_page_contents('Numbers', 'Data Science')
+
+
+def test_publish_table_attaches_a_large_table_as_csv():
+    df = pd.DataFrame({'n': range(5)})
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+
+        results = lc.publish_table(df, 'Numbers', 'Data Science', max_rows=2, split='csv', index=False)
+
+        assert [result.action for result in results] == ['created']
+        assert cells(lc.get_page_contents('Numbers', 'Data Science')) == [['n'], ['0'], ['1']]
+        csv = next(item for item in mock.content.values() if item['type'] == 'attachment')
+        assert csv['title'] == 'Numbers.csv' and csv['data'] == b'n\n0\n1\n2\n3\n4\n'
@@ -0,0 +1,148 @@
+import pytest
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+from confluenceapi.batch import DependencyFailed
+
+
+def build_tree(lc):
+    # Root (1001) with children A (1002) and B (1003), A has a child A1 (1004)
+    lc.add_page('Root', 'Data Science', body='<p>Root</p>')
+    lc.add_page('A', 'Data Science', body='<p>A</p>', parent_page_name='Root')
+    lc.add_page('B', 'Data Science', body='<p>B</p>', parent_page_name='Root')
+    lc.add_page('A1', 'Data Science', body='<p>A1</p>', parent_page_name='A')
+
+
+def titles(mock, space_key='DS'):
+    return sorted(item['title'] for item in mock.content.values() if item['type'] == 'page' and item['space'] == space_key)
+
+
+def page(mock, title, space_key='DS'):
+    return next(item for item in mock.content.values() if item['title'] == title and item['space'] == space_key)
+
+
+def test_a_dry_run_deletes_nothing():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        build_tree(lc)
+        mock.reset()
+
+        results = lc.delete_tree('Root', 'Data Science', dry_run=True)
+
+        assert [(result.title, result.action) for result in results] == \
+            [('Root', 'planned'), ('A', 'planned'), ('B', 'planned'), ('A1', 'planned')]
+        assert titles(mock) == ['A', 'A1', 'B', 'Root']
+        assert not any(request.startswith('DELETE') for request in mock.stats())
+
+
+def test_delete_tree_deletes_children_before_parents():
+    finished = []
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        build_tree(lc)
+        lc.add_page('Elsewhere', 'Data Science', body='<p>Kept</p>')
+
+        results = lc.delete_tree('Root', 'Data Science', progress=lambda done, total, result: finished.append(result.title))
+
+        assert all(result.action == 'deleted' for result in results)
+        assert titles(mock) == ['Elsewhere']
+        assert finished.index('A1') < finished.index('A') < finished.index('Root')
+        assert finished.index('B') < finished.index('Root')
+
+
+def test_a_failed_delete_keeps_the_pages_above_it():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'), max_retries=0)
+        build_tree(lc)
+        mock.fail(500, path='/rest/api/content/1004', method='DELETE')
+
+        results = dict((result.title, result) for result in lc.delete_tree('Root', 'Data Science'))
+
+        assert results['B'].action == 'deleted'
+        assert results['A1'].action == 'failed' and results['A1'].response.status_code == 500
+        assert isinstance(results['A'].error, DependencyFailed)
+        assert isinstance(results['Root'].error, DependencyFailed)
+        assert titles(mock) == ['A', 'A1', 'Root']
+
+
+def test_copy_tree_creates_parents_before_children():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        build_tree(lc)
+
+        results = lc.copy_tree('Root', 'Data Science', title_format='Copy of {title}', attachments=False)
+
+        assert [(result.title, result.action) for result in results] == \
+            [('Copy of Root', 'copied'), ('Copy of A', 'copied'), ('Copy of B', 'copied'), ('Copy of A1', 'copied')]
+        assert page(mock, 'Copy of A1')['ancestors'][-1] == page(mock, 'Copy of A')['id']
+        assert page(mock, 'Copy of A')['ancestors'][-1] == page(mock, 'Copy of Root')['id']
+        assert page(mock, 'Copy of A1')['body'] == '<p>A1</p>'
+
+
+def test_copy_tree_skips_the_pages_beneath_a_failed_copy():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        build_tree(lc)
+        # The copy of A can't be created as its title is taken
+        lc.add_page('Copy of A', 'Data Science', body='<p>Taken</p>')
+
+        results = dict((result.title, result) for result in lc.copy_tree('Root', 'Data Science', title_format='Copy of {title}'))
+
+        assert results['Copy of Root'].action == 'copied' and results['Copy of B'].action == 'copied'
+        # Failed pages are reported under the title of the original
+        assert results['A'].action == 'failed' and results['A'].response.status_code == 400
+        assert isinstance(results['A1'].error, DependencyFailed)
+        assert 'Copy of A1' not in titles(mock)
+
+
+def test_copy_tree_needs_new_titles_within_a_space():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        build_tree(lc)
+
+        with pytest.raises(ValueError):
+            lc.copy_tree('Root', 'Data Science')
+
+
+def test_move_tree_within_a_space_only_moves_the_top_page():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        build_tree(lc)
+        lc.add_page('Archive', 'Data Science', body='<p>Archive</p>')
+
+        assert [result.action for result in lc.move_tree('Root', 'Data Science', 'Archive', dry_run=True)] == ['planned'] * 4
+        assert page(mock, 'Root')['ancestors'] == []
+
+        results = lc.move_tree('Root', 'Data Science', 'Archive')
+
+        assert [(result.title, result.action) for result in results] == [('Root', 'moved')]
+        assert page(mock, 'Root')['ancestors'] == [page(mock, 'Archive')['id']]
+        assert page(mock, 'Root')['body'] == '<p>Root</p>'
+
+
+def test_move_tree_into_another_space_copies_then_deletes():
+    with MockConfluence(spaces={'DS': 'Data Science', 'AR': 'Archive'}) as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        build_tree(lc)
+
+        results = lc.move_tree('Root', 'Data Science', new_space_name='Archive')
+
+        assert [(result.title, result.action) for result in results] == \
+            [('Root', 'moved'), ('A', 'moved'), ('B', 'moved'), ('A1', 'moved')]
+        assert titles(mock) == []
+        assert titles(mock, 'AR') == ['A', 'A1', 'B', 'Root']
+        assert page(mock, 'A1', 'AR')['ancestors'][-1] == page(mock, 'A', 'AR')['id']
+
+
+def test_move_tree_deletes_nothing_when_a_copy_failed():
+    with MockConfluence(spaces={'DS': 'Data Science', 'AR': 'Archive'}) as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        build_tree(lc)
+        lc.add_page('B', 'Archive', body='<p>Taken</p>')
+
+        results = dict((result.title, result) for result in lc.move_tree('Root', 'Data Science', new_space_name='Archive'))
+
+        assert results['B'].action == 'failed'
+        assert results['A1'].action == 'copied'
+        assert titles(mock) == ['A', 'A1', 'B', 'Root']
@@ -0,0 +1,23 @@
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence
+
+
+def test_a_missing_file_fails_on_its_own(tmp_path):
+    paths = []
+    for name in ('a.txt', 'b.txt'):
+        path = tmp_path / name
+        path.write_text(name)
+        paths.append(str(path))
+    missing = str(tmp_path / 'missing.txt')
+
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Reports', 'Data Science', body='<p>Reports</p>')
+
+        results = lc.upload_attachments([paths[0], missing, paths[1]], 'Reports', 'Data Science')
+
+        assert list(results) == ['a.txt', 'missing.txt', 'b.txt']
+        assert results['a.txt'].action == 'created' and results['b.txt'].action == 'created'
+        assert results['missing.txt'].action == 'failed'
+        assert isinstance(results['missing.txt'].error, OSError)
+        assert sorted(attachment['title'] for attachment in lc.iter_attachments('Reports', 'Data Science')) == ['a.txt', 'b.txt']
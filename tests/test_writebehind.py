@@ -0,0 +1,49 @@
+import os
+import sys
+import subprocess
+
+from benchmarks.mockserver import MockConfluence
+from confluenceapi import Confluence, WriteBehind
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Queues a write far inside its window and lets the interpreter exit, flush_on_exit has to send it
+EXIT_WITH_PENDING_WRITE = '''
+import sys
+from confluenceapi import Confluence, WriteBehind
+
+lc = Confluence(sys.argv[1], ('admin', 'admin'))
+writer = WriteBehind(lc, window=60)
+writer.update_page('Status', 'Data Science', '<p>Written at exit</p>')
+'''
+
+
+def test_pending_write_is_sent_when_the_interpreter_exits():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Status', 'Data Science', body='<p>Before</p>')
+
+        completed = subprocess.run([sys.executable, '-c', EXIT_WITH_PENDING_WRITE, mock.server],
+                                   cwd=ROOT, capture_output=True, text=True, timeout=30)
+
+        assert completed.returncode == 0, completed.stderr
+        assert lc.get_page_contents('Status', 'Data Science') == '<p>Written at exit</p>'
+
+
+def test_a_page_write_replaces_earlier_queued_section_writes():
+    with MockConfluence() as mock:
+        lc = Confluence(mock.server, ('admin', 'admin'))
+        lc.add_page('Status', 'Data Science', body='<p>Before</p>')
+
+        with WriteBehind(lc, window=60) as writer:
+            first = writer.update_page('Status', 'Data Science', '<p>First</p>')
+            section = writer.update_section('Status', 'Data Science', 'summary', '<p>Old summary</p>')
+            last = writer.update_page('Status', 'Data Science', '<p>Last</p>')
+            assert writer.flush(timeout=10)
+
+            assert first.result() is last.result() is section.result()
+            assert writer.stats()['written'] == 1
+
+        assert lc.get_page_contents('Status', 'Data Science') == '<p>Last</p>'
+